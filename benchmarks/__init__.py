@@ -0,0 +1 @@
+"""Benchmarks for Flinx. Run ``python -m benchmarks --help``."""
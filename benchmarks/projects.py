@@ -0,0 +1,81 @@
+"""Generate synthetic projects of a configurable size."""
+
+from pathlib import Path
+
+# The project file layouts that ``make_project`` can write.
+LAYOUTS = ('none', 'flinx', 'flit', 'poetry')
+
+PYPROJECTS = {
+    'none': None,
+    'flinx': '''[tool.flinx.metadata]
+name = "{name}"
+author = "Benchmark Author"
+''',
+    'flit': '''[tool.flit.metadata]
+module = "{name}"
+author = "Benchmark Author"
+description-file = "README.rst"
+''',
+    'poetry': '''[tool.poetry]
+name = "{name}"
+version = "0.1.0"
+authors = ["Benchmark Author <author@example.com>"]
+''',
+}
+
+MODULE_TEMPLATE = '''"""Module {index} of the benchmark package.
+
+>>> 1 + {index}
+{result}
+"""
+
+
+def function_{index}(value):
+    """Return ``value`` plus {index}.
+
+    :param value: a number
+    :returns: the sum
+    """
+    return value + {index}
+
+
+class Class{index}(object):
+    """A class with a method."""
+
+    def method(self):
+        """Return {index}."""
+        return {index}
+'''
+
+
+def make_project(root, modules=10, layout='flit', readme_lines=50,
+                 module_pages=True, name='benchpkg'):
+    """Write a package with ``modules`` submodules to ``root``, and return it.
+
+    ``layout`` selects the ``pyproject.toml`` variant, from ``LAYOUTS``. With
+    ``module_pages``, each submodule is documented, on its own page.
+    """
+    root = Path(root)
+    package_dir = root / name
+    package_dir.mkdir(parents=True)
+    (package_dir / '__init__.py').write_text(
+        '"""The benchmark package."""\n\n__version__ = "0.1.0"\n')
+    for index in range(modules):
+        (package_dir / 'module_{}.py'.format(index)).write_text(
+            MODULE_TEMPLATE.format(index=index, result=1 + index))
+    readme = ['Benchmark package', '=================', '']
+    readme += ['Paragraph {} of the README.'.format(i) for i in range(readme_lines)]
+    (root / 'README.rst').write_text('\n\n'.join(readme) + '\n')
+    pyproject = (PYPROJECTS[layout] or '').format(name=name)
+    if module_pages:
+        pyproject += '\n[tool.flinx]\nmodule-pages = true\n'
+    if pyproject:
+        (root / 'pyproject.toml').write_text(pyproject)
+    return root
+
+
+def edit_module(root, index=0, name='benchpkg'):
+    """Change one module's source, as a one-file edit."""
+    path = Path(root) / name / 'module_{}.py'.format(index)
+    with path.open('a') as f:
+        f.write('\n# edited\n')
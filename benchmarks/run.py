@@ -0,0 +1,299 @@
+"""Time metadata inference, generation, and builds of synthetic projects.
+
+Each benchmark runs several times, and the minimum and median wall times are
+recorded; the ``search`` group records sizes, in bytes, instead. Results are
+written as JSON, with the commit and the versions of Python and Sphinx, so that
+runs from different commits can be compared with ``compare``.
+"""
+
+import gzip
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from .projects import LAYOUTS, edit_module, make_project
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+# Run the Flinx CLI from this checkout, rather than an installed copy.
+CLI = [sys.executable, '-c', 'import sys; from flinx.commands import cli; cli()']
+
+
+def clear_caches():
+    """Clear Flinx's in-process caches, so that each run starts cold."""
+    from flinx import configuration, git_config, project_metadata
+    configuration._toml_cache.clear()
+    project_metadata._version_cache.clear()
+    project_metadata._listing_cache.clear()
+    git_config.read_git_config.cache_clear()
+
+
+def measure(fn, repeat, setup=None):
+    """Return the wall times, in seconds, of ``repeat`` calls to ``fn``.
+
+    ``setup`` is called, untimed, before each call.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summarize(times):
+    return dict(min=min(times), median=statistics.median(times), runs=len(times))
+
+
+def run_cli(project_dir, *args):
+    """Run ``flinx *args`` in ``project_dir``, and raise an error if it fails."""
+    env = dict(os.environ, PYTHONPATH=str(PACKAGE_DIR))
+    process = subprocess.run(CLI + list(args), cwd=str(project_dir), env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if process.returncode:
+        raise click.ClickException('flinx {} failed:\n{}'.format(
+            ' '.join(args), process.stdout.decode()))
+
+
+def in_project(project_dir, fn):
+    """Return a function that calls ``fn`` in ``project_dir``."""
+    def wrapper():
+        cwd = os.getcwd()
+        os.chdir(str(project_dir))
+        try:
+            return fn()
+        finally:
+            os.chdir(cwd)
+    return wrapper
+
+
+def benchmark_metadata(root, modules, readme_lines, repeat):
+    """Time metadata inference and module detection, for each layout."""
+    from flinx.project_metadata import ProjectMetadata, module_candidates
+    keys = ('name', 'module', 'version', 'author', 'readme')
+    results = {}
+    for layout in LAYOUTS:
+        project_dir = make_project(root / ('metadata-' + layout), modules=modules,
+                                   layout=layout, readme_lines=readme_lines)
+
+        def resolve():
+            metadata = ProjectMetadata.from_dir('.')
+            for key in keys:
+                metadata[key]
+
+        results['metadata/' + layout] = summarize(
+            measure(in_project(project_dir, resolve), repeat, setup=clear_caches))
+        results['metadata/{}/warm'.format(layout)] = summarize(
+            measure(in_project(project_dir, resolve), repeat))
+        results['module_candidates/' + layout] = summarize(measure(
+            in_project(project_dir, lambda: module_candidates('.')), repeat,
+            setup=clear_caches))
+    return results
+
+
+def benchmark_generation(root, modules, readme_lines, repeat):
+    """Time writing the generated files."""
+    from flinx.generation import write_template_files
+    project_dir = make_project(root / 'generation', modules=modules,
+                               readme_lines=readme_lines)
+
+    def generate():
+        write_template_files(Path('docs'), offline=True, verbose=False)
+
+    def remove_docs():
+        clear_caches()
+        shutil.rmtree(str(project_dir / 'docs'), ignore_errors=True)
+
+    return {
+        'write_template_files/cold': summarize(
+            measure(in_project(project_dir, generate), repeat, setup=remove_docs)),
+        'write_template_files/unchanged': summarize(
+            measure(in_project(project_dir, generate), repeat)),
+    }
+
+
+def benchmark_builds(root, modules, readme_lines, repeat):
+    """Time cold, warm (no-op), and incremental builds, in a subprocess."""
+    project_dir = make_project(root / 'build', modules=modules,
+                               readme_lines=readme_lines)
+
+    def build():
+        run_cli(project_dir, 'build', '--offline')
+
+    def remove_build():
+        shutil.rmtree(str(project_dir / 'docs'), ignore_errors=True)
+
+    results = {'build/cold': summarize(measure(build, repeat, setup=remove_build))}
+    results['build/warm'] = summarize(measure(build, repeat))
+    results['build/one-file edit'] = summarize(
+        measure(build, repeat, setup=lambda: edit_module(project_dir)))
+    results['check'] = summarize(
+        measure(lambda: run_cli(project_dir, 'check'), repeat))
+    return results
+
+
+def sizes(data):
+    return dict(bytes=len(data), gzip=len(gzip.compress(data, mtime=0)))
+
+
+def benchmark_search(root, modules, readme_lines, repeat):
+    """Measure the bytes that the search page loads, with and without a sharded
+    search index.
+
+    The README's paragraphs are made of random words, so that the index has a
+    realistic vocabulary. The sharded size of a query is the median, over a
+    sample of the index's terms, of the core index and the shard of the term.
+    """
+    from flinx.search_index import read_search_index
+    project_dir = make_project(root / 'search', modules=modules,
+                               readme_lines=readme_lines)
+    rng = random.Random(0)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz')
+                     for _ in range(rng.randint(4, 10))) for _ in range(5000)]
+    readme = ['Benchmark package', '=================', '']
+    readme += [' '.join(rng.choice(words) for _ in range(12))
+               for _ in range(readme_lines)]
+    (project_dir / 'README.rst').write_text('\n\n'.join(readme) + '\n')
+    run_cli(project_dir, 'build', '--offline', '--search-shards')
+    build_dir = project_dir / 'docs' / '_build' / 'html'
+    [core_path] = (build_dir / '_search').glob('index.*.js')
+    core = read_search_index(core_path)
+    shards = core['flinx_shards']
+    index = read_search_index(build_dir / 'searchindex.js')
+    terms = sorted(index['terms'])
+    sample = terms[::max(1, len(terms) // 100)]
+    core_sizes = sizes(core_path.read_bytes())
+    queries = []
+    for term in sample:
+        file = shards['files'][shards['prefixes'][term[:shards['prefix_length']]]]
+        shard_sizes = sizes((build_dir / file).read_bytes())
+        queries.append({key: core_sizes[key] + shard_sizes[key] for key in core_sizes})
+    return {
+        'search/searchindex.js': sizes((build_dir / 'searchindex.js').read_bytes()),
+        'search/core': core_sizes,
+        'search/query': {key: int(statistics.median(query[key] for query in queries))
+                         for key in core_sizes},
+    }
+
+
+BENCHMARKS = {
+    'metadata': benchmark_metadata,
+    'generation': benchmark_generation,
+    'build': benchmark_builds,
+    'search': benchmark_search,
+}
+
+
+def git_commit():
+    """Return the current commit of this checkout, or None."""
+    try:
+        process = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                 cwd=str(PACKAGE_DIR), stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout.decode().strip()
+
+
+def sphinx_version():
+    from importlib import metadata
+    try:
+        return metadata.version('sphinx')
+    except metadata.PackageNotFoundError:
+        return None
+
+
+@click.group()
+def cli():
+    """Flinx benchmarks."""
+    pass
+
+
+@cli.command()
+@click.option('--modules', type=int, default=20, show_default=True,
+              help='The number of modules in each synthetic package.')
+@click.option('--readme-lines', type=int, default=50, show_default=True,
+              help='The number of paragraphs in each README.')
+@click.option('--repeat', type=int, default=5, show_default=True,
+              help='The number of times to run each benchmark.')
+@click.option('--only', type=click.Choice(sorted(BENCHMARKS)), multiple=True,
+              help='Run only these groups of benchmarks.')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              help='Write the results to this JSON file.')
+def run(modules, readme_lines, repeat, only, output):
+    """Run the benchmarks, and print and save the results."""
+    sys.path.insert(0, str(PACKAGE_DIR))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='flinx-bench-') as tmp:
+        root = Path(tmp)
+        # isolate the runs from the user's git configuration and caches
+        (root / 'gitconfig').write_text('[user]\n\tname = Benchmark Author\n')
+        os.environ['GIT_CONFIG_GLOBAL'] = str(root / 'gitconfig')
+        os.environ['XDG_CACHE_HOME'] = str(root / 'cache')
+        os.environ['XDG_CONFIG_HOME'] = str(root / 'config')
+        for name in only or BENCHMARKS:
+            results.update(BENCHMARKS[name](root, modules, readme_lines, repeat))
+    report = dict(
+        commit=git_commit(),
+        python=platform.python_version(),
+        sphinx=sphinx_version(),
+        timestamp=time.time(),
+        parameters=dict(modules=modules, readme_lines=readme_lines, repeat=repeat),
+        results=results,
+    )
+    for name, result in results.items():
+        if 'bytes' in result:
+            print('{:<36} {:>10}B {:>7}B gzip'.format(name, result['bytes'],
+                                                      result['gzip']))
+        else:
+            print('{:<36} {:>9.2f}ms {:>9.2f}ms'.format(name, result['min'] * 1000,
+                                                        result['median'] * 1000))
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+@cli.command()
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--threshold', type=float, default=0.1, show_default=True,
+              help='The relative slowdown, of the minimum time, that counts as a '
+              'regression.')
+def compare(baseline, current, threshold):
+    """Compare two results files, and exit with status 1 if any benchmark
+    regressed.
+
+    A size regressed if its gzip-compressed size grew by more than the
+    threshold.
+    """
+    old, new = (json.loads(Path(path).read_text()) for path in (baseline, current))
+    if old['parameters'] != new['parameters']:
+        print('warning: the runs have different parameters', file=sys.stderr)
+    print('{:<36} {:>10} {:>10} {:>8}'.format('benchmark', old['commit'] or 'baseline',
+                                              new['commit'] or 'current', 'change'))
+    regressions = []
+    for name in sorted(set(old['results']) & set(new['results'])):
+        key, template = ('gzip', '{:>9}B') if 'gzip' in new['results'][name] \
+            else ('min', '{:>8.2f}ms')
+        before, after = old['results'][name][key], new['results'][name][key]
+        change = after / before - 1 if before else 0.0
+        if change > threshold:
+            regressions.append(name)
+        if key == 'min':
+            before, after = before * 1000, after * 1000
+        print('{:<36} {} {} {:>+7.1%}{}'.format(
+            name, template.format(before), template.format(after), change,
+            '  regression' if change > threshold else ''))
+    if regressions:
+        sys.exit(1)
@@ -0,0 +1,208 @@
+"""A Sphinx extension that caches the reStructuredText that autodoc generates.
+
+Each autodoc directive's output is stored on disk, together with the hashes of
+the source files that autodoc recorded as its dependencies. When the directive
+is next run with the same arguments and configuration, and those files are
+unchanged, the stored output is parsed instead of importing the module and
+extracting its docstrings again.
+
+The cache is stored in the ``flinx-autodoc`` directory of the doctree directory,
+or in the directory named by the ``flinx_autodoc_cache_dir`` configuration value.
+The dependencies are recorded relative to the source directory, so that builds
+of different checkouts of a project can share a cache directory.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from docutils.parsers.rst import directives
+from docutils.statemachine import StringList
+
+from sphinx.ext.autodoc.directive import AutodocDirective as LegacyAutodocDirective
+
+from . import __version__
+from .digests import file_digest
+
+try:
+    from sphinx.ext.autodoc._directive import AutodocDirective
+    autodoc_directive_classes = (AutodocDirective, LegacyAutodocDirective)
+except ImportError:  # Sphinx < 9
+    autodoc_directive_classes = (LegacyAutodocDirective,)
+
+# Configuration values whose prefixes mark them as affecting autodoc output.
+config_prefixes = ('autodoc_', 'autoclass_', 'autosummary_', 'napoleon_',
+                   'add_module_names', 'python_', 'typehints_')
+
+
+def config_digest(config):
+    """Return a digest of the configuration values that affect autodoc output."""
+    import sphinx
+    values = [(name, repr(getattr(config, name, None)))
+              for name in sorted(config.values)
+              if name.startswith(config_prefixes)]
+    text = json.dumps([__version__, sphinx.__version__,
+                       list(config.extensions), values])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class RecordingDependencies(object):
+    """Wrap a docutils ``DependencyList``, and record the paths that are added."""
+
+    def __init__(self, dependencies):
+        self.dependencies = dependencies
+        self.recorded = []
+
+    def add(self, *paths):
+        """Add paths to the wrapped list, and record them."""
+        self.recorded.extend(paths)
+        self.dependencies.add(*paths)
+
+    def __getattr__(self, name):
+        return getattr(self.dependencies, name)
+
+
+class CachingDirectiveMixin(object):
+    """Cache the generated content of an autodoc directive class.
+
+    This is mixed into the directive class that autodoc registered, since this
+    differs between Sphinx versions and settings. ``_parse_module`` is the module
+    that defines that class, and its ``parse_generated_content`` function.
+    """
+
+    _parse_module = None
+
+    def cache_path(self):
+        """Return the path of this directive's cache entry."""
+        cache_dir = self.config.flinx_autodoc_cache_dir or \
+            os.path.join(self.env.doctreedir, 'flinx-autodoc')
+        env = self.env
+        # the current module and class resolve the directive's arguments
+        context = [env.ref_context.get('py:module'), env.ref_context.get('py:class'),
+                   env.temp_data.get('autodoc:module'),
+                   env.temp_data.get('autodoc:class')]
+        key = json.dumps([env.flinx_autodoc_config_digest, self.name, self.arguments,
+                          sorted((k, str(v)) for k, v in self.options.items()),
+                          list(self.content), context])
+        return Path(cache_dir) / (hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def dependency_paths(self, entry):
+        """Return a dict of the absolute path of each of an entry's dependencies,
+        to its digest."""
+        srcdir = str(self.env.srcdir)
+        return {os.path.normpath(os.path.join(srcdir, path)): digest
+                for path, digest in entry['dependencies'].items()}
+
+    def run(self):
+        """Parse the cached content, or generate and cache it."""
+        cache_path = self.cache_path()
+        entry = read_entry(cache_path)
+        dependencies = self.dependency_paths(entry) if entry else {}
+        if entry and all(file_digest(path) == digest
+                         for path, digest in dependencies.items()):
+            for path in dependencies:
+                self.state.document.settings.record_dependencies.add(path)
+            content = StringList(entry['lines'], items=[tuple(item)
+                                                        for item in entry['items']])
+            return parse_content(self._parse_module, self.state, content,
+                                 entry['titles_allowed'])
+
+        generated = []
+
+        def capture(state, content, titles_allowed):
+            generated.append((content, getattr(titles_allowed, 'titles_allowed',
+                                               titles_allowed)))
+            return parse_generated_content(state, content, titles_allowed)
+
+        settings = self.state.document.settings
+        parse_module = self._parse_module
+        parse_generated_content = parse_module.parse_generated_content
+        dependencies = settings.record_dependencies
+        settings.record_dependencies = RecordingDependencies(dependencies)
+        parse_module.parse_generated_content = capture
+        try:
+            result = super().run()
+        finally:
+            parse_module.parse_generated_content = parse_generated_content
+            recorded = settings.record_dependencies.recorded
+            settings.record_dependencies = dependencies
+
+        if generated and recorded:
+            content, titles_allowed = generated[0]
+            write_entry(cache_path, {
+                'dependencies': {os.path.relpath(path, str(self.env.srcdir)):
+                                 file_digest(path) for path in recorded},
+                'lines': list(content.data),
+                'items': list(content.items),
+                'titles_allowed': bool(titles_allowed),
+            })
+        return result
+
+
+def parse_content(parse_module, state, content, titles_allowed):
+    """Parse generated content, with whichever signature this Sphinx has."""
+    parse = parse_module.parse_generated_content
+    if 'titles_allowed' not in inspect.signature(parse).parameters:
+        titles_allowed = SimpleNamespace(titles_allowed=titles_allowed)
+    return parse(state, content, titles_allowed)
+
+
+def read_entry(path):
+    """Return the cache entry at ``path``, or None."""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_entry(path, entry):
+    """Write a cache entry atomically, so that parallel readers don't see partial
+    files."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, str(path))
+
+
+def caching_directive(directive):
+    """Return a subclass of an autodoc directive class, that caches its content."""
+    return type('Caching' + directive.__name__, (CachingDirectiveMixin, directive),
+                {'_parse_module': sys.modules[directive.__module__]})
+
+
+def replace_directives(app, config):
+    """Replace the registered autodoc directives with caching versions."""
+    caching_classes = {}
+    for name, directive in list(directives._directives.items()):
+        if isinstance(directive, type) \
+                and issubclass(directive, autodoc_directive_classes) \
+                and not issubclass(directive, CachingDirectiveMixin):
+            if directive not in caching_classes:
+                caching_classes[directive] = caching_directive(directive)
+            app.add_directive(name, caching_classes[directive], override=True)
+
+
+def record_config_digest(app):
+    """Compute the configuration digest once per application, for the directives.
+
+    It is stored on the environment, so that an application that is created
+    after a change to ``conf.py`` doesn't use the digest of an earlier one.
+    """
+    app.env.flinx_autodoc_config_digest = config_digest(app.config)
+
+
+def setup(app):
+    """Replace the autodoc directives with caching versions."""
+    app.setup_extension('sphinx.ext.autodoc')
+    app.add_config_value('flinx_autodoc_cache_dir', None, '')
+    # autodoc registers its directives when the configuration is read
+    app.connect('config-inited', replace_directives, priority=900)
+    app.connect('builder-inited', record_config_digest)
+    return {'version': __version__, 'parallel_read_safe': True,
+            'parallel_write_safe': True}
@@ -0,0 +1,283 @@
+"""Share Sphinx environments and doctrees between builds, through a cache directory.
+
+A cache entry is a tarball of a build's doctree directory, which holds the
+pickled environment. Entries are grouped by an *environment key*: a digest of
+``conf.py``, and of the Python, Sphinx, and extension versions. Entries with
+different keys can't be reused, since Sphinx would discard the environment.
+
+Within a key, each entry records the digest of each source file. Restoring an
+entry whose sources all match gives a no-op build. Otherwise the closest entry
+is restored. Either way, the restored environment's read time of each document
+is set so that Sphinx re-reads only the documents whose sources, or tracked
+dependencies, differ from the entry's: unchanged documents are marked as read
+now, and changed ones as never read. The project's files are left alone.
+
+Sphinx discards an environment whose source directory has moved, so each entry
+records the project and source directories it was built in, and a restored
+environment's paths are moved to those of the current build. This lets
+checkouts at different paths, such as CI workspaces and worktrees, share a
+cache.
+
+The cache is a plain directory, so that CI systems can save and restore it
+between runs and branches. Its size is capped, by evicting the least recently
+used entries.
+"""
+
+import ast
+import json
+import os
+import pickle
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+from . import __version__
+from .digests import file_digest, project_sources, source_digests, text_digest
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+
+def rebase(path, moves):
+    """Return ``path`` moved from beneath the first of ``moves``, a list of pairs
+    of old and new directories, that it is beneath, or ``path`` if none."""
+    for old_dir, new_dir in moves:
+        try:
+            return type(path)(new_dir, Path(path).relative_to(old_dir))
+        except ValueError:
+            pass
+    return path
+
+
+def read_extensions(conf_path):
+    """Return the ``extensions`` list that ``conf_path`` assigns, or [].
+
+    ``conf.py`` is parsed rather than run, and a list that isn't a literal is
+    ignored.
+    """
+    try:
+        tree = ast.parse(Path(conf_path).read_text())
+    except (OSError, SyntaxError, ValueError):
+        return []
+    for node in tree.body:
+        names = [t.id for t in getattr(node, 'targets', []) if isinstance(t, ast.Name)]
+        if isinstance(node, ast.Assign) and 'extensions' in names:
+            try:
+                return list(ast.literal_eval(node.value))
+            except ValueError:
+                return []
+    return []
+
+
+def distribution_versions(module_names):
+    """Return a dict of distribution name to version, for the distributions that
+    provide ``module_names``."""
+    from importlib import metadata
+    packages = metadata.packages_distributions()
+    versions = {}
+    for name in module_names:
+        for dist in packages.get(name.split('.')[0], []):
+            try:
+                versions[dist] = metadata.version(dist)
+            except metadata.PackageNotFoundError:
+                pass
+    return versions
+
+
+def environment_key(docs_dir):
+    """Return a digest of the inputs that, if they change, invalidate a Sphinx
+    environment."""
+    conf_path = Path(docs_dir) / 'conf.py'
+    inputs = dict(
+        conf=file_digest(conf_path),
+        flinx=__version__,
+        python=list(sys.version_info[:2]),
+        versions=distribution_versions(['sphinx'] + read_extensions(conf_path)),
+    )
+    return text_digest(json.dumps(inputs, sort_keys=True))
+
+
+def relocate_environment(env, entry, docs_dir, doctree_dir):
+    """Move the paths of ``env``, which was built in the directories that
+    ``entry`` records, to ``docs_dir`` and ``doctree_dir``, in the current
+    project directory.
+
+    Dependencies beneath the old source directory are moved beneath the new one,
+    and other dependencies beneath the old project directory beneath the new
+    one; dependencies outside the project, such as installed modules, are kept.
+    """
+    srcdir = Path(docs_dir).resolve()
+    env.srcdir = srcdir
+    env.doctreedir = Path(doctree_dir).resolve()
+    env.project.srcdir = type(env.project.srcdir)(srcdir)
+    moves = [(entry['srcdir'], srcdir), (entry['project_dir'], os.getcwd())]
+    for docname, paths in env.dependencies.items():
+        env.dependencies[docname] = {rebase(path, moves) for path in paths}
+
+
+class BuildCache(object):
+    """A directory of doctree tarballs, keyed by environment and source digests."""
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE, verbose=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.verbose = verbose
+        self._sources = None
+
+    @property
+    def objects_dir(self):
+        return self.cache_dir / 'objects'
+
+    def entries_dir(self, env_key):
+        return self.cache_dir / 'entries' / env_key
+
+    def sources(self, docs_dir):
+        """Return a dict of source path to digest. This is computed once."""
+        if self._sources is None:
+            self._sources = source_digests(project_sources(docs_dir))
+        return self._sources
+
+    def entries(self, env_key):
+        """Return the entries for ``env_key`` whose tarballs exist."""
+        entries = []
+        for path in sorted(self.entries_dir(env_key).glob('*.json')):
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if (self.objects_dir / entry['object']).exists():
+                entries.append(entry)
+        return entries
+
+    def restore(self, docs_dir, doctree_dir):
+        """Restore the closest cache entry into ``doctree_dir``.
+
+        Does nothing if ``doctree_dir`` already holds an environment, since a
+        local environment is at least as recent as any in the cache. Returns
+        ``'exact'``, ``'partial'``, or None if nothing was restored.
+        """
+        doctree_dir = Path(doctree_dir)
+        if (doctree_dir / 'environment.pickle').exists():
+            return None
+        sources = self.sources(docs_dir)
+        entries = self.entries(environment_key(docs_dir))
+        if not entries:
+            self._log('build cache: miss')
+            return None
+
+        def matches(entry):
+            return sum(entry['sources'].get(path) == digest
+                       for path, digest in sources.items())
+
+        entry = max(entries, key=lambda entry: (matches(entry), entry['created']))
+        object_path = self.objects_dir / entry['object']
+        doctree_dir.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(str(object_path)) as tar:
+            if hasattr(tarfile, 'data_filter'):
+                tar.extractall(str(doctree_dir), filter='data')
+            else:
+                tar.extractall(str(doctree_dir))
+        os.utime(str(object_path))
+
+        changed = {path for path, digest in sources.items()
+                   if entry['sources'].get(path) != digest}
+        self.update_environment(docs_dir, doctree_dir, entry, sources, changed)
+        status = 'partial' if changed else 'exact'
+        self._log('build cache: {} hit, {} changed file(s)'.format(
+            status, len(changed)))
+        return status
+
+    def update_environment(self, docs_dir, doctree_dir, entry, sources, changed):
+        """Move the environment in ``doctree_dir`` from the directories that
+        ``entry`` was built in to this build's, and set the read time of each
+        document, so that Sphinx re-reads the documents whose source or
+        dependencies are in ``changed``.
+
+        Sphinx compares these times with the modification times of the files,
+        which are those of this checkout rather than of the cached build. A
+        dependency that isn't in ``sources`` keeps that comparison, with the
+        time at which the cached build read the document.
+        """
+        env_path = Path(doctree_dir) / 'environment.pickle'
+        with open(str(env_path), 'rb') as f:
+            env = pickle.load(f)
+        if 'srcdir' in entry:
+            relocate_environment(env, entry, docs_dir, doctree_dir)
+        now = time.time_ns() // 1000
+        for docname, read_time in env.all_docs.items():
+            paths = [env.doc2path(docname)] + sorted(env.dependencies.get(docname, ()))
+            outdated = False
+            for path in paths:
+                relpath = os.path.relpath(str(path))
+                if relpath in sources:
+                    outdated = relpath in changed
+                else:
+                    try:
+                        outdated = os.stat(str(path)).st_mtime_ns // 1000 > read_time
+                    except OSError:
+                        outdated = True
+                if outdated:
+                    break
+            env.all_docs[docname] = 0 if outdated else now
+        tmp_path = env_path.with_name('.{}.{}.tmp'.format(env_path.name, os.getpid()))
+        with open(str(tmp_path), 'wb') as f:
+            pickle.dump(env, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(str(tmp_path), str(env_path))
+
+    def publish(self, docs_dir, doctree_dir):
+        """Add the environment and doctrees in ``doctree_dir`` to the cache."""
+        doctree_dir = Path(doctree_dir)
+        if not (doctree_dir / 'environment.pickle').exists():
+            return
+        env_key = environment_key(docs_dir)
+        sources = self.sources(docs_dir)
+        source_key = text_digest(json.dumps(sources, sort_keys=True))
+        key = text_digest(env_key + source_key)
+        object_path = self.objects_dir / (key + '.tar.gz')
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        if object_path.exists():
+            os.utime(str(object_path))
+        else:
+            tmp_path = object_path.with_name('.{}.{}.tmp'.format(key, os.getpid()))
+            with tarfile.open(str(tmp_path), 'w:gz') as tar:
+                for path in sorted(doctree_dir.iterdir()):
+                    tar.add(str(path), arcname=path.name)
+            os.replace(str(tmp_path), str(object_path))
+
+        entry = dict(object=object_path.name, created=time.time(), sources=sources,
+                     project_dir=os.getcwd(), srcdir=str(Path(docs_dir).resolve()))
+        entries_dir = self.entries_dir(env_key)
+        entries_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = entries_dir / (key + '.json')
+        tmp_path = entry_path.with_name('.{}.{}.tmp'.format(key, os.getpid()))
+        tmp_path.write_text(json.dumps(entry, sort_keys=True))
+        os.replace(str(tmp_path), str(entry_path))
+        self._log('build cache: stored {}'.format(object_path.name))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used tarballs, until the cache fits in
+        ``max_size`` bytes. The most recently used tarball is always kept."""
+        objects = []
+        for path in self.objects_dir.glob('*.tar.gz'):
+            stat = path.stat()
+            objects.append((stat.st_mtime, stat.st_size, path))
+        objects.sort()
+        total = sum(size for _, size, _ in objects)
+        removed = set()
+        for _, size, path in objects[:-1]:
+            if total <= self.max_size:
+                break
+            path.unlink()
+            removed.add(path.name)
+            total -= size
+        if not removed:
+            return
+        for entry_path in (self.cache_dir / 'entries').glob('*/*.json'):
+            if entry_path.stem + '.tar.gz' in removed:
+                entry_path.unlink()
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
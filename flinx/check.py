@@ -0,0 +1,109 @@
+"""Detect whether the documentation is out of date, without running Sphinx.
+
+After each successful build, the digests of the generated files, the project
+metadata, and the digests of the source files are recorded in a manifest in
+the build directory. ``check`` computes these again and compares them.
+
+The generated files are rendered, but not written, using only cached
+intersphinx inventories. Source files whose size and modification time match
+the manifest aren't read again. Sphinx isn't imported.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from .digests import project_sources, stat_digests, text_digest
+from .generation import GENERATED_TEXT, render_template_files
+from .project_metadata import ProjectMetadata
+
+BUILD_MANIFEST_NAME = '.flinx-build.json'
+
+METADATA_KEYS = ('name', 'module', 'version', 'author', 'date', 'readme')
+
+
+def manifest_path(docs_dir):
+    return Path(docs_dir) / '_build' / BUILD_MANIFEST_NAME
+
+
+def read_build_manifest(docs_dir):
+    """Return the manifest of the last build, or None if there isn't one."""
+    try:
+        return json.loads(manifest_path(docs_dir).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def project_metadata():
+    """Return the project metadata that the generated files depend on."""
+    metadata = ProjectMetadata.from_dir('.')
+    values = {}
+    for key in METADATA_KEYS:
+        try:
+            value = metadata[key]
+        except KeyError:
+            value = None
+        values[key] = None if value is None else str(value)
+    return values
+
+
+def template_digests(docs_dir):
+    """Return a dict of path to digest, of the rendered generated files.
+
+    If ``conf.py`` or ``index.rst`` has been ejected, nothing is generated, and
+    this is empty; the files are compared as sources instead.
+    """
+    docs_dir = Path(docs_dir)
+    for name in ('conf.py', 'index.rst'):
+        path = docs_dir / name
+        if path.exists() and GENERATED_TEXT not in path.read_text():
+            return {}
+    files = render_template_files(docs_dir, offline=True)
+    return {os.path.relpath(str(path), str(docs_dir)): text_digest(text)
+            for path, text in files.items()}
+
+
+def build_state(docs_dir, previous=None):
+    """Return the generated file digests, metadata, and source digests."""
+    previous = previous or {}
+    sources = stat_digests(project_sources(docs_dir), previous=previous.get('sources'))
+    return dict(templates=template_digests(docs_dir), metadata=project_metadata(),
+                sources=sources)
+
+
+def record_build(docs_dir):
+    """Record the state of the project, after a successful build."""
+    path = manifest_path(docs_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    state = build_state(docs_dir, read_build_manifest(docs_dir))
+    tmp_path = path.with_name('.{}.{}.tmp'.format(path.name, os.getpid()))
+    tmp_path.write_text(json.dumps(state, indent=1, sort_keys=True))
+    os.replace(str(tmp_path), str(path))
+
+
+def stale_reasons(docs_dir):
+    """Return a list of the reasons that the last build is out of date.
+
+    The list is empty if the build is up to date.
+    """
+    recorded = read_build_manifest(docs_dir)
+    if recorded is None:
+        return ['no build has been recorded in {}'.format(manifest_path(docs_dir))]
+    state = build_state(docs_dir, recorded)
+    reasons = []
+    for path in sorted(set(state['templates']) | set(recorded['templates'])):
+        if state['templates'].get(path) != recorded['templates'].get(path):
+            reasons.append('generated file {} has changed'.format(path))
+    for key in METADATA_KEYS:
+        old, new = recorded['metadata'].get(key), state['metadata'][key]
+        if old != new:
+            reasons.append('{} has changed from {!r} to {!r}'.format(key, old, new))
+    old_sources, new_sources = recorded['sources'], state['sources']
+    for path in sorted(set(old_sources) | set(new_sources)):
+        if path not in old_sources:
+            reasons.append('{} has been added'.format(path))
+        elif path not in new_sources:
+            reasons.append('{} has been removed'.format(path))
+        elif old_sources[path][0] != new_sources[path][0]:
+            reasons.append('{} has changed'.format(path))
+    return reasons
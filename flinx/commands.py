@@ -1,15 +1,51 @@
 import inspect
-import subprocess
+import os
+import shutil
 import sys
+import time
 import webbrowser
 from functools import wraps
 from pathlib import Path
 
 import click
 
-from sphinx.cmd.build import main as sphinx_build
-
+from . import profiling
+from .check import record_build, stale_reasons
 from .generation import write_template_files
+from .scratch import default_scratch_dir, prepare_scratch_dir
+
+
+# If set, this is called with the ``sphinx-build`` arguments in place of
+# Sphinx's ``main``. The daemon uses this to keep Sphinx applications alive.
+build_runner = None
+
+
+def sphinx_build(args):
+    """Run ``sphinx-build`` in-process.
+
+    Sphinx is imported here, rather than at module level, so that commands that
+    don't build don't pay for importing it.
+
+    When profiling, documents are read serially, so that the time to read each
+    one can be recorded.
+    """
+    with profiling.phase('import sphinx'):
+        if build_runner is not None:
+            main = build_runner
+        else:
+            from sphinx.cmd.build import main
+    if profiling.profiler is not None and '-j' in args:
+        i = args.index('-j')
+        args = args[:i] + args[i + 2:]
+    with profiling.phase('sphinx-build'):
+        return main(args)
+
+
+def timed_sphinx_build(args):
+    """Run ``sphinx-build``, and return its exit status and wall time."""
+    start = time.perf_counter()
+    status = sphinx_build(args)
+    return status, time.perf_counter() - start
 
 
 def generation_options(verbose=True):
@@ -20,6 +56,8 @@ def generation_options(verbose=True):
         @click.option('--unless-exists', is_flag=True,
                       help="Skip conf.py and index.rst generation without error, "
                       "if non-generated files exists.")
+        @click.option('--offline', is_flag=True,
+                      help="Use only cached and local intersphinx inventories.")
         @click.option('--verbose', is_flag=True, default=verbose)
         @wraps(f)
         def wrapper(*args, **kwargs):
@@ -37,44 +75,227 @@ def cli():
 
 @cli.command()
 @generation_options(verbose=True)
-def generate(force=False, unless_exists=False, verbose=False):
+def generate(force=False, offline=False, unless_exists=False, verbose=False):
     """Write the generated files."""
     docs_dir = Path('./docs')
-    write_template_files(docs_dir, force=force, unless_exists=unless_exists,
-                         verbose=verbose)
+    write_template_files(docs_dir, force=force, offline=offline,
+                         unless_exists=unless_exists, verbose=verbose)
 
 
 @cli.command()
 @generation_options(verbose=True)
-def eject(force=False, unless_exists=False, verbose=False):
+def eject(force=False, offline=False, unless_exists=False, verbose=False):
     """Write the generated files, without header warnings."""
     docs_dir = Path('./docs')
     write_template_files(docs_dir, force=force, include_generated_warning=False,
-                         unless_exists=unless_exists, verbose=verbose)
+                         offline=offline, unless_exists=unless_exists,
+                         verbose=verbose)
 
 
-def build_sphinx_args(all_files=False,
-                      force=False,
-                      fmt='html',
-                      unless_exists=False,
-                      verbose=False,
-                      **args):
-    """Translate shared options into a new set of options, and write templates."""
-    docs_dir = Path('./docs')
-    build_dir = docs_dir / '_build' / fmt
-    write_template_files(docs_dir, force=force, unless_exists=unless_exists,
-                         verbose=verbose)
+def sphinx_args(fmt, docs_dir, build_dir, all_files=False, verbose=False,
+                doctree_dir=None, config=None):
+    """Return the ``sphinx-build`` arguments that build ``fmt`` into ``build_dir``.
+
+    ``config`` is a dict of configuration values that override ``conf.py``.
+    """
     args = [
         '-b', fmt,
         '-c', str(docs_dir),  # config file directory
         '-j', 'auto',  # processors
     ]
+    if doctree_dir:
+        args += ['-d', str(doctree_dir)]
+    for name, value in sorted((config or {}).items()):
+        args += ['-D', '{}={}'.format(name, value)]
     if not verbose:
         args += ['-q']
     if all_files:
         args += ['-a']
     args += [str(docs_dir), str(build_dir), ]
-    return dict(build_args=args, build_dir=build_dir, docs_dir=docs_dir)
+    return args
+
+
+def resolve_docs_dir(out_of_tree=False, scratch_dir=None, verbose=False):
+    """Return the project's documentation directory, and the directory that is
+    built.
+
+    With ``out_of_tree`` or ``scratch_dir``, the documentation sources are
+    mirrored into the scratch directory, and that is built.
+    """
+    source_dir = docs_dir = Path('./docs')
+    if out_of_tree or scratch_dir:
+        docs_dir = prepare_scratch_dir(scratch_dir or default_scratch_dir(),
+                                       source_dir, verbose=verbose)
+    return source_dir, docs_dir
+
+
+def scratch_options(f):
+    """Add the options that choose a scratch directory to build in."""
+    @click.option('--out-of-tree', is_flag=True,
+                  help='Write the generated files and builds to a scratch '
+                  'directory, instead of to ./docs.')
+    @click.option('--scratch-dir', type=click.Path(file_okay=False),
+                  help='The scratch directory, with --out-of-tree. Defaults to a '
+                  'directory in ~/.cache/flinx.')
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+def build_sphinx_args(all_files=False,
+                      config=None,
+                      force=False,
+                      fmt='html',
+                      offline=False,
+                      out_of_tree=False,
+                      scratch_dir=None,
+                      unless_exists=False,
+                      verbose=False,
+                      **args):
+    """Translate shared options into a new set of options, and write templates.
+
+    ``fmt`` is a comma-separated list of formats. ``builds`` holds the format,
+    build directory, and arguments for each of them; ``build_args`` and
+    ``build_dir`` are those of the first format. ``config`` is a dict of
+    configuration values that override ``conf.py``.
+
+    With ``out_of_tree`` or ``scratch_dir``, the documentation sources are
+    mirrored into the scratch directory, and the generated files and builds are
+    written there. ``source_dir`` is the project's documentation directory, and
+    ``docs_dir`` the directory that is built.
+    """
+    source_dir, docs_dir = resolve_docs_dir(out_of_tree, scratch_dir, verbose=verbose)
+    write_template_files(docs_dir, force=force, offline=offline,
+                         unless_exists=unless_exists, verbose=verbose)
+    builds = []
+    for name in fmt.split(','):
+        build_dir = docs_dir / '_build' / name
+        builds.append(dict(fmt=name, build_dir=build_dir,
+                           build_args=sphinx_args(name, docs_dir, build_dir,
+                                                  all_files=all_files,
+                                                  verbose=verbose,
+                                                  config=config)))
+    return dict(build_args=builds[0]['build_args'], build_dir=builds[0]['build_dir'],
+                builds=builds, docs_dir=docs_dir, source_dir=source_dir)
+
+
+def build_formats(builds, docs_dir, read_config=None, verbose=False):
+    """Build several formats from a single reading of the sources.
+
+    The ``dummy`` builder reads the sources and pickles the environment once,
+    with the configuration overrides in ``read_config``. Each format's build
+    directory is seeded with a copy of that environment, so the formats only
+    run their writer phases, which run in parallel.
+
+    Prints the wall time of each format, and returns the first non-zero exit
+    status, or 0 if every format succeeded.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    doctree_dir = docs_dir / '_build' / 'doctrees'
+    status = sphinx_build(sphinx_args('dummy', docs_dir, docs_dir / '_build' / 'dummy',
+                                      verbose=verbose, doctree_dir=doctree_dir,
+                                      config=read_config))
+    if status:
+        return status
+    for spec in builds:
+        shutil.copytree(str(doctree_dir), str(spec['build_dir'] / '.doctrees'),
+                        dirs_exist_ok=True)
+    with ProcessPoolExecutor(max_workers=len(builds)) as executor:
+        results = list(executor.map(timed_sphinx_build,
+                                    [spec['build_args'] for spec in builds]))
+    for spec, (status, seconds) in zip(builds, results):
+        print('{:<12} {:>8.2f}s  {}'.format(spec['fmt'], seconds,
+                                            'failed' if status else 'ok'))
+    return next((status for status, _ in results if status), 0)
+
+
+def run_builds(build_args, builds, docs_dir, cache_dir=None, cache_size=None,
+               compress=False, fingerprint=False, search_shards=False,
+               read_config=None, verbose=False):
+    """Build each format, and return the first non-zero exit status, or 0.
+
+    With ``read_config``, the sources are read once by ``build_formats``, with
+    these configuration overrides, even if there is only one format.
+
+    With ``cache_dir``, the environment is restored from the build cache before
+    the build, and added to it after a successful build. ``cache_size`` is the
+    cache's maximum size in MiB.
+
+    With ``compress``, ``fingerprint``, or ``search_shards``, the output of the
+    HTML formats is post-processed for static hosting. After a successful build,
+    each build directory's manifest, and its list of changed files, are updated,
+    and the state of the project is recorded for ``check``.
+    """
+    from .publish import format_changes, update_manifest
+    multiple = builds and (len(builds) > 1 or read_config)
+    cache = None
+    if cache_dir:
+        from .build_cache import DEFAULT_MAX_SIZE, BuildCache
+        max_size = cache_size * 2 ** 20 if cache_size else DEFAULT_MAX_SIZE
+        cache = BuildCache(cache_dir, max_size, verbose=verbose)
+        doctree_dir = (docs_dir / '_build' / 'doctrees' if multiple
+                       else builds[0]['build_dir'] / '.doctrees')
+        with profiling.phase('restore build cache'):
+            cache.restore(docs_dir, doctree_dir)
+    if multiple:
+        status = build_formats(builds, docs_dir, read_config=read_config,
+                               verbose=verbose)
+    else:
+        status = sphinx_build(build_args)
+    if cache and not status:
+        with profiling.phase('publish build cache'):
+            cache.publish(docs_dir, doctree_dir)
+    if (compress or fingerprint or search_shards) and not status:
+        from .postprocess import HTML_FORMATS, postprocess
+        for spec in builds or []:
+            if spec['fmt'] not in HTML_FORMATS:
+                continue
+            with profiling.phase('post-process ' + spec['fmt']):
+                changed = postprocess(spec['build_dir'], compress=compress,
+                                      fingerprint=fingerprint,
+                                      search_shards=search_shards)
+            if verbose:
+                print('Post-processed {} changed file(s) in {}'.format(
+                    changed, spec['build_dir']))
+    if not status:
+        for spec in builds or []:
+            with profiling.phase('output manifest'):
+                changes = update_manifest(spec['build_dir'])
+            if verbose:
+                print('{}: {}'.format(spec['fmt'], format_changes(changes)))
+        if (docs_dir / '_build').is_dir():
+            with profiling.phase('build manifest'):
+                record_build(docs_dir)
+    return status
+
+
+def shard_build_args(docs_dir, shard, timings=None, all_files=False, verbose=False):
+    """Return the ``sphinx-build`` arguments that read one shard of the documents.
+
+    ``shard`` is a pair of the shard's index and the number of shards. The
+    environment and doctrees are written to ``docs/_build/shards/INDEX``.
+    """
+    from .sharding import SHARDS_DIR, TIMINGS_PATH
+    index, count = shard
+    shard_dir = docs_dir / SHARDS_DIR / str(index)
+    timings = Path(timings) if timings else docs_dir / TIMINGS_PATH
+    return sphinx_args('dummy', docs_dir, shard_dir / 'dummy', all_files=all_files,
+                       verbose=verbose, doctree_dir=shard_dir / 'doctrees',
+                       config=dict(flinx_shard='{}/{}'.format(index, count),
+                                   flinx_shard_timings=timings.resolve()))
+
+
+def parse_shard_option(ctx, param, value):
+    """Convert a ``--shard`` value to a pair of the index and count."""
+    from .sharding import parse_shard
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 def with_sphinx_build_args(f):
@@ -84,7 +305,8 @@ def with_sphinx_build_args(f):
     @click.option('-o', '--open-url', is_flag=True,
                   help='Open the HTML index in a browser.')
     @click.option('--format', 'fmt', default='html',
-                  help='The output format.')
+                  help='The output format, or a comma-separated list of formats.')
+    @scratch_options
     @generation_options(verbose=False)
     @wraps(f)
     def wrapper(**kwargs):
@@ -109,26 +331,284 @@ def with_sphinx_build_args(f):
     return wrapper
 
 
+def build_project(options):
+    """Build the documentation for the project in the current directory.
+
+    ``options`` are the command-line options of ``build``. Returns the exit
+    status.
+    """
+    build_args = build_sphinx_args(**options)
+    if options.get('shard'):
+        return sphinx_build(shard_build_args(
+            build_args['docs_dir'], options['shard'], options.get('timings'),
+            all_files=options.get('all_files', False),
+            verbose=options.get('verbose', False)))
+    return run_builds(build_args['build_args'], build_args['builds'],
+                      build_args['docs_dir'], cache_dir=options.get('cache_dir'),
+                      cache_size=options.get('cache_size'),
+                      compress=options.get('compress', False),
+                      fingerprint=options.get('fingerprint', False),
+                      search_shards=options.get('search_shards', False),
+                      verbose=options.get('verbose', False))
+
+
+def with_workspace_option(f):
+    """Decorate a build command to build each package in a workspace instead."""
+    @click.option('--workspace', type=click.Path(exists=True, file_okay=False),
+                  help='Build the documentation of each package beneath this '
+                  'directory.')
+    @click.option('-j', '--jobs', type=int, default=None,
+                  help='The number of packages to build at once, with --workspace.')
+    @wraps(f)
+    def wrapper(workspace=None, jobs=None, **kwargs):
+        if workspace is None:
+            return f(**kwargs)
+        from .workspace import find_packages, print_summary, run_packages
+        packages = find_packages(workspace)
+        if not packages:
+            raise click.ClickException("no packages found in {}".format(workspace))
+        results = run_packages(build_project, packages, kwargs, jobs=jobs)
+        print_summary(results, workspace)
+        sys.exit(1 if any(result['status'] for result in results) else 0)
+    return wrapper
+
+
+def with_refs_option(f):
+    """Decorate a build command to build several git refs of the project instead."""
+    @click.option('--refs', metavar='A..B',
+                  help='Build these git refs, and write a site with a version '
+                  'selector to docs/_build/versions. A..B is A, the tags between '
+                  'A and B, and B; or list the refs, separated by commas.')
+    @wraps(f)
+    def wrapper(refs=None, **kwargs):
+        if refs is None:
+            return f(**kwargs)
+        if kwargs.get('workspace'):
+            raise click.UsageError('--refs and --workspace are exclusive')
+        from .versions import build_refs
+        jobs = kwargs.pop('jobs', None)
+        kwargs.pop('workspace', None)
+        sys.exit(build_refs(refs, kwargs, jobs=jobs))
+    return wrapper
+
+
+def with_profile_option(f):
+    """Decorate a command to record and report the time and memory of its phases."""
+    @click.option('--profile', is_flag=True,
+                  help='Print the time and peak memory of each phase of the build.')
+    @click.option('--profile-output', type=click.Path(dir_okay=False),
+                  help='Write the profile as a Chrome trace (JSON) to this file.')
+    @wraps(f)
+    def wrapper(profile=False, profile_output=None, **kwargs):
+        if not (profile or profile_output):
+            return f(**kwargs)
+        profiling.profiler = profiler = profiling.Profiler()
+        try:
+            return f(**kwargs)
+        finally:
+            profiling.profiler = None
+            profiler.print_summary()
+            if profile_output:
+                profiler.write_trace(profile_output)
+    return wrapper
+
+
 @cli.command()
+@click.option('--cache-dir', type=click.Path(file_okay=False),
+              help='Restore the Sphinx environment from, and save it to, this '
+              'shared build cache.')
+@click.option('--cache-size', type=int,
+              help='The maximum size of the build cache, in MiB (default 1024).')
+@click.option('--compress', is_flag=True,
+              help='Write gzip (and brotli) compressed copies of the HTML output.')
+@click.option('--fingerprint', is_flag=True,
+              help='Copy static assets to content-addressed names, and refer to '
+              'those from the HTML output.')
+@click.option('--search-shards', is_flag=True,
+              help='Split the HTML search index into files that are loaded as '
+              'queries need them.')
+@click.option('--shard', metavar='I/N', callback=parse_shard_option,
+              help='Only read the I-th of N subsets of the documents, for flinx '
+              'merge.')
+@click.option('--timings', type=click.Path(dir_okay=False),
+              help='The per-document read times that --shard divides the '
+              'documents by. Defaults to docs/_build/.flinx-timings.json.')
+@with_profile_option
+@with_refs_option
+@with_workspace_option
 @with_sphinx_build_args
-def build(build_args=None, docs_dir=None, build_dir=None, fmt=None, open_url=False):
+def build(build_args=None, builds=None, docs_dir=None, build_dir=None, fmt=None,
+          open_url=False, verbose=False, all_files=False, cache_dir=None,
+          cache_size=None, compress=False, fingerprint=False, search_shards=False,
+          shard=None, timings=None):
     """Use sphinx-build to build the documentation."""
-    status = sphinx_build(build_args)
+    if shard:
+        status = sphinx_build(shard_build_args(docs_dir, shard, timings,
+                                               all_files=all_files, verbose=verbose))
+        if status:
+            sys.exit(status)
+        return
+    status = run_builds(build_args, builds, docs_dir, cache_dir=cache_dir,
+                        cache_size=cache_size, compress=compress,
+                        fingerprint=fingerprint, search_shards=search_shards,
+                        verbose=verbose)
+    if status:
+        sys.exit(status)
+    html_dirs = [spec['build_dir'] for spec in builds or [] if spec['fmt'] == 'html']
+    if open_url and html_dirs:
+        webbrowser.open(str(html_dirs[0] / 'index.html'))
+
+
+@cli.command()
+@click.argument('shard_dirs', nargs=-1, type=click.Path(exists=True, file_okay=False))
+@click.option('--timings', type=click.Path(dir_okay=False),
+              help='Write the per-document read times to this file, for the next '
+              'build --shard. Defaults to docs/_build/.flinx-timings.json.')
+@with_sphinx_build_args
+def merge(shard_dirs=(), builds=None, docs_dir=None, open_url=False, timings=None,
+          verbose=False):
+    """Merge the shards read by build --shard, and write each format.
+
+    SHARD_DIRS defaults to the directories in docs/_build/shards.
+    """
+    from .sharding import SHARDS_DIR, TIMINGS_PATH
+    shard_dirs = [Path(path) for path in shard_dirs] or \
+        sorted((docs_dir / SHARDS_DIR).glob('*'))
+    if not shard_dirs:
+        raise click.ClickException('no shards found in {}'.format(
+            docs_dir / SHARDS_DIR))
+    for path in shard_dirs:
+        if not (path / 'doctrees' / 'environment.pickle').is_file():
+            raise click.ClickException("{} isn't a shard".format(path))
+    timings = Path(timings) if timings else docs_dir / TIMINGS_PATH
+    # every document is new to the merged environment
+    for spec in builds:
+        if '-a' not in spec['build_args']:
+            spec['build_args'].insert(0, '-a')
+    config = dict(flinx_shard_merge=os.pathsep.join(
+        str((path / 'doctrees').resolve()) for path in shard_dirs),
+        flinx_shard_timings=timings.resolve())
+    status = run_builds(builds[0]['build_args'], builds, docs_dir, read_config=config,
+                        verbose=verbose)
     if status:
         sys.exit(status)
-    if open_url and fmt == 'html':
-        webbrowser.open(str(build_dir / 'index.html'))
+    html_dirs = [spec['build_dir'] for spec in builds if spec['fmt'] == 'html']
+    if open_url and html_dirs:
+        webbrowser.open(str(html_dirs[0] / 'index.html'))
 
 
 @cli.command()
+@click.option('--host', default='127.0.0.1', help='The address to serve on.')
+@click.option('--port', type=int, default=8000, help='The port to serve on.')
 @with_sphinx_build_args
-def serve(build_args=None, open_url=False):
-    """Use sphinx-autobuild to build and serve the documentation."""
-    if open_url:
-        build_args += ['-B']
-    process = subprocess.run(['sphinx-autobuild'] + build_args)
-    if process.returncode:
-        sys.exit(process.returncode)
+def serve(docs_dir=None, build_dir=None, source_dir=None, fmt='html',
+          all_files=False, open_url=False, verbose=False, host='127.0.0.1',
+          port=8000):
+    """Build and serve the documentation, and rebuild it when it changes."""
+    if fmt != 'html':
+        raise click.UsageError('serve only builds the html format')
+    from .server import serve as serve_docs
+    serve_docs(docs_dir, build_dir, host=host, port=port, open_url=open_url,
+               source_dir=source_dir, all_files=all_files, verbose=verbose)
+
+
+@cli.command()
+@scratch_options
+def check(out_of_tree=False, scratch_dir=None):
+    """Exit with a non-zero status if the documentation is out of date.
+
+    This compares the generated files, project metadata, and sources with those
+    of the last build, without running Sphinx.
+    """
+    _, docs_dir = resolve_docs_dir(out_of_tree, scratch_dir)
+    reasons = stale_reasons(docs_dir)
+    for reason in reasons:
+        print(reason)
+    if reasons:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('-a', '--all', 'all_units', is_flag=True,
+              help='Test every module and page, regardless of what has changed.')
+@click.option('-j', '--jobs', type=int, default=None,
+              help='The number of modules and pages to test at once.')
+@click.option('--junit-xml', type=click.Path(dir_okay=False),
+              help='Write the results to this file, as JUnit XML.')
+@click.option('--verbose', is_flag=True)
+def test(all_units=False, jobs=None, junit_xml=None, verbose=False):
+    """Run the doctests of the modules and pages that changed since they passed."""
+    from .doctests import run_doctests
+    if not run_doctests(Path('./docs'), all_units=all_units, jobs=jobs,
+                        junit_xml=junit_xml, verbose=verbose):
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--build-dir', type=click.Path(file_okay=False),
+              default='docs/_build/html', show_default=True,
+              help='The HTML build directory whose links to check.')
+@click.option('-a', '--all', 'all_pages', is_flag=True,
+              help='Check the links in every page, regardless of what has changed.')
+@click.option('--connections', type=int,
+              help='The maximum number of connections to each host (default 4).')
+@click.option('--rate', type=float,
+              help='The maximum number of requests per second to each host '
+              '(default 10).')
+@click.option('--verbose', is_flag=True)
+def linkcheck(build_dir, all_pages=False, connections=None, rate=None, verbose=False):
+    """Check the external links in the pages that changed since they were checked."""
+    from .linkcheck import DEFAULT_CONNECTIONS, DEFAULT_RATE, check_links
+    if not Path(build_dir).is_dir():
+        raise click.ClickException("{} doesn't exist; run flinx build first".format(
+            build_dir))
+    if check_links(build_dir, all_pages=all_pages,
+                   connections=connections or DEFAULT_CONNECTIONS,
+                   rate=rate or DEFAULT_RATE, verbose=verbose):
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--to', 'dest_dir', required=True, type=click.Path(file_okay=False),
+              help='The directory to publish to.')
+@click.option('--build-dir', type=click.Path(exists=True, file_okay=False),
+              default='docs/_build/html', show_default=True,
+              help='The build directory to publish.')
+@click.option('--verbose', is_flag=True)
+def publish(dest_dir, build_dir, verbose=False):
+    """Copy the files that changed since the last publish to a directory."""
+    from .publish import format_changes, publish as publish_build
+    changes = publish_build(build_dir, dest_dir, verbose=verbose)
+    print('Published {}: {}'.format(build_dir, format_changes(changes)))
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False),
+              help='The socket to listen on. Defaults to one in $XDG_RUNTIME_DIR.')
+@click.option('--idle-timeout', type=float,
+              help='Exit after this many idle seconds (default 1800).')
+def daemon(socket_path=None, idle_timeout=None):
+    """Run commands for ``flinx client``, keeping Sphinx loaded between them."""
+    from .daemon import DEFAULT_IDLE_TIMEOUT, Daemon
+    server = Daemon(socket_path, idle_timeout=idle_timeout or DEFAULT_IDLE_TIMEOUT)
+    try:
+        server.serve()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+
+@cli.command(context_settings=dict(ignore_unknown_options=True))
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False),
+              help="The daemon's socket.")
+@click.argument('args', nargs=-1, type=click.UNPROCESSED)
+def client(args, socket_path=None):
+    """Run ``flinx ARGS`` in the daemon."""
+    from .daemon import send_request
+    try:
+        status = send_request(args, socket_path)
+    except ConnectionError as e:
+        raise click.ClickException('{}; start one with flinx daemon'.format(e))
+    sys.exit(status)
 
 
 if __name__ == '__main__':
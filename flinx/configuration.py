@@ -3,11 +3,46 @@ from pathlib import Path
 
 import pytoml as toml
 
+# Parsed TOML documents, indexed by resolved path. Each entry is a
+# ``((mtime_ns, size), document)`` pair; the stat key invalidates the entry when
+# the file changes, so long-running commands such as ``serve`` see edits.
+_toml_cache = {}
+
+
+def read_toml(path):
+    """Return the parsed contents of a TOML file.
+
+    The parsed document is shared between callers, and must not be modified.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cached = _toml_cache.get(path)
+    if cached and cached[0] == stat_key:
+        return cached[1]
+    document = toml.loads(path.read_text())
+    _toml_cache[path] = (stat_key, document)
+    return document
+
 
 def get_sphinx_configuration(project_dir):
     """Read the Sphinx configuration from ``pyproject.toml```."""
     try:
-        project = toml.loads((Path(project_dir) / 'pyproject.toml').read_text())
-        return reduce(lambda a, b: a[b], 'tool.flinx.configuration'.split('.'), project)
+        project = read_toml(Path(project_dir) / 'pyproject.toml')
+        config = reduce(lambda a, b: a[b], ['tool', 'flinx', 'configuration'], project)
+        return dict(config)
+    except (FileNotFoundError, KeyError):
+        return {}
+
+
+def get_flinx_options(project_dir):
+    """Read Flinx's own options from the ``[tool.flinx]`` table of ``pyproject.toml``.
+
+    The ``configuration`` and ``metadata`` sub-tables aren't included.
+    """
+    try:
+        project = read_toml(Path(project_dir) / 'pyproject.toml')
+        options = project['tool']['flinx']
     except (FileNotFoundError, KeyError):
         return {}
+    return {k: v for k, v in options.items() if k not in ('configuration', 'metadata')}
@@ -0,0 +1,279 @@
+"""A long-lived process that runs Flinx commands with warm state.
+
+``flinx daemon`` listens on a Unix socket. ``flinx client ARGS`` sends the
+arguments and working directory to it, and prints the output that it streams
+back. Between requests, the daemon keeps Sphinx and Jinja imported, the parsed
+``pyproject.toml`` files and compiled templates cached, and a Sphinx
+application for each project and set of build arguments, so that a repeated
+build is incremental and skips loading extensions and the environment.
+
+Commands change the working directory and ``sys.stdout``, so requests are
+accepted concurrently but run one at a time, in the order that they acquire the
+process lock. The daemon exits when it has been idle for a timeout.
+
+The protocol is one JSON object per line. The client sends
+``{"cwd": ..., "args": [...]}``; the daemon replies with any number of
+``{"stdout": text}`` and ``{"stderr": text}`` objects, and then
+``{"status": n}``.
+"""
+
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+# These commands don't make sense in the daemon.
+UNSUPPORTED_COMMANDS = {'client', 'daemon', 'serve'}
+
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+
+
+def default_socket_path():
+    """Return the daemon's socket path, in the XDG runtime or cache directory."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'flinx' / 'daemon.sock'
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return Path(cache_home) / 'flinx' / 'daemon.sock'
+
+
+class MessageStream(object):
+    """A text stream that sends each write to the client as a message."""
+
+    def __init__(self, wfile, name):
+        self.wfile = wfile
+        self.name = name
+
+    def write(self, text):
+        # click probes for binary streams by writing b''
+        if not isinstance(text, str):
+            raise TypeError('write() argument must be str')
+        if text:
+            self.wfile.write(json.dumps({self.name: text}).encode() + b'\n')
+        return len(text)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def isatty(self):
+        return False
+
+
+class CurrentStream(object):
+    """A text stream that writes to whichever stream ``sys.stdout`` or
+    ``sys.stderr`` is at the time.
+
+    A Sphinx application keeps the streams that it was created with, but the
+    daemon redirects the standard streams to each request's client.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def write(self, text):
+        return getattr(sys, self.name).write(text)
+
+    def flush(self):
+        getattr(sys, self.name).flush()
+
+    def isatty(self):
+        return False
+
+
+class SphinxApps(object):
+    """Sphinx applications that are kept alive between builds, for each working
+    directory and set of ``sphinx-build`` arguments.
+
+    An application is re-created if its ``conf.py`` has changed. The project's
+    modules are removed from ``sys.modules`` before each build, so that autodoc
+    imports their current source.
+    """
+
+    def __init__(self):
+        self.apps = {}
+
+    def build(self, args):
+        """Build with ``sphinx-build`` arguments, and return the exit status."""
+        from sphinx.application import Sphinx
+        from sphinx.cmd.build import get_parser
+        from sphinx.util import logging
+
+        from .server import purge_modules
+
+        options = get_parser().parse_args(args)
+        key = (os.getcwd(), tuple(args))
+        conf_path = Path(options.confdir or options.sourcedir) / 'conf.py'
+        try:
+            conf_mtime = conf_path.stat().st_mtime_ns
+        except OSError:
+            conf_mtime = None
+        app, app_conf_mtime = self.apps.get(key, (None, None))
+        if app is None or app_conf_mtime != conf_mtime:
+            doctree_dir = options.doctreedir or os.path.join(options.outputdir,
+                                                             '.doctrees')
+            try:
+                app = Sphinx(options.sourcedir, options.confdir or options.sourcedir,
+                             options.outputdir, doctree_dir, options.builder,
+                             status=None if options.quiet else CurrentStream('stdout'),
+                             warning=CurrentStream('stderr'), parallel=options.jobs)
+            except Exception as e:
+                sys.stderr.write('Build failed: {}\n'.format(e))
+                return 2
+            self.apps[key] = (app, conf_mtime)
+        purge_modules('.')
+        # Sphinx's log handlers are global, and refer to the last application
+        logging.setup(app, app._status, app._warning,
+                      verbosity=getattr(app, 'verbosity', 0))
+        try:
+            app.build(force_all=options.force_all)
+        except Exception as e:
+            sys.stderr.write('Build failed: {}\n'.format(e))
+            del self.apps[key]
+            return 2
+        return app.statuscode
+
+
+class Daemon(object):
+    """Run Flinx commands for clients, until idle for ``idle_timeout`` seconds."""
+
+    def __init__(self, socket_path=None, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.idle_timeout = idle_timeout
+        self.sphinx_apps = SphinxApps()
+        # serializes commands, which share the working directory and sys.stdout
+        self.process_lock = threading.Lock()
+        self.last_request = time.monotonic()
+        self.active = 0
+        self.active_lock = threading.Lock()
+        self.server = None
+
+    def run_command(self, cwd, args, wfile):
+        """Run the ``flinx`` command ``args`` in ``cwd``, and return its exit status.
+
+        Output is streamed to ``wfile``.
+        """
+        from click.exceptions import Abort, ClickException
+
+        from . import commands
+        from .git_config import read_git_config
+
+        if args and args[0] in UNSUPPORTED_COMMANDS:
+            wfile.write(json.dumps({'stderr': "flinx {} can't run in the daemon\n"
+                                    .format(args[0])}).encode() + b'\n')
+            return 2
+        with self.process_lock:
+            previous_dir = os.getcwd()
+            status = 0
+            with contextlib.redirect_stdout(MessageStream(wfile, 'stdout')), \
+                    contextlib.redirect_stderr(MessageStream(wfile, 'stderr')):
+                try:
+                    os.chdir(cwd)
+                    # the git configuration isn't keyed by modification time
+                    read_git_config.cache_clear()
+                    commands.build_runner = self.sphinx_apps.build
+                    commands.cli.main(args=args, prog_name='flinx',
+                                      standalone_mode=False)
+                except ClickException as e:
+                    e.show()
+                    status = e.exit_code
+                except Abort:
+                    status = 1
+                except SystemExit as e:
+                    status = e.code if isinstance(e.code, int) else int(bool(e.code))
+                except Exception as e:
+                    sys.stderr.write('{}: {}\n'.format(type(e).__name__, e))
+                    status = 1
+                finally:
+                    commands.build_runner = None
+                    os.chdir(previous_dir)
+            return status
+
+    def handle(self, rfile, wfile):
+        """Read a request from ``rfile``, run it, and write the response."""
+        with self.active_lock:
+            self.active += 1
+        try:
+            request = json.loads(rfile.readline())
+            status = self.run_command(request['cwd'], request['args'], wfile)
+            wfile.write(json.dumps({'status': status}).encode() + b'\n')
+        finally:
+            with self.active_lock:
+                self.active -= 1
+                self.last_request = time.monotonic()
+
+    def watch_idle(self):
+        """Shut the server down once it has been idle for the timeout."""
+        while True:
+            time.sleep(min(1.0, self.idle_timeout / 4))
+            if not self.active and \
+                    time.monotonic() - self.last_request > self.idle_timeout:
+                self.server.shutdown()
+                return
+
+    def serve(self):
+        """Listen for requests, until idle for the timeout."""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.handle(self.rfile, self.wfile)
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            if is_listening(self.socket_path):
+                raise RuntimeError('a daemon is already listening on {}'.format(
+                    self.socket_path))
+            self.socket_path.unlink()
+        self.server = socketserver.ThreadingUnixStreamServer(str(self.socket_path),
+                                                             Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.watch_idle, daemon=True).start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+
+def is_listening(socket_path):
+    """Return True if a daemon is listening on ``socket_path``."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def send_request(args, socket_path=None, cwd=None, stdout=None, stderr=None):
+    """Run ``flinx args`` in the daemon, and return the exit status.
+
+    Output is written to ``stdout`` and ``stderr``. Raises ``ConnectionError``
+    if no daemon is listening.
+    """
+    stdout, stderr = stdout or sys.stdout, stderr or sys.stderr
+    socket_path = Path(socket_path or default_socket_path())
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError('no daemon is listening on {}'.format(socket_path)) \
+                from e
+        request = dict(cwd=os.path.abspath(cwd or '.'), args=list(args))
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as rfile:
+            for line in rfile:
+                message = json.loads(line)
+                if 'status' in message:
+                    return message['status']
+                for name, stream in (('stdout', stdout), ('stderr', stderr)):
+                    if name in message:
+                        stream.write(message[name])
+                        stream.flush()
+    raise ConnectionError('the daemon closed the connection')
@@ -0,0 +1,87 @@
+"""Content digests of files and of the project's sources."""
+
+import hashlib
+import os
+from pathlib import Path
+
+from .project_metadata import NoUniqueModuleError, ProjectMetadata
+from .watcher import ignored_dir_names
+
+
+def file_digest(path):
+    """Return the SHA-256 digest of a file's contents, or None if it can't be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(str(path), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    """Return the SHA-256 digest of a string."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def tree_files(root):
+    """Return the sorted paths of the files beneath ``root``.
+
+    Hidden directories and those in ``watcher.ignored_dir_names``, such as
+    ``_build``, are skipped.
+    """
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(str(root)):
+        dirnames[:] = [name for name in dirnames
+                       if not name.startswith('.') and name not in ignored_dir_names]
+        paths += [Path(dirpath) / name for name in filenames]
+    return sorted(paths)
+
+
+def project_sources(docs_dir, project_dir='.'):
+    """Return the sorted paths of the files that the documentation is built from.
+
+    These are the files in the documentation directory, the module's Python
+    files, and the README.
+    """
+    project_dir = Path(project_dir)
+    paths = set(tree_files(docs_dir))
+    metadata = ProjectMetadata.from_dir(project_dir)
+    try:
+        module_path = project_dir / metadata['module']
+        if module_path.is_dir():
+            paths.update(p for p in tree_files(module_path) if p.suffix == '.py')
+        else:
+            paths.add(module_path.with_name(module_path.name + '.py'))
+    except (KeyError, NoUniqueModuleError):
+        pass
+    readme = metadata['readme']
+    if readme:
+        paths.add(project_dir / readme)
+    return sorted(p for p in paths if p.is_file())
+
+
+def source_digests(paths, root='.'):
+    """Return a dict of path, relative to ``root``, to file digest."""
+    root = Path(root)
+    return {os.path.relpath(str(path), str(root)): file_digest(path) for path in paths}
+
+
+def stat_digests(paths, root='.', previous=None):
+    """Return a dict of path, relative to ``root``, to ``[digest, size, mtime_ns]``.
+
+    Digests in ``previous``, a dict of the same form, are re-used for files
+    whose size and modification time match, without reading the files.
+    """
+    previous = previous or {}
+    result = {}
+    for path in paths:
+        relpath = os.path.relpath(str(path), str(root))
+        stat = os.stat(str(path))
+        entry = previous.get(relpath)
+        if entry and entry[1:] == [stat.st_size, stat.st_mtime_ns]:
+            result[relpath] = entry
+        else:
+            result[relpath] = [file_digest(path), stat.st_size, stat.st_mtime_ns]
+    return result
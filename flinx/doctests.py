@@ -0,0 +1,300 @@
+"""Run the project's doctests, in parallel, and only where they could have changed.
+
+The examples in each module's docstrings, and in each documentation page and
+the README, are run with the standard library's ``doctest``, in a process pool,
+without building the documentation.
+
+A module or page is re-tested only if its source, or the source of a project
+module that it imports (directly or indirectly), has changed since it last
+passed. The key of each passing module and page is recorded in
+``docs/_build/.flinx-doctest.json``.
+"""
+
+import ast
+import doctest
+import hashlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .digests import file_digest, tree_files
+from .generation import GENERATED_TEXT
+from .project_metadata import ProjectMetadata
+from .publish import write_json
+
+RESULTS_NAME = '.flinx-doctest.json'
+
+# The same defaults as ``sphinx.ext.doctest``'s ``doctest_default_flags``.
+OPTION_FLAGS = doctest.ELLIPSIS | doctest.IGNORE_EXCEPTION_DETAIL | \
+    doctest.DONT_ACCEPT_TRUE_FOR_1
+
+DOCUMENT_SUFFIXES = ('.rst', '.txt', '.md')
+
+
+def results_path(docs_dir):
+    return Path(docs_dir) / '_build' / RESULTS_NAME
+
+
+def module_files(project_dir='.'):
+    """Return a dict of the dotted name to path, of each of the project's modules."""
+    project_dir = Path(project_dir)
+    module_name = ProjectMetadata.from_dir(project_dir)['module']
+    root = project_dir / module_name
+    if not root.is_dir():
+        return {module_name: root.with_name(module_name + '.py')}
+    modules = {}
+    for path in tree_files(root):
+        if path.suffix != '.py':
+            continue
+        parts = path.relative_to(root).with_suffix('').parts
+        if parts[-1] == '__init__':
+            parts = parts[:-1]
+        modules['.'.join((module_name,) + parts)] = path
+    return modules
+
+
+def document_files(docs_dir, project_dir='.'):
+    """Return the paths of the documentation pages and README, without the
+    generated files."""
+    paths = [path for path in tree_files(docs_dir)
+             if path.suffix in DOCUMENT_SUFFIXES]
+    paths = [path for path in paths if GENERATED_TEXT not in path.read_text()]
+    readme = ProjectMetadata.from_dir(project_dir)['readme']
+    if readme and (Path(project_dir) / readme).is_file():
+        paths.append(Path(project_dir) / readme)
+    return paths
+
+
+def imported_names(source, package=None):
+    """Return the absolute names of the modules that ``source`` imports.
+
+    ``package`` is the package that relative imports are relative to. Source
+    that doesn't parse imports nothing.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if not package:
+                    continue
+                base = package.split('.')
+                if node.level > 1:
+                    base = base[:-(node.level - 1)]
+                module = '.'.join(base + ([node.module] if node.module else []))
+            else:
+                module = node.module
+            names.add(module)
+            names.update('{}.{}'.format(module, alias.name) for alias in node.names)
+    return names
+
+
+def dependencies(names, imports, modules):
+    """Return the project modules that importing ``names`` imports.
+
+    ``imports`` is a dict of each project module's imported names. Importing a
+    submodule also imports its parent packages.
+    """
+    seen = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        parts = name.split('.')
+        for i in range(1, len(parts) + 1):
+            parent = '.'.join(parts[:i])
+            if parent in modules and parent not in seen:
+                seen.add(parent)
+                pending.extend(imports[parent])
+    return seen
+
+
+def doctest_units(docs_dir, project_dir='.'):
+    """Return the modules and pages to test, as a list of dicts.
+
+    Each has the ``name`` of the module or the path of the page, its ``kind``
+    ("module" or "document"), its ``path``, and a ``key`` that is a digest of
+    its source and those of the project modules it depends on.
+    """
+    modules = module_files(project_dir)
+    digests = {name: file_digest(path) for name, path in modules.items()}
+    imports = {}
+    for name, path in modules.items():
+        package = name if path.name == '__init__.py' else name.rpartition('.')[0]
+        imports[name] = imported_names(path.read_text(), package)
+
+    def key(digest, deps):
+        text = '\n'.join([digest] + ['{} {}'.format(dep, digests[dep])
+                                     for dep in sorted(deps)])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    units = []
+    for name, path in sorted(modules.items()):
+        units.append(dict(name=name, kind='module', path=str(path),
+                          key=key(digests[name], dependencies([name], imports,
+                                                              modules))))
+    parser = doctest.DocTestParser()
+    for path in document_files(docs_dir, project_dir):
+        text = path.read_text()
+        examples = parser.get_examples(text)
+        if not examples:
+            continue
+        names = set()
+        for example in examples:
+            names |= imported_names(example.source)
+        units.append(dict(name=os.path.relpath(str(path), str(project_dir)),
+                          kind='document', path=str(path),
+                          key=key(file_digest(path), dependencies(names, imports,
+                                                                  modules))))
+    return units
+
+
+def prepare_worker(project_dir, module_name):
+    """Import the project's modules from ``project_dir``, in a worker process.
+
+    A forked worker inherits its parent's modules, which may include another
+    copy of the project's package; these are removed.
+    """
+    project_dir = os.path.abspath(project_dir)
+    if project_dir not in sys.path:
+        sys.path.insert(0, project_dir)
+    for name in list(sys.modules):
+        if name.split('.')[0] == module_name:
+            del sys.modules[name]
+
+
+def run_unit(unit):
+    """Run the doctests of a module or page, and return the results.
+
+    This runs in a worker process, after ``prepare_worker``. The result has
+    the ``name`` of the unit, and a list of ``cases`` with the ``name``,
+    number of ``examples`` and ``failures``, failure ``output``, and
+    ``seconds`` of each docstring or page; or an ``error`` if the module
+    couldn't be imported.
+    """
+    if unit['kind'] == 'module':
+        try:
+            module = importlib.import_module(unit['name'])
+        except BaseException:
+            return dict(name=unit['name'], cases=[], error=traceback.format_exc())
+        tests = doctest.DocTestFinder().find(module, unit['name'])
+    else:
+        text = Path(unit['path']).read_text()
+        tests = [doctest.DocTestParser().get_doctest(
+            text, {'__name__': '__main__'}, unit['name'], unit['path'], 0)]
+    cases = []
+    for test in sorted(tests, key=lambda test: test.name):
+        if not test.examples:
+            continue
+        output = io.StringIO()
+        runner = doctest.DocTestRunner(verbose=False, optionflags=OPTION_FLAGS)
+        start = time.perf_counter()
+        result = runner.run(test, out=output.write, clear_globs=True)
+        cases.append(dict(name=test.name, examples=result.attempted,
+                          failures=result.failed, output=output.getvalue(),
+                          seconds=time.perf_counter() - start))
+    return dict(name=unit['name'], cases=cases, error=None)
+
+
+def passed(result):
+    return not result['error'] and not any(case['failures'] for case in result['cases'])
+
+
+def read_results(docs_dir):
+    """Return the keys of the modules and pages that last passed, by name."""
+    try:
+        recorded = json.loads(results_path(docs_dir).read_text())
+    except (OSError, ValueError):
+        return {}
+    if recorded.get('python') != platform.python_version():
+        return {}
+    return recorded.get('passed', {})
+
+
+def write_junit_xml(path, results, unchanged):
+    """Write the results, and the unchanged units as skipped, as JUnit XML."""
+    from xml.etree import ElementTree as ET
+    suites = ET.Element('testsuites', name='flinx doctest')
+    for result in results:
+        seconds = sum(case['seconds'] for case in result['cases'])
+        suite = ET.SubElement(suites, 'testsuite', name=result['name'],
+                              tests=str(len(result['cases']) + bool(result['error'])),
+                              failures=str(sum(1 for case in result['cases']
+                                               if case['failures'])),
+                              errors=str(int(bool(result['error']))), skipped='0',
+                              time='{:.3f}'.format(seconds))
+        if result['error']:
+            case = ET.SubElement(suite, 'testcase', classname=result['name'],
+                                 name=result['name'], time='0')
+            ET.SubElement(case, 'error', message='import failed').text = \
+                result['error']
+        for case in result['cases']:
+            element = ET.SubElement(suite, 'testcase', classname=result['name'],
+                                    name=case['name'],
+                                    time='{:.3f}'.format(case['seconds']))
+            if case['failures']:
+                ET.SubElement(element, 'failure', message='{} of {} examples failed'
+                              .format(case['failures'], case['examples'])).text = \
+                    case['output']
+    for name in unchanged:
+        suite = ET.SubElement(suites, 'testsuite', name=name, tests='1',
+                              failures='0', errors='0', skipped='1', time='0')
+        case = ET.SubElement(suite, 'testcase', classname=name, name=name, time='0')
+        ET.SubElement(case, 'skipped', message='unchanged since it last passed')
+    ET.ElementTree(suites).write(str(path), encoding='utf-8', xml_declaration=True)
+
+
+def run_doctests(docs_dir, all_units=False, jobs=None, junit_xml=None,
+                 verbose=False):
+    """Run the doctests that could have changed since they last passed.
+
+    With ``all_units``, every module and page is tested. Prints the failures
+    and a summary, and returns True if every test passed.
+    """
+    units = doctest_units(docs_dir)
+    previous = {} if all_units else read_results(docs_dir)
+    pending = [unit for unit in units if previous.get(unit['name']) != unit['key']]
+    unchanged = [unit['name'] for unit in units
+                 if previous.get(unit['name']) == unit['key']]
+    results = []
+    if pending:
+        workers = min(jobs or os.cpu_count() or 1, len(pending))
+        module_name = ProjectMetadata.from_dir('.')['module']
+        with ProcessPoolExecutor(max_workers=workers, initializer=prepare_worker,
+                                 initargs=('.', module_name)) as executor:
+            results = list(executor.map(run_unit, pending))
+    for result in results:
+        if result['error']:
+            print('{}: error\n{}'.format(result['name'], result['error']))
+        for case in result['cases']:
+            if case['failures']:
+                print(case['output'], end='')
+            elif verbose:
+                print('{}: {} examples passed'.format(case['name'], case['examples']))
+    if verbose:
+        for name in unchanged:
+            print('{}: unchanged'.format(name))
+    keys = {unit['name']: unit['key'] for unit in units}
+    recorded = {name: previous[name] for name in unchanged}
+    recorded.update((result['name'], keys[result['name']])
+                    for result in results if passed(result))
+    results_path(docs_dir).parent.mkdir(parents=True, exist_ok=True)
+    write_json(results_path(docs_dir),
+               dict(python=platform.python_version(), passed=recorded))
+    if junit_xml:
+        write_junit_xml(junit_xml, results, unchanged)
+    failed = [result for result in results if not passed(result)]
+    print('{} passed, {} failed, {} unchanged'.format(
+        len(results) - len(failed), len(failed), len(unchanged)))
+    return not failed
@@ -16,8 +16,17 @@ config_var_ext_prefixes = {
 # Use this, if the user doesn't specify extensions.
 default_extensions = ['autodoc']
 
+# Flinx's own Sphinx extensions, and the extension each one builds on, if any.
+# These are added to generated configurations, but not to ejected ones.
+flinx_extensions = {
+    'flinx.autodoc_cache': 'sphinx.ext.autodoc',
+    'flinx.profiling': None,
+    'flinx.sharding': None,
+    'flinx.versions': None,
+}
+
 
-def get_extensions(config_vars):
+def get_extensions(config_vars, include_flinx_extensions=False):
     """Infer the extensions from the Sphinx configuration variables."""
     # expand shortcut names
     extensions = ['sphinx.ext.' + ext
@@ -33,4 +42,9 @@ def get_extensions(config_vars):
     for ext in auto_exts:
         if ext not in extensions:
             extensions.append(ext)
+    if include_flinx_extensions:
+        for ext, prerequisite in flinx_extensions.items():
+            available = prerequisite is None or prerequisite in extensions
+            if available and ext not in extensions:
+                extensions.append(ext)
     return extensions
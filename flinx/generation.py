@@ -1,24 +1,42 @@
+import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 from click import ClickException
-from jinja2 import Environment
 
-from .configuration import get_sphinx_configuration
+from .configuration import get_flinx_options, get_sphinx_configuration
 from .extensions import get_extensions
-from .project_metadata import NoUniqueModuleError, ProjectMetadata
+from .profiling import phase
+from .project_metadata import NoUniqueModuleError, ProjectMetadata, find_submodules
 
 GENERATED_TEXT = "THIS FILE IS AUTOMATICALLY GENERATED BY FLINX. "
 "MANUAL CHANGES WILL BE LOST."
 
-env = Environment()
-env.filters['repr'] = repr
-poject_relpath = Path('..')
-env.filters['project_rel'] = lambda s: str(poject_relpath / s)
-
 TEMPLATE_DIR = Path(__file__).parent / 'templates'
-conf_tpl = env.from_string((TEMPLATE_DIR / 'conf.py.tpl').read_text())
-index_tpl = env.from_string((TEMPLATE_DIR / 'index.rst.tpl').read_text())
+
+# The directory, relative to the documentation directory, of the per-module
+# pages that the ``module-pages`` option generates.
+MODULE_PAGES_DIR = 'api'
+
+
+@lru_cache(maxsize=None)
+def get_template_environment():
+    """Return the Jinja environment, creating it on first use."""
+    from jinja2 import Environment
+    env = Environment()
+    env.filters['repr'] = repr
+    env.filters['project_rel'] = lambda s, relpath: str(Path(relpath) / s)
+    return env
+
+
+@lru_cache(maxsize=None)
+def get_template(name):
+    """Return the compiled template named ``name``.
+
+    Templates are compiled on first use, so that importing this module is cheap.
+    """
+    return get_template_environment().from_string((TEMPLATE_DIR / name).read_text())
 
 
 class NonGeneratedFileExists(ClickException):
@@ -39,54 +57,185 @@ class NonGeneratedFileExists(ClickException):
             "Use --force to overwrite.".format(str(self.path))
 
 
+def project_relpath(output_dir):
+    """Return the path of the project directory, relative to ``output_dir``."""
+    return Path(os.path.relpath('.', str(output_dir)))
+
+
+def write_if_changed(path, text):
+    """Write ``text`` to ``path``, unless the file already contains it.
+
+    Leaving an unchanged file alone preserves its mtime, so that Sphinx doesn't
+    treat an identical ``conf.py`` as a configuration change and discard its
+    pickled environment.
+
+    Returns True if the file was written.
+    """
+    try:
+        if path.read_text() == text:
+            return False
+    except FileNotFoundError:
+        pass
+    path.write_text(text)
+    return True
+
+
+def render_module_pages(output_dir, module_name, generated_text):
+    """Render a page for each submodule of ``module_name``.
+
+    Returns the list of page names, relative to ``output_dir``, and a dict of
+    path to text.
+    """
+    pages_dir = output_dir / MODULE_PAGES_DIR
+    template = get_template('module.rst.tpl')
+    pages, texts = [], {}
+    for name in find_submodules('.', module_name):
+        pages.append('{}/{}'.format(MODULE_PAGES_DIR, name))
+        texts[pages_dir / (name + '.rst')] = template.render(
+            module_name=name, generated_text=generated_text)
+    return pages, texts
+
+
+def remove_stale_module_pages(output_dir, current, verbose=True):
+    """Remove the generated module pages whose paths aren't in ``current``.
+
+    Only pages that contain the generated-file warning are removed. Returns the
+    list of removed paths.
+    """
+    removed = []
+    for path in (output_dir / MODULE_PAGES_DIR).glob('*.rst'):
+        if path not in current and GENERATED_TEXT in path.read_text():
+            path.unlink()
+            removed.append(path)
+            if verbose:
+                print('Removed', path)
+    return removed
+
+
+def get_intersphinx_mapping(config, use_cache=True, offline=False):
+    """Remove and return the intersphinx mapping from ``config``.
+
+    With ``use_cache``, remote inventories are replaced by their cached copies.
+    """
+    from .intersphinx import (DEFAULT_TTL, InventoryCache, default_mapping,
+                              normalize_mapping)
+    mapping = config.pop('intersphinx_mapping', default_mapping)
+    if not use_cache:
+        return normalize_mapping(mapping)
+    options = get_flinx_options('.')
+    cache = InventoryCache(options.get('intersphinx-cache-dir'),
+                           ttl=options.get('intersphinx-ttl', DEFAULT_TTL),
+                           offline=offline)
+    return cache.resolve(mapping)
+
+
+def render_template_files(output_dir, include_generated_warning=True,
+                          offline=False, use_inventory_cache=True):
+    """Render the generated files, without writing them.
+
+    If the ``module-pages`` option is set in the ``[tool.flinx]`` table of
+    ``pyproject.toml``, each submodule is documented on its own page, so that
+    Sphinx can read the pages in parallel.
+
+    If the intersphinx extension is used, its inventories are cached locally,
+    unless ``use_inventory_cache`` is false. With ``offline``, only cached and
+    local inventories are used.
+
+    ``output_dir`` may be outside the project directory, which is the current
+    directory; then ``conf.py`` names the project directory by its absolute
+    path.
+
+    Returns a dict of path to text, of the module pages, ``index.rst``, and
+    ``conf.py``.
+    """
+    with phase('metadata'):
+        metadata = ProjectMetadata.from_dir('.')
+        config = get_sphinx_configuration('.')
+        try:
+            metadata['name']  # for effect
+        except NoUniqueModuleError as e:
+            sys.stderr.write("{}\n".format(e))
+            sys.exit(1)
+        for key in ('module', 'readme', 'author', 'date', 'version'):
+            metadata[key]  # resolve, so that the time is attributed to this phase
+    generated_text = GENERATED_TEXT if include_generated_warning else None
+    files = {}
+    module_pages = None
+    if get_flinx_options('.').get('module-pages'):
+        with phase('module pages'):
+            module_pages, files = render_module_pages(output_dir, metadata['module'],
+                                                      generated_text)
+    config['extensions'] = get_extensions(
+        config, include_flinx_extensions=include_generated_warning)
+    intersphinx_mapping = None
+    if 'sphinx.ext.intersphinx' in config['extensions']:
+        with phase('intersphinx inventories'):
+            intersphinx_mapping = get_intersphinx_mapping(
+                config, use_cache=use_inventory_cache, offline=offline)
+    relpath = project_relpath(output_dir)
+    module_path = str(relpath) if set(relpath.parts) == {'..'} else os.path.abspath('.')
+    with phase('render templates'):
+        files[output_dir / 'index.rst'] = get_template('index.rst.tpl').render(
+            project_path=relpath,
+            readme=metadata['readme'],
+            module_name=metadata['module'],
+            module_pages=module_pages,
+            generated_text=generated_text,
+        )
+        author = metadata['author']
+        copyright_year = metadata['date']
+        files[output_dir / 'conf.py'] = get_template('conf.py.tpl').render(
+            module_path=module_path,
+            project=metadata['name'],
+            copyright=f'{copyright_year}, {author}',
+            author=author,
+            version=metadata['version'],
+            source_suffix=['.rst'],
+            master_basename='index',
+            generated_text=generated_text,
+            intersphinx_mapping=intersphinx_mapping,
+            config=config.items(),
+        )
+    return files
+
+
 def write_template_files(output_dir,
                          force=True,
                          include_generated_warning=True,
+                         offline=False,
                          unless_exists=False,
+                         use_inventory_cache=True,
                          verbose=True):
-    """Generate the ``conf.py`` and ``README.rst`` files."""
+    """Generate the ``conf.py`` and ``README.rst`` files, and the module pages.
+
+    See ``render_template_files``. Generated module pages for modules that no
+    longer exist are removed.
+
+    Files whose rendered text matches their current contents are not
+    rewritten. Returns the list of paths that were written; this is empty if
+    nothing changed.
+    """
     index_path = output_dir / 'index.rst'
     conf_path = output_dir / 'conf.py'
     overwritten_files = [path for path in (conf_path, index_path)
                          if path.exists() and GENERATED_TEXT not in path.read_text()]
     if overwritten_files and not force:
         if unless_exists:
-            return
+            return []
         raise NonGeneratedFileExists(overwritten_files[0])
 
     output_dir.mkdir(parents=True, exist_ok=True)
-    metadata = ProjectMetadata.from_dir('.')
-    config = get_sphinx_configuration('.')
-    try:
-        metadata['name']  # for effect
-    except NoUniqueModuleError as e:
-        sys.stderr.write("{}\n".format(e))
-        sys.exit(1)
-    generated_text = GENERATED_TEXT if include_generated_warning else None
-    index_text = index_tpl.render(
-        readme=metadata['readme'],
-        module_name=metadata['module'],
-        generated_text=generated_text,
-    )
-    index_path.write_text(index_text)
-    if verbose:
-        print('Wrote', index_path)
-
-    author = metadata['author']
-    copyright_year = metadata['date']
-    config['extensions'] = get_extensions(config)
-    conf_text = conf_tpl.render(
-        module_path='..',
-        project=metadata['name'],
-        copyright=f'{copyright_year}, {author}',
-        author=author,
-        version=metadata['version'],
-        source_suffix=['.rst'],
-        master_basename='index',
-        generated_text=generated_text,
-        config=config.items(),
-    )
-    conf_path.write_text(conf_text)
-    if verbose:
-        print('Wrote', conf_path)
-    return conf_path
+    files = render_template_files(output_dir,
+                                  include_generated_warning=include_generated_warning,
+                                  offline=offline,
+                                  use_inventory_cache=use_inventory_cache)
+    written = []
+    for path, text in files.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if write_if_changed(path, text):
+            written.append(path)
+            if verbose:
+                print('Wrote', path)
+    if get_flinx_options('.').get('module-pages'):
+        written += remove_stale_module_pages(output_dir, files, verbose=verbose)
+    return written
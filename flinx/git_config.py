@@ -0,0 +1,142 @@
+"""Read values from git configuration files, without running git."""
+
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+
+section_re = re.compile(r'^\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+escapes = {'n': '\n', 't': '\t', 'b': '\b', '"': '"', '\\': '\\'}
+
+
+def find_git_dir(start):
+    """Return the ``.git`` directory of the repository that contains ``start``, or None.
+
+    A ``.git`` file, as in a worktree or submodule, is followed to the
+    directory it names. For a worktree, this is the worktree's own directory,
+    in ``.git/worktrees``; ``common_git_dir`` returns the repository's.
+    """
+    path = Path(start).resolve()
+    for directory in [path] + list(path.parents):
+        git_path = directory / '.git'
+        if git_path.is_dir():
+            return git_path
+        if git_path.is_file():
+            text = git_path.read_text().strip()
+            if text.startswith('gitdir:'):
+                return (directory / text[len('gitdir:'):].strip()).resolve()
+    return None
+
+
+def common_git_dir(git_dir):
+    """Return the directory that holds the repository's shared files, such as its
+    ``config``, for the ``.git`` directory ``git_dir``.
+
+    A worktree's directory names this directory in its ``commondir`` file,
+    relative to itself.
+    """
+    try:
+        common_dir = (git_dir / 'commondir').read_text().strip()
+    except OSError:
+        return git_dir
+    return (git_dir / common_dir).resolve()
+
+
+def config_paths(project_dir='.'):
+    """Return the git configuration files that apply to ``project_dir``.
+
+    The files are in increasing order of precedence: the XDG file, the user's
+    ``~/.gitconfig`` (or ``$GIT_CONFIG_GLOBAL``), the repository's config, then
+    the worktree's ``config.worktree``, if it has one.
+    """
+    home = Path(os.path.expanduser('~'))
+    xdg_home = Path(os.environ.get('XDG_CONFIG_HOME') or home / '.config')
+    paths = [xdg_home / 'git' / 'config']
+    paths.append(Path(os.environ.get('GIT_CONFIG_GLOBAL') or home / '.gitconfig'))
+    git_dir = find_git_dir(project_dir)
+    if git_dir:
+        paths.append(common_git_dir(git_dir) / 'config')
+        paths.append(git_dir / 'config.worktree')
+    return paths
+
+
+def parse_value(text):
+    """Return the value of a git configuration line, without quotes and comments."""
+    value, quoted, i = [], False, 0
+    while i < len(text):
+        c = text[i]
+        if c == '\\' and i + 1 < len(text):
+            value.append(escapes.get(text[i + 1], text[i + 1]))
+            i += 2
+            continue
+        if c == '"':
+            quoted = not quoted
+        elif c in '#;' and not quoted:
+            break
+        else:
+            value.append(c)
+        i += 1
+    return ''.join(value).strip()
+
+
+def read_config_file(path, values, depth=0):
+    """Add the values from the git configuration file at ``path`` to ``values``.
+
+    Keys are of the form ``section.key`` or ``section.subsection.key``. Later
+    values replace earlier ones. ``include.path`` entries are read in place.
+    """
+    path = Path(os.path.expanduser(str(path)))
+    try:
+        lines = path.read_text(errors='replace').splitlines()
+    except OSError:
+        return values
+    section = None
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        match = section_re.match(line)
+        if match:
+            name, subsection = match.groups()
+            section = name.lower() if subsection is None \
+                else '{}.{}'.format(name.lower(), parse_value('"' + subsection + '"'))
+            line = line[match.end():].strip()
+            if not line:
+                continue
+        if section is None:
+            continue
+        key, sep, value = line.partition('=')
+        key = '{}.{}'.format(section, key.strip().lower())
+        value = parse_value(value) if sep else 'true'
+        if key == 'include.path' and depth < 10:
+            include_path = Path(os.path.expanduser(value))
+            if not include_path.is_absolute():
+                include_path = path.parent / include_path
+            read_config_file(include_path, values, depth + 1)
+        else:
+            values[key] = value
+    return values
+
+
+@lru_cache(maxsize=None)
+def read_git_config(project_dir):
+    """Return a dict of the git configuration values that apply to ``project_dir``.
+
+    The result is cached for the life of the process.
+    """
+    values = {}
+    for path in config_paths(project_dir):
+        read_config_file(path, values)
+    return values
+
+
+def get_git_config(key, project_dir='.'):
+    """Return the value of the git configuration ``key``, or None.
+
+    As in git, the section and key names are case-insensitive, and the
+    subsection name is case-sensitive.
+    """
+    section, _, rest = key.partition('.')
+    subsection, _, name = rest.rpartition('.')
+    key = '.'.join(part for part in (section.lower(), subsection, name.lower()) if part)
+    return read_git_config(str(Path(project_dir).resolve())).get(key)
@@ -0,0 +1,146 @@
+"""Fetch intersphinx inventories into a local cache.
+
+A generated ``conf.py`` names the cached copy of each inventory, so that
+Sphinx reads it from disk instead of fetching it on each clean build.
+Inventories are re-validated, with a conditional request, once they are older
+than a time-to-live. In offline mode, only cached inventories and local
+(vendored) inventory files are used.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+# Use this, if the configuration doesn't specify ``intersphinx_mapping``.
+default_mapping = {'python': ('https://docs.python.org/3', None)}
+
+# Re-validate a cached inventory once it is older than this, in seconds.
+DEFAULT_TTL = 24 * 60 * 60
+
+FETCH_TIMEOUT = 10
+
+
+def default_cache_dir():
+    """Return the inventory cache directory, in the XDG cache directory."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return Path(cache_home) / 'flinx' / 'intersphinx'
+
+
+def normalize_mapping(mapping):
+    """Return ``mapping`` as a dict of name to ``(base URI, inventory)``.
+
+    This accepts the lists that TOML produces in place of tuples, and the old
+    ``{uri: inventory}`` form, in which the URI is also used as the name.
+    """
+    result = {}
+    for name, value in mapping.items():
+        if isinstance(value, (list, tuple)):
+            uri, inventory = value
+        else:
+            name, uri, inventory = name, name, value
+        result[name] = (uri, inventory)
+    return result
+
+
+def is_url(location):
+    """Return True if ``location`` is an HTTP(S) URL."""
+    return location.startswith(('http://', 'https://'))
+
+
+def inventory_url(uri, inventory):
+    """Return the URL of a mapping's remote inventory, or None if it is local."""
+    if inventory is None:
+        return uri.rstrip('/') + '/objects.inv'
+    if isinstance(inventory, str) and is_url(inventory):
+        return inventory
+    return None
+
+
+class InventoryCache(object):
+    """A directory of downloaded inventories, with their HTTP validators."""
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL, offline=False):
+        self.cache_dir = Path(cache_dir or default_cache_dir())
+        self.ttl = ttl
+        self.offline = offline
+
+    def paths(self, url):
+        """Return the paths of the cached inventory and its metadata."""
+        digest = hashlib.sha256(url.encode()).hexdigest()[:24]
+        return self.cache_dir / (digest + '.inv'), self.cache_dir / (digest + '.json')
+
+    def fetch(self, url):
+        """Return the path of an up-to-date cached copy of ``url``, or None."""
+        inv_path, meta_path = self.paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            meta = {}
+        cached = inv_path.exists()
+        if cached and (self.offline or time.time() - meta.get('fetched', 0) < self.ttl):
+            return inv_path
+        if self.offline:
+            return None
+        headers = {}
+        if cached and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if cached and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            request = Request(url, headers=headers)
+            with urlopen(request, timeout=FETCH_TIMEOUT) as response:
+                data = response.read()
+                last_modified = response.headers.get('Last-Modified')
+                meta = {'url': url, 'etag': response.headers.get('ETag'),
+                        'last_modified': last_modified or formatdate(usegmt=True)}
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = inv_path.with_suffix('.tmp.{}'.format(os.getpid()))
+            tmp_path.write_bytes(data)
+            os.replace(str(tmp_path), str(inv_path))
+        except HTTPError as e:
+            if e.code != 304 or not cached:
+                return self.fetch_failed(url, e, inv_path if cached else None)
+        except (URLError, OSError) as e:
+            return self.fetch_failed(url, e, inv_path if cached else None)
+        meta['fetched'] = time.time()
+        meta_path.write_text(json.dumps(meta))
+        return inv_path
+
+    def fetch_failed(self, url, error, stale_path):
+        """Warn about a failed fetch, and return the stale copy, if any."""
+        sys.stderr.write("Couldn't fetch {}: {}{}\n".format(
+            url, error, '; using the cached copy' if stale_path else ''))
+        return stale_path
+
+    def resolve(self, mapping, jobs=8):
+        """Return ``mapping``, with each remote inventory replaced by its cached copy.
+
+        Inventories are fetched concurrently. In offline mode, a mapping whose
+        inventory isn't cached is omitted, so that Sphinx doesn't try to fetch it.
+        """
+        mapping = normalize_mapping(mapping)
+        urls = {name: inventory_url(uri, inventory)
+                for name, (uri, inventory) in mapping.items()}
+        remote = [(name, url) for name, url in urls.items() if url]
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(remote)))) as executor:
+            paths = dict(zip([name for name, _ in remote],
+                             executor.map(self.fetch, [url for _, url in remote])))
+        resolved = {}
+        for name, (uri, inventory) in mapping.items():
+            if name not in paths:
+                resolved[name] = (uri, inventory)
+            elif paths[name]:
+                resolved[name] = (uri, str(paths[name]))
+            elif not self.offline:
+                resolved[name] = (uri, inventory)
+            else:
+                sys.stderr.write('No cached inventory for {}; omitting it in offline '
+                                 'mode\n'.format(urls[name]))
+        return resolved
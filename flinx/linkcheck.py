@@ -0,0 +1,364 @@
+"""Check the external links in an HTML build, concurrently and incrementally.
+
+Links are checked with a small asyncio HTTP/1.1 client, that keeps a pool of
+connections to each host and limits the rate of requests to it. Each URL is
+checked with ``HEAD``, falling back to ``GET`` if that fails, and redirects are
+followed.
+
+Results are cached, in ``~/.cache/flinx/linkcheck.json``, with a time-to-live
+that depends on the result, so that a working link isn't checked again for a
+week but a broken one is re-checked after an hour.
+
+Only the pages whose digests, in the build directory's manifest, have changed
+since they were last checked without errors are read, and only their links are
+checked.
+"""
+
+import asyncio
+import json
+import os
+import re
+import ssl
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+
+from .configuration import get_sphinx_configuration
+from .publish import read_manifest, scan_output, write_json
+
+STATE_NAME = '.flinx-linkcheck.json'
+
+# Re-check a result once it is older than this, in seconds.
+DEFAULT_TTLS = {
+    'ok': 7 * 24 * 60 * 60,
+    'redirected': 24 * 60 * 60,
+    'broken': 60 * 60,
+}
+
+# The maximum number of connections to each host, and requests per second.
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RATE = 10.0
+
+REQUEST_TIMEOUT = 10
+MAX_REDIRECTS = 5
+MAX_RETRIES = 2
+
+USER_AGENT = 'flinx-linkcheck'
+
+
+def default_cache_path():
+    """Return the path of the result cache, in the XDG cache directory."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return Path(cache_home) / 'flinx' / 'linkcheck.json'
+
+
+class LinkParser(HTMLParser):
+    """Collect the HTTP(S) URLs of a page's links."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        href = dict(attrs).get('href') or ''
+        if href.startswith(('http://', 'https://')):
+            self.urls.add(urldefrag(href)[0])
+
+
+def page_links(path):
+    """Return the sorted external URLs that the HTML page at ``path`` links to."""
+    parser = LinkParser()
+    parser.feed(Path(path).read_text(errors='replace'))
+    return sorted(parser.urls)
+
+
+class ResultCache(object):
+    """Link check results, by URL, that expire after a time-to-live."""
+
+    def __init__(self, path=None, ttls=None):
+        self.path = Path(path or default_cache_path())
+        self.ttls = ttls or DEFAULT_TTLS
+        try:
+            self.results = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.results = {}
+
+    def get(self, url):
+        """Return the unexpired result for ``url``, or None."""
+        result = self.results.get(url)
+        if result and time.time() - result['checked'] < self.ttls[result['status']]:
+            return result
+        return None
+
+    def set(self, url, result):
+        self.results[url] = result
+
+    def save(self):
+        now = time.time()
+        self.results = {url: result for url, result in self.results.items()
+                        if now - result['checked'] < self.ttls[result['status']]}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_json(self.path, self.results)
+
+
+class HostPool(object):
+    """Idle keep-alive connections to a host, and limits on their use."""
+
+    def __init__(self, scheme, host, port, connections, rate):
+        self.scheme, self.host, self.port = scheme, host, port
+        self.semaphore = asyncio.Semaphore(connections)
+        self.interval = 1 / rate if rate else 0
+        self.next_request = 0
+        self.idle = []
+
+    async def wait_turn(self):
+        """Wait until a request to the host is allowed by the rate limit."""
+        now = asyncio.get_running_loop().time()
+        start = max(now, self.next_request)
+        self.next_request = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def connect(self):
+        """Return an idle connection and True, or a new connection and False."""
+        if self.idle:
+            return self.idle.pop(), True
+        context = ssl.create_default_context() if self.scheme == 'https' else None
+        connection = await asyncio.open_connection(self.host, self.port, ssl=context)
+        return connection, False
+
+    def release(self, connection, reusable):
+        if reusable:
+            self.idle.append(connection)
+        else:
+            connection[1].close()
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+async def read_response(reader, method, read_body=True):
+    """Read a response's status line and headers, and the body if it has one.
+
+    Returns the version, status code, and a dict of lower-cased header names to
+    values. Without ``read_body``, the connection can't be re-used.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    version, code = status_line.decode('latin-1').split(None, 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    code = int(code)
+    if method == 'HEAD' or code in (204, 304) or 100 <= code < 200:
+        pass
+    elif not read_body:
+        headers['connection'] = 'close'
+    elif 'chunked' in headers.get('transfer-encoding', '').lower():
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        headers['connection'] = 'close'
+    return version, code, headers
+
+
+class LinkChecker(object):
+    """Check URLs, with a connection pool and rate limit for each host."""
+
+    def __init__(self, connections=DEFAULT_CONNECTIONS, rate=DEFAULT_RATE,
+                 timeout=REQUEST_TIMEOUT):
+        self.connections = connections
+        self.rate = rate
+        self.timeout = timeout
+        self.pools = {}
+
+    def pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        if key not in self.pools:
+            self.pools[key] = HostPool(scheme, host, port, self.connections, self.rate)
+        return self.pools[key]
+
+    async def request(self, method, url):
+        """Send a request, and return the status code and response headers."""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError('unsupported URL {}'.format(url))
+        default_port = 443 if parts.scheme == 'https' else 80
+        port = parts.port or default_port
+        pool = self.pool(parts.scheme, parts.hostname, port)
+        host = parts.hostname if port == default_port else \
+            '{}:{}'.format(parts.hostname, port)
+        target = urlunsplit(('', '', parts.path or '/', parts.query, ''))
+        # a GET's body isn't needed, so its connection is closed instead of read
+        close = method != 'HEAD'
+        request = '{} {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: {}\r\nAccept: */*\r\n' \
+            '{}\r\n'.format(method, target, host, USER_AGENT,
+                            'Connection: close\r\n' if close else '')
+        async with pool.semaphore:
+            await pool.wait_turn()
+            # the timeout starts once the request is allowed, so that the time
+            # spent waiting for a connection or for the rate limit doesn't count
+            return await asyncio.wait_for(
+                self.exchange(pool, method, request, read_body=not close),
+                self.timeout)
+
+    async def exchange(self, pool, method, request, read_body):
+        """Send ``request`` on a connection of ``pool``, and return the status
+        code and response headers."""
+        while True:
+            connection, reused = await pool.connect()
+            reader, writer = connection
+            try:
+                writer.write(request.encode('latin-1'))
+                await writer.drain()
+                version, code, headers = await read_response(
+                    reader, method, read_body=read_body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    # the server closed an idle connection; use a new one
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            pool.release(connection, version == 'HTTP/1.1' and keep_alive)
+            return code, headers
+
+    async def fetch(self, url):
+        """Request ``url`` with HEAD, or GET if HEAD fails, and return the status
+        code and headers.
+
+        A ``429 Too Many Requests`` response is retried after its
+        ``Retry-After`` delay.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            code, headers = await self.request('HEAD', url)
+            if code >= 400 and code != 429:
+                code, headers = await self.request('GET', url)
+            if code != 429 or attempt == MAX_RETRIES:
+                return code, headers
+            try:
+                delay = min(float(headers.get('retry-after', 1)), 60)
+            except ValueError:
+                delay = 1
+            await asyncio.sleep(delay)
+
+    async def check(self, url):
+        """Return the result of checking ``url``, following redirects.
+
+        The result's ``status`` is "ok", "redirected" (to ``location``), or
+        "broken", with the status ``code`` or the ``error``.
+        """
+        result = dict(status='broken', code=None, location=None, error=None)
+        location = url
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                code, headers = await self.fetch(location)
+                result['code'] = code
+                if 300 <= code < 400 and 'location' in headers:
+                    location = urljoin(location, headers['location'])
+                    continue
+                if code < 400:
+                    result['status'] = 'ok' if location == url else 'redirected'
+                    result['location'] = None if location == url else location
+                else:
+                    result['error'] = 'HTTP status {}'.format(code)
+                break
+            else:
+                result['error'] = 'too many redirects'
+        except asyncio.TimeoutError:
+            result['error'] = 'timed out'
+        except (OSError, ValueError) as e:
+            result['error'] = str(e) or type(e).__name__
+        result['checked'] = time.time()
+        return result
+
+    async def check_all(self, urls):
+        """Return a dict of URL to result, of checking ``urls`` concurrently."""
+        try:
+            results = await asyncio.gather(*(self.check(url) for url in urls))
+        finally:
+            for pool in self.pools.values():
+                pool.close()
+        return dict(zip(urls, results))
+
+
+def ignore_patterns(project_dir='.'):
+    """Return the compiled ``linkcheck_ignore`` patterns of the configuration."""
+    patterns = get_sphinx_configuration(project_dir).get('linkcheck_ignore', [])
+    return [re.compile(pattern) for pattern in patterns]
+
+
+def check_links(build_dir, all_pages=False, cache_path=None,
+                connections=DEFAULT_CONNECTIONS, rate=DEFAULT_RATE,
+                timeout=REQUEST_TIMEOUT, verbose=False):
+    """Check the links in the pages of ``build_dir`` that changed since they were
+    last checked without errors.
+
+    With ``all_pages``, the links in every page are checked. Prints the broken
+    links, and returns their number.
+    """
+    build_dir = Path(build_dir)
+    state_path = build_dir / STATE_NAME
+    try:
+        state = json.loads(state_path.read_text())
+    except (OSError, ValueError):
+        state = {}
+    manifest = scan_output(build_dir, read_manifest(build_dir))
+    pages = {path: entry[0] for path, entry in manifest.items()
+             if path.endswith('.html')}
+    changed = sorted(path for path, digest in pages.items()
+                     if all_pages or state.get(path) != digest)
+    ignore = ignore_patterns()
+    links = {path: [url for url in page_links(build_dir / path)
+                    if not any(pattern.match(url) for pattern in ignore)]
+             for path in changed}
+
+    cache = ResultCache(cache_path)
+    results = {}
+    for url in sorted({url for urls in links.values() for url in urls}):
+        results[url] = cache.get(url)
+    pending = [url for url, result in results.items() if result is None]
+    if pending:
+        checker = LinkChecker(connections=connections, rate=rate, timeout=timeout)
+        checked = asyncio.run(checker.check_all(pending))
+        for url, result in checked.items():
+            cache.set(url, result)
+        results.update(checked)
+        cache.save()
+
+    broken = 0
+    for path in changed:
+        for url in links[path]:
+            result = results[url]
+            if result['status'] == 'broken':
+                broken += 1
+                print('{}: {}: {}'.format(path, url, result['error']))
+            elif verbose and result['status'] == 'redirected':
+                print('{}: {}: redirected to {}'.format(path, url, result['location']))
+    passed = {path for path, urls in links.items()
+              if all(results[url]['status'] != 'broken' for url in urls)}
+    state = {path: digest for path, digest in pages.items()
+             if path not in links or path in passed}
+    write_json(state_path, state)
+    print('{} page(s) and {} link(s) checked, {} from the cache; {} broken'.format(
+        len(changed), len(results), len(results) - len(pending), broken))
+    return broken
@@ -0,0 +1,189 @@
+"""Prepare HTML build output for static hosting.
+
+Three post-build stages are available:
+
+* Search index sharding splits the search index into files that the search
+  page loads as queries need them. See ``search_index``.
+* Fingerprinting copies each static asset to a name that includes a digest of
+  its contents, such as ``_static/basic.3f2a1b0c9d8e.css``, and rewrites the
+  references in the HTML and CSS files to use these names. Since a
+  fingerprinted file never changes, a CDN can cache it indefinitely. The
+  original files are kept, for references that are built at run time by
+  scripts.
+* Compression writes a ``.gz`` sibling, and a ``.br`` sibling if the optional
+  ``brotli`` package is installed, of each text file.
+
+The digest of each output file is recorded in a manifest in the build
+directory, and files whose digests haven't changed since the last build are
+skipped. Files are compressed in a pool of worker processes.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .digests import tree_files
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The builders whose output can be post-processed.
+HTML_FORMATS = {'html', 'dirhtml', 'singlehtml'}
+
+COMPRESSED_SUFFIXES = {'.css', '.eot', '.html', '.js', '.json', '.map', '.svg',
+                       '.ttf', '.txt', '.xml'}
+
+# The directories, relative to the build directory, whose files are
+# fingerprinted; and the search index, which is loaded by a script tag.
+FINGERPRINTED_DIRS = ('_static', '_images')
+FINGERPRINTED_FILES = ('searchindex.js',)
+
+MANIFEST_NAME = '.flinx-postprocess.json'
+
+html_ref_re = re.compile(r'''((?:href|src)=["'])([^"'#?]+)''')
+css_ref_re = re.compile(r'''(url\(\s*["']?)([^"')#?]+)''')
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprinted_name(path, digest):
+    """Return ``path`` with the first 12 digits of ``digest`` before its suffix."""
+    return path.with_name('{}.{}{}'.format(path.stem, digest[:12], path.suffix))
+
+
+def rewrite_refs(text, ref_re, base_dir, mapping):
+    """Replace the references in ``text`` to files in ``mapping``.
+
+    References are resolved relative to ``base_dir``; ``mapping`` maps build
+    directory-relative paths to their replacements.
+    """
+    def replace(match):
+        ref = match.group(2)
+        if urlsplit(ref).scheme or ref.startswith(('/', '//')):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(base_dir, ref))
+        replacement = mapping.get(target)
+        if replacement is None:
+            return match.group(0)
+        new_ref = os.path.relpath(replacement, base_dir) if base_dir else replacement
+        return match.group(1) + new_ref
+    return ref_re.sub(replace, text)
+
+
+def fingerprint_assets(build_dir, previous):
+    """Copy each asset to its fingerprinted name.
+
+    ``previous`` maps each asset to its fingerprinted name in the last build.
+    Returns a dict that maps each asset to its fingerprinted name, and a dict
+    that also maps the previous fingerprinted names to the current ones, for
+    the pages that Sphinx didn't re-write. Stale fingerprinted copies are
+    removed.
+    """
+    build_dir = Path(build_dir)
+    previous_names = set(previous.values())
+    assets = [build_dir / name for name in FINGERPRINTED_FILES
+              if (build_dir / name).is_file()]
+    for dirname in FINGERPRINTED_DIRS:
+        assets += [path for path in tree_files(build_dir / dirname)
+                   if path.suffix not in ('.gz', '.br')]
+    assets = [path for path in assets
+              if str(path.relative_to(build_dir)) not in previous_names]
+
+    fingerprints = {}
+    # CSS files refer to other assets, so they are fingerprinted after them
+    for path in sorted(assets, key=lambda path: path.suffix == '.css'):
+        relpath = str(path.relative_to(build_dir))
+        data = path.read_bytes()
+        if path.suffix == '.css':
+            text = rewrite_refs(data.decode('utf-8', 'replace'), css_ref_re,
+                                os.path.dirname(relpath), fingerprints)
+            data = text.encode()
+        target = fingerprinted_name(path, content_digest(data))
+        if not target.exists():
+            target.write_bytes(data)
+        fingerprints[relpath] = str(target.relative_to(build_dir))
+
+    for name in previous_names - set(fingerprints.values()):
+        for path in (build_dir / name, build_dir / (name + '.gz'),
+                     build_dir / (name + '.br')):
+            if path.exists():
+                path.unlink()
+    mapping = dict(fingerprints)
+    for relpath, name in previous.items():
+        if relpath in fingerprints:
+            mapping[name] = fingerprints[relpath]
+    return fingerprints, mapping
+
+
+def process_file(build_dir, relpath, previous_digest, mapping, compress):
+    """Rewrite an HTML file's references, and compress a file if it changed.
+
+    This runs in a worker process. Returns the file's digest.
+    """
+    path = Path(build_dir) / relpath
+    data = path.read_bytes()
+    if mapping and path.suffix == '.html':
+        text = data.decode('utf-8')
+        new_text = rewrite_refs(text, html_ref_re, os.path.dirname(relpath), mapping)
+        if new_text != text:
+            data = new_text.encode('utf-8')
+            path.write_bytes(data)
+    digest = content_digest(data)
+    if compress:
+        gz_path = path.with_name(path.name + '.gz')
+        if digest != previous_digest or not gz_path.exists():
+            with gzip.GzipFile(str(gz_path), 'wb', compresslevel=9, mtime=0) as f:
+                f.write(data)
+        br_path = path.with_name(path.name + '.br')
+        if brotli and (digest != previous_digest or not br_path.exists()):
+            br_path.write_bytes(brotli.compress(data))
+    return digest
+
+
+def postprocess(build_dir, compress=True, fingerprint=True, search_shards=False,
+                jobs=None):
+    """Shard the search index of, fingerprint, and compress the files in
+    ``build_dir``.
+
+    Returns the number of files whose contents changed since the last run.
+    """
+    build_dir = Path(build_dir)
+    if search_shards:
+        from .search_index import shard_search_index
+        shard_search_index(build_dir)
+    manifest_path = build_dir / MANIFEST_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    previous_digests = manifest.get('digests', {})
+    fingerprints, mapping = {}, {}
+    if fingerprint:
+        fingerprints, mapping = fingerprint_assets(build_dir,
+                                                   manifest.get('fingerprints', {}))
+
+    relpaths = [str(path.relative_to(build_dir)) for path in tree_files(build_dir)
+                if path.suffix in COMPRESSED_SUFFIXES and not path.name.startswith('.')]
+    digests = {}
+    if relpaths:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(
+                process_file, repeat(str(build_dir)), relpaths,
+                [previous_digests.get(relpath) for relpath in relpaths],
+                repeat(mapping), repeat(compress), chunksize=32)
+            digests = dict(zip(relpaths, results))
+
+    manifest = dict(digests=digests, fingerprints=fingerprints)
+    manifest_path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    return sum(digest != previous_digests.get(relpath)
+               for relpath, digest in digests.items())
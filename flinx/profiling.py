@@ -0,0 +1,164 @@
+"""Record the wall time and memory use of each phase of a build.
+
+The ``profiler`` module variable is None unless ``build --profile`` is in
+effect, so that ``phase`` costs almost nothing in an ordinary build.
+
+This module is also a Sphinx extension, which records Sphinx's setup, read, and
+write phases, and the time that it takes to read each document.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The active Profiler, or None.
+profiler = None
+
+
+def peak_rss():
+    """Return the peak resident set size of this process, in bytes, or None."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class Profiler(object):
+    """Collect timed events, and report them as a table or a Chrome trace."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+
+    def record(self, name, start, end, category='flinx'):
+        """Record an event that ran from ``start`` to ``end``, in ``perf_counter``
+        time."""
+        self.events.append(dict(name=name, category=category, start=start, end=end,
+                                peak_rss=peak_rss(), tid=threading.get_ident()))
+
+    @contextmanager
+    def phase(self, name, category='flinx'):
+        """Record the duration of a ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), category)
+
+    def phases(self):
+        """Return the events that aren't per-document events."""
+        return [event for event in self.events if event['category'] != 'document']
+
+    def slowest_documents(self, count=10):
+        """Return the ``count`` slowest per-document events."""
+        documents = [event for event in self.events if event['category'] == 'document']
+        return sorted(documents, key=lambda e: e['start'] - e['end'])[:count]
+
+    def print_summary(self, file=None):
+        """Print a table of phases, and of the slowest documents."""
+        file = file or sys.stdout
+        print('{:<28} {:>9} {:>10}'.format('phase', 'time', 'peak RSS'), file=file)
+        for event in sorted(self.phases(), key=lambda e: e['start']):
+            rss = event['peak_rss']
+            print('{:<28} {:>8.3f}s {:>10}'.format(
+                event['name'], event['end'] - event['start'],
+                '{:.1f} MB'.format(rss / 2**20) if rss else ''), file=file)
+        documents = self.slowest_documents()
+        if documents:
+            print(file=file)
+            print('{:<38} {:>9}'.format('slowest documents', 'time'), file=file)
+            for event in documents:
+                seconds = event['end'] - event['start']
+                print('{:<38} {:>8.3f}s'.format(event['name'], seconds), file=file)
+
+    def trace(self):
+        """Return the events in the Chrome trace event format."""
+        pid = os.getpid()
+        return {
+            'traceEvents': [
+                dict(name=event['name'], cat=event['category'], ph='X', pid=pid,
+                     tid=event['tid'],
+                     ts=round((event['start'] - self.origin) * 1e6),
+                     dur=round((event['end'] - event['start']) * 1e6),
+                     args={'peak_rss': event['peak_rss']})
+                for event in self.events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_trace(self, path):
+        """Write the Chrome trace to ``path``."""
+        with open(str(path), 'w') as f:
+            json.dump(self.trace(), f, indent=1)
+
+
+@contextmanager
+def phase(name, category='flinx'):
+    """Record the duration of a ``with`` block, if profiling is active."""
+    if profiler is None:
+        yield
+    else:
+        with profiler.phase(name, category):
+            yield
+
+
+class SphinxPhases(object):
+    """Record Sphinx's phases and per-document read times, from its events."""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.start = time.perf_counter()
+        self.read_start = None
+        self.write_start = None
+        self.document = None
+        self.document_start = None
+
+    def builder_inited(self, app):
+        now = time.perf_counter()
+        self.profiler.record('sphinx setup', self.start, now, 'sphinx')
+
+    def env_before_read_docs(self, app, env, docnames):
+        self.read_start = time.perf_counter()
+
+    def source_read(self, app, docname, source):
+        self.document, self.document_start = docname, time.perf_counter()
+
+    def doctree_read(self, app, doctree):
+        if self.document is not None:
+            self.profiler.record(self.document, self.document_start,
+                                 time.perf_counter(), 'document')
+            self.document = None
+
+    def env_updated(self, app, env):
+        now = time.perf_counter()
+        if self.read_start is not None:
+            self.profiler.record('sphinx read', self.read_start, now, 'sphinx')
+        self.write_start = now
+
+    def build_finished(self, app, exception):
+        if self.write_start is not None:
+            self.profiler.record('sphinx resolve and write', self.write_start,
+                                 time.perf_counter(), 'sphinx')
+
+
+def setup(app):
+    """Connect the Sphinx event handlers, if profiling is active."""
+    from . import __version__
+    if profiler is not None:
+        phases = SphinxPhases(profiler)
+        app.connect('builder-inited', phases.builder_inited)
+        app.connect('env-before-read-docs', phases.env_before_read_docs)
+        app.connect('source-read', phases.source_read)
+        app.connect('doctree-read', phases.doctree_read)
+        app.connect('env-updated', phases.env_updated)
+        app.connect('build-finished', phases.build_finished)
+    return {'version': __version__, 'parallel_read_safe': True,
+            'parallel_write_safe': True}
@@ -1,13 +1,15 @@
 """Read the project metadata from a variety of sources."""
 
+import os
 import re
 import subprocess
-import sys
 from datetime import datetime
 from functools import reduce
 from pathlib import Path
 
-import pytoml as toml
+from .configuration import get_flinx_options, read_toml
+from .git_config import get_git_config
+from .profiling import phase
 
 test_filename_re = re.compile(r'^(test_|_test)$')
 version_re = re.compile(r'^\s*__version__\s*=\s*(\'.*?\'|".*?")', re.M)
@@ -36,7 +38,7 @@ class PyProjectMetadataProviderABC(object):
     _translations = {}
 
     def __init__(self, project_path='pyproject.toml'):
-        project = toml.loads(Path(project_path).read_text())
+        project = read_toml(project_path)
         try:
             dotpath = self._toml_path.split('.')
             self._metadata = reduce(lambda a, b: a[b], dotpath, project)
@@ -90,10 +92,91 @@ class PoetryMetadata(PyProjectMetadataProviderABC):
         return (', ' if len(authors) > 2 else ' ').join(authors)
 
 
-def read_version_def(path):
-    """Return the version string from a module."""
-    match = version_re.search(path.read_text())
-    return match.group(1).strip('"\'') if match else None
+# Stop looking for a version definition after this many bytes of a file.
+VERSION_SEARCH_MAX_BYTES = 64 * 1024
+
+# Version definitions, indexed by resolved path. Each entry is a
+# ``((mtime_ns, size, max_bytes), version)`` pair.
+_version_cache = {}
+
+# Directory listings, indexed by resolved path. Each entry is a
+# ``(mtime_ns, [(name, is_dir), …])`` pair.
+_listing_cache = {}
+
+
+def read_version_def(path, max_bytes=None):
+    """Return the version string from a module.
+
+    The file is read a line at a time, up to the first version definition or
+    ``max_bytes`` (by default, ``VERSION_SEARCH_MAX_BYTES``). The result is
+    cached until the file's modification time or size changes.
+    """
+    max_bytes = VERSION_SEARCH_MAX_BYTES if max_bytes is None else max_bytes
+    path = Path(path)
+    stat = path.stat()
+    stat_key = (stat.st_mtime_ns, stat.st_size, max_bytes)
+    cache_key = str(path.resolve())
+    cached = _version_cache.get(cache_key)
+    if cached and cached[0] == stat_key:
+        return cached[1]
+    version = None
+    with path.open(encoding='utf-8', errors='replace') as f:
+        read = 0
+        for line in f:
+            match = version_re.match(line)
+            if match:
+                version = match.group(1).strip('"\'')
+                break
+            read += len(line)
+            if read >= max_bytes:
+                break
+    _version_cache[cache_key] = (stat_key, version)
+    return version
+
+
+def list_dir(path):
+    """Return a sorted list of ``(name, is_dir)`` for the Python files and
+    directories in ``path``.
+
+    This makes a single ``os.scandir`` pass, and is cached until the
+    directory's modification time changes.
+    """
+    stat = os.stat(str(path))
+    cache_key = str(Path(path).resolve())
+    cached = _listing_cache.get(cache_key)
+    if cached and cached[0] == stat.st_mtime_ns:
+        return cached[1]
+    entries = []
+    with os.scandir(str(path)) as it:
+        for entry in it:
+            if entry.is_dir():
+                entries.append((entry.name, True))
+            elif entry.name.endswith('.py') and entry.is_file():
+                entries.append((entry.name, False))
+    entries.sort()
+    _listing_cache[cache_key] = (stat.st_mtime_ns, entries)
+    return entries
+
+
+def scan_module_candidates(project_path='.'):
+    """Return the candidate file modules and directory modules in a directory.
+
+    Returns a pair of lists: the names of the file modules, and the paths of
+    the directory modules. See ``module_candidates``.
+    """
+    root = Path(project_path)
+    files, dirs = [], []
+    for name, is_dir in list_dir(root):
+        if is_dir:
+            init_path = root / name / '__init__.py'
+            if not test_filename_re.match(name) and init_path.is_file() \
+                    and read_version_def(init_path):
+                dirs.append(root / name)
+        else:
+            stem = name[:-len('.py')]
+            if not test_filename_re.match(stem) and read_version_def(root / name):
+                files.append(stem)
+    return files, dirs
 
 
 def module_candidates(project_path='.', search='file'):
@@ -107,21 +190,8 @@ def module_candidates(project_path='.', search='file'):
 
     ``search`` should be one of "file" and "dir".
     """
-    root = Path(project_path)
-    if search == 'file':
-        paths = [p for p in root.glob('*.py') if p.is_file()]
-        paths = [p for p in paths if not test_filename_re.match(str(p.stem))]
-    else:
-        paths = [p for p in root.glob('*') if p.is_dir()]
-        paths = [p / '__init__.py' for p in paths
-                 if not test_filename_re.match(str(p))]
-        paths = [p for p in paths if p.is_file()]
-    paths = [p for p in paths if read_version_def(p)]
-    if search == 'file':
-        paths = [p.stem for p in paths]
-    else:
-        paths = [p.parent for p in paths]
-    return paths
+    files, dirs = scan_module_candidates(project_path)
+    return files if search == 'file' else dirs
 
 
 class NoUniqueModuleError(Exception):
@@ -132,8 +202,8 @@ class NoUniqueModuleError(Exception):
 
 def find_module(project_home):
     """Find the module. Prefer directories over files."""
-    module_paths = module_candidates(project_home, 'file') \
-        or module_candidates(project_home, 'dir')
+    files, dirs = scan_module_candidates(project_home)
+    module_paths = files or dirs
     if not module_paths:
         raise NoUniqueModuleError("Couldn't find module")
     if len(module_paths) > 1:
@@ -141,6 +211,27 @@ def find_module(project_home):
     return Path(module_paths[0])
 
 
+def find_submodules(project_home, module_name):
+    """Return the dotted names of a module and its public submodules, in sorted order.
+
+    Modules and packages whose names begin with ``_`` are omitted.
+    """
+    root = Path(project_home) / module_name
+    if not root.is_dir():
+        return [module_name]
+    names = []
+    for path in sorted(root.rglob('*.py')):
+        parts = path.relative_to(root).with_suffix('').parts
+        if parts[-1] == '__init__':
+            parts = parts[:-1]
+        if any(part.startswith('_') for part in parts):
+            continue
+        if all((root.joinpath(*parts[:i]) / '__init__.py').is_file()
+               for i in range(len(parts))):
+            names.append('.'.join((module_name,) + parts))
+    return sorted(names)
+
+
 class InferredProjectMetadata(object):
     """Metadata provider that detects metadata from files in the current directory."""
 
@@ -153,15 +244,27 @@ class InferredProjectMetadata(object):
         return str(find_module(self.project_path).name)
 
     def _get_name(self):
-        return str(self.project_path.name)
+        return str(self.project_path.resolve().name)
 
     def _get_author(self):
-        process = subprocess.run(["git", "config", "user.name"],
-                                 stdout=subprocess.PIPE)
-        if process.returncode:
-            sys.exit(1)
-        if not process.stdout:
+        name = get_git_config('user.name', self.project_path)
+        if not name and get_flinx_options(self.project_path).get('git-subprocess'):
+            name = self._get_author_from_git()
+        if not name:
             raise Exception("Couldn't detect user name")
+        return name
+
+    def _get_author_from_git(self):
+        """Return ``git config user.name``, or None if it fails."""
+        with phase('git config'):
+            try:
+                process = subprocess.run(["git", "config", "user.name"],
+                                         cwd=str(self.project_path),
+                                         stdout=subprocess.PIPE)
+            except OSError:
+                return None
+        if process.returncode:
+            return None
         return process.stdout.decode().strip()
 
     def _get_date(self):
@@ -181,7 +284,10 @@ class InferredProjectMetadata(object):
 
 
 class ProjectMetadata(CombinedMetadata):
-    """Combine metadata from ``pyproject.toml`` and the directory structure."""
+    """Combine metadata from ``pyproject.toml`` and the directory structure.
+
+    Each key is resolved at most once per instance.
+    """
 
     _project_source_classes = [FlinxMetadata, FlitMetadata, PoetryMetadata]
     sources = []
@@ -199,6 +305,7 @@ class ProjectMetadata(CombinedMetadata):
             sources += [cls(project_file_path) for cls in self._project_source_classes]
         sources.append(InferredProjectMetadata(self._project_home))
         super().__init__(sources)
+        self._values = {}
 
     def _get_version(self):
         module_path = self._project_home / self['module']
@@ -206,8 +313,7 @@ class ProjectMetadata(CombinedMetadata):
         path = init_path if module_path.is_dir() else Path(str(module_path) + '.py')
         return read_version_def(path)
 
-    def __getitem__(self, key):
-        """Return a project metadata value."""
+    def _lookup(self, key):
         try:
             return super().__getitem__(key)
         except KeyError:
@@ -215,6 +321,18 @@ class ProjectMetadata(CombinedMetadata):
                 return self._get_version()
             raise
 
+    def __getitem__(self, key):
+        """Return a project metadata value."""
+        if key not in self._values:
+            try:
+                self._values[key] = self._lookup(key)
+            except KeyError:
+                self._values[key] = KeyError
+        value = self._values[key]
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+
 
 if __name__ == '__main__':
     for klass in [FlinxMetadata, FlitMetadata, PoetryMetadata,
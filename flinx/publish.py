@@ -0,0 +1,114 @@
+"""Track the files that a build changes, and copy only those to a destination.
+
+Sphinx re-writes many output files whose contents are unchanged. After each
+build, a manifest of the digest of each output file is written to the build
+directory, along with the lists of files that were added, changed, and deleted
+since the previous build. A file whose size and modification time match the
+manifest isn't read again.
+
+``publish`` copies a build directory to a destination directory, which records
+the manifest of what was last copied there, and copies only the files whose
+digests differ.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+from .digests import stat_digests, tree_files
+
+MANIFEST_NAME = '.flinx-manifest.json'
+CHANGES_NAME = '.flinx-changes.json'
+
+
+def read_manifest(directory):
+    """Return the manifest in ``directory``, as a dict of path to
+    ``[digest, size, mtime_ns]``; or {} if there isn't one."""
+    try:
+        return json.loads((Path(directory) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(path, data):
+    """Replace ``path`` with the JSON encoding of ``data``, atomically."""
+    tmp_path = path.with_name('.{}.{}.tmp'.format(path.name, os.getpid()))
+    tmp_path.write_text(json.dumps(data, indent=1, sort_keys=True))
+    os.replace(str(tmp_path), str(path))
+
+
+def scan_output(build_dir, previous=None):
+    """Return the manifest of the files in ``build_dir``.
+
+    Hidden files and directories, such as the doctrees, are omitted. Digests in
+    ``previous`` are re-used for files whose size and modification time match.
+    """
+    build_dir = Path(build_dir)
+    paths = [path for path in tree_files(build_dir) if not path.name.startswith('.')]
+    return stat_digests(paths, build_dir, previous)
+
+
+def diff_manifests(old, new):
+    """Return a dict of the ``added``, ``changed``, and ``deleted`` paths."""
+    return dict(
+        added=sorted(path for path in new if path not in old),
+        changed=sorted(path for path in new
+                       if path in old and old[path][0] != new[path][0]),
+        deleted=sorted(path for path in old if path not in new),
+    )
+
+
+def update_manifest(build_dir):
+    """Update the manifest of ``build_dir``, and write and return the changes
+    since the last update."""
+    build_dir = Path(build_dir)
+    if not build_dir.is_dir():
+        return diff_manifests({}, {})
+    previous = read_manifest(build_dir)
+    manifest = scan_output(build_dir, previous)
+    changes = diff_manifests(previous, manifest)
+    write_json(build_dir / MANIFEST_NAME, manifest)
+    write_json(build_dir / CHANGES_NAME, changes)
+    return changes
+
+
+def format_changes(changes):
+    return '{} added, {} changed, {} deleted'.format(
+        len(changes['added']), len(changes['changed']), len(changes['deleted']))
+
+
+def publish(build_dir, dest_dir, verbose=False):
+    """Copy the files in ``build_dir`` that differ from those in ``dest_dir``.
+
+    Each file is copied to a temporary file and renamed into place, so that a
+    reader of ``dest_dir`` never sees a partly written file. Files that are no
+    longer in the build are removed after the others are copied. Returns the
+    changes.
+    """
+    build_dir, dest_dir = Path(build_dir), Path(dest_dir)
+    source = scan_output(build_dir, read_manifest(build_dir))
+    published = read_manifest(dest_dir)
+    changes = diff_manifests(published, source)
+    # files that were published, but have since been removed from the destination
+    missing = [path for path in source if path in published
+               if path not in changes['changed'] and not (dest_dir / path).exists()]
+    changes['added'] += missing
+
+    for relpath in changes['added'] + changes['changed']:
+        dest = dest_dir / relpath
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest.with_name('.{}.{}.tmp'.format(dest.name, os.getpid()))
+        shutil.copy2(str(build_dir / relpath), str(tmp_path))
+        os.replace(str(tmp_path), str(dest))
+        if verbose:
+            print('Copied', relpath)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    write_json(dest_dir / MANIFEST_NAME, source)
+    for relpath in changes['deleted']:
+        path = dest_dir / relpath
+        if path.exists():
+            path.unlink()
+            if verbose:
+                print('Removed', relpath)
+    return changes
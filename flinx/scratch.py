@@ -0,0 +1,98 @@
+"""Build outside the project tree, in a scratch directory.
+
+The project's documentation sources are mirrored into the scratch directory,
+and the generated files and build outputs are written there, so that the
+project tree is only read.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+from .digests import text_digest, tree_files
+from .generation import GENERATED_TEXT
+
+# Lists the files that were mirrored from the project, relative to the
+# scratch documentation directory.
+MIRROR_MANIFEST = '.flinx-mirror.json'
+
+
+def default_scratch_dir(project_dir='.'):
+    """Return the scratch directory for ``project_dir``, in the XDG cache directory.
+
+    Each project directory, and so each checkout of a project, has its own
+    scratch directory.
+    """
+    project_dir = Path(project_dir).resolve()
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    name = '{}-{}'.format(project_dir.name, text_digest(str(project_dir))[:12])
+    return Path(cache_home) / 'flinx' / 'builds' / name
+
+
+def is_generated(path):
+    """Return True if ``path`` is a file that Flinx generated."""
+    if path.suffix not in ('.py', '.rst'):
+        return False
+    try:
+        return GENERATED_TEXT in path.read_text()
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def mirror_tree(source_dir, dest_dir, verbose=False):
+    """Copy the files in ``source_dir`` to ``dest_dir``, and remove those that
+    were previously copied but no longer exist.
+
+    A file is copied only if its size or modification time differ, and its
+    modification time is copied too, so that Sphinx sees the same times as in
+    the project. Generated files, left by an earlier build in the project tree,
+    aren't copied; they are generated afresh in ``dest_dir``. Files in
+    ``dest_dir`` that weren't mirrored are left alone. Returns the list of
+    destination paths that changed.
+    """
+    source_dir, dest_dir = Path(source_dir), Path(dest_dir)
+    manifest_path = dest_dir / MIRROR_MANIFEST
+    try:
+        previous = set(json.loads(manifest_path.read_text()))
+    except (OSError, ValueError):
+        previous = set()
+    current = set()
+    changed = []
+    for path in tree_files(source_dir) if source_dir.is_dir() else []:
+        relpath = str(path.relative_to(source_dir))
+        dest = dest_dir / relpath
+        stat = path.stat()
+        try:
+            dest_stat = dest.stat()
+            if (dest_stat.st_size, dest_stat.st_mtime_ns) == \
+                    (stat.st_size, stat.st_mtime_ns):
+                current.add(relpath)
+                continue
+        except FileNotFoundError:
+            pass
+        if is_generated(path):
+            continue
+        current.add(relpath)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(str(path), str(dest))
+        changed.append(dest)
+        if verbose:
+            print('Copied', path)
+    for relpath in sorted(previous - current):
+        dest = dest_dir / relpath
+        if dest.exists():
+            dest.unlink()
+            changed.append(dest)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    if current != previous:
+        manifest_path.write_text(json.dumps(sorted(current)))
+    return changed
+
+
+def prepare_scratch_dir(scratch_dir, source_dir='docs', verbose=False):
+    """Mirror the documentation sources into ``scratch_dir``, and return the
+    scratch documentation directory."""
+    docs_dir = Path(scratch_dir).resolve() / 'docs'
+    mirror_tree(source_dir, docs_dir, verbose=verbose)
+    return docs_dir
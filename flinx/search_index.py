@@ -0,0 +1,180 @@
+"""Split an HTML build's search index into shards that are loaded on demand.
+
+Sphinx's ``searchindex.js`` holds the whole index, and the search page loads
+all of it. ``shard_search_index`` writes a copy without the term tables, which
+are most of its size, and writes the terms to shard files in ``_search``, by
+the first characters of each term. A script on the search page fetches only
+the shards of the terms in a query.
+
+Within a shard, each distinct list of documents is stored once, and the terms
+refer to it. Shards and the index are named by a digest of their contents, so
+that they can be cached indefinitely. Sphinx's own ``searchindex.js`` is left
+in place, since an incremental build reads it.
+
+Partial matches are limited to the terms that share a prefix with the query's
+terms.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+SEARCH_DIR = '_search'
+
+SEARCH_PAGES = ('search.html', 'search/index.html')
+
+LOADER_NAME = 'search-shards.js'
+LOADER_SOURCE = Path(__file__).parent / 'static' / LOADER_NAME
+
+# The number of leading characters that select a term's shard, and the size,
+# in bytes, above which adjacent prefixes aren't combined into one shard.
+PREFIX_LENGTH = 2
+SHARD_SIZE = 16 * 1024
+
+INDEX_PREFIX = 'Search.setIndex('
+INDEX_SUFFIX = ')'
+
+TERM_TABLES = ('terms', 'titleterms')
+
+index_script_re = re.compile(
+    r'''(<script src=")([^"]*?)(?:searchindex|_search/index\.[0-9a-f]+)\.js"''')
+
+
+def read_search_index(path):
+    """Return the contents of a ``searchindex.js`` file."""
+    text = Path(path).read_text()
+    if not text.startswith(INDEX_PREFIX) or not text.endswith(INDEX_SUFFIX):
+        raise ValueError('{} is not a search index'.format(path))
+    return json.loads(text[len(INDEX_PREFIX):-len(INDEX_SUFFIX)])
+
+
+def dumps(data):
+    return json.dumps(data, separators=(',', ':'), sort_keys=True)
+
+
+def digest_name(prefix, text, suffix):
+    digest = hashlib.sha256(text.encode()).hexdigest()[:12]
+    return '{}/{}.{}{}'.format(SEARCH_DIR, prefix, digest, suffix)
+
+
+def group_prefixes(index, prefix_length=PREFIX_LENGTH, shard_size=SHARD_SIZE):
+    """Return a list of lists of term prefixes, one for each shard.
+
+    Adjacent prefixes, in sorted order, are combined until their entries
+    exceed ``shard_size`` bytes.
+    """
+    sizes = {}
+    for table in TERM_TABLES:
+        for term, docs in index[table].items():
+            prefix = term[:prefix_length]
+            sizes[prefix] = sizes.get(prefix, 0) + len(term) + len(dumps(docs)) + 4
+    groups, size = [], shard_size
+    for prefix in sorted(sizes):
+        if size >= shard_size:
+            groups.append([])
+            size = 0
+        groups[-1].append(prefix)
+        size += sizes[prefix]
+    return groups
+
+
+def make_shard(index, prefixes, prefix_length=PREFIX_LENGTH):
+    """Return the shard of the terms with ``prefixes``.
+
+    Each distinct list of documents is stored once, in ``docs``, and the terms
+    in ``tables`` refer to it by position.
+    """
+    prefixes = set(prefixes)
+    docs, positions = [], {}
+    tables = {}
+    for table in TERM_TABLES:
+        entries = tables[table] = {}
+        for term, term_docs in sorted(index[table].items()):
+            if term[:prefix_length] not in prefixes:
+                continue
+            key = dumps(term_docs)
+            if key not in positions:
+                positions[key] = len(docs)
+                docs.append(term_docs)
+            entries[term] = positions[key]
+    return dict(docs=docs, tables=tables)
+
+
+def write_file(path, text):
+    """Write ``text`` to ``path``, unless it exists; its name is its digest."""
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def insert_scripts(text, page_dir, index_name, loader_name):
+    """Point a search page's index script at ``index_name``, and add the loader.
+
+    The names are relative to the build directory, and ``page_dir`` is the
+    page's directory, relative to it.
+    """
+    loader_ref = os.path.relpath(loader_name, page_dir or '.')
+    index_ref = os.path.relpath(index_name, page_dir or '.')
+
+    def replace(match):
+        script = '{}{}"'.format(match.group(1), index_ref)
+        # the loader may have been fingerprinted
+        if Path(LOADER_NAME).stem not in text:
+            script = '{} defer="defer"></script>\n    <script src="{}"'.format(
+                script, loader_ref)
+        return script
+    return index_script_re.sub(replace, text, count=1)
+
+
+def shard_search_index(build_dir, prefix_length=PREFIX_LENGTH, shard_size=SHARD_SIZE):
+    """Write the sharded search index of ``build_dir``, and refer to it from the
+    search page.
+
+    Returns the sizes, in bytes, of the ``index``, and of each of the
+    ``shards``; or None if the build has no search index.
+    """
+    build_dir = Path(build_dir)
+    index_path = build_dir / 'searchindex.js'
+    if not index_path.is_file():
+        return None
+    index = read_search_index(index_path)
+
+    files, shard_texts, prefixes = [], [], {}
+    for prefix_group in group_prefixes(index, prefix_length, shard_size):
+        text = dumps(make_shard(index, prefix_group, prefix_length))
+        for prefix in prefix_group:
+            prefixes[prefix] = len(files)
+        files.append(digest_name('terms', text, '.json'))
+        shard_texts.append(text)
+    core = dict(index, flinx_shards=dict(prefix_length=prefix_length,
+                                         prefixes=prefixes, files=files))
+    for table in TERM_TABLES:
+        core[table] = {}
+    index_text = INDEX_PREFIX + dumps(core) + INDEX_SUFFIX
+    index_name = digest_name('index', index_text, '.js')
+    loader_name = '_static/' + LOADER_NAME
+
+    for name, text in zip(files, shard_texts):
+        write_file(build_dir / name, text)
+    write_file(build_dir / index_name, index_text)
+    shutil.copyfile(str(LOADER_SOURCE), str(build_dir / loader_name))
+    current = set(files) | {index_name}
+    for path in (build_dir / SEARCH_DIR).iterdir():
+        # remove stale shards, and their compressed copies
+        name = path.name[:-3] if path.suffix in ('.gz', '.br') else path.name
+        if '{}/{}'.format(SEARCH_DIR, name) not in current:
+            path.unlink()
+
+    for page in SEARCH_PAGES:
+        path = build_dir / page
+        if path.is_file():
+            text = path.read_text()
+            new_text = insert_scripts(text, os.path.dirname(page), index_name,
+                                      loader_name)
+            if new_text != text:
+                path.write_text(new_text)
+    return dict(index=len(index_text.encode()),
+                shards=[len(text.encode()) for text in shard_texts])
@@ -0,0 +1,235 @@
+"""Serve the documentation, and rebuild it in-process when the sources change."""
+
+import multiprocessing
+import re
+import sys
+import threading
+import webbrowser
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .generation import write_template_files
+from .project_metadata import NoUniqueModuleError, ProjectMetadata
+from .scratch import mirror_tree
+from .watcher import Watcher
+
+# Served pages poll this path, and reload when the build number it returns
+# changes.
+RELOAD_PATH = '/__flinx__/build'
+
+RELOAD_SCRIPT = """<script>
+(function() {
+  var build = null;
+  function poll() {
+    fetch('%s').then(function(response) { return response.text(); })
+      .then(function(text) {
+        if (build !== null && text !== build) { location.reload(); }
+        build = text;
+      })
+      .catch(function() {})
+      .then(function() { setTimeout(poll, 1000); });
+  }
+  poll();
+})();
+</script>
+""" % RELOAD_PATH
+
+# Changes to these files can change the generated conf.py and index.rst.
+readme_re = re.compile(r'^README(\.\w+)?$', re.I)
+
+
+class SphinxSession(object):
+    """A Sphinx application that is kept alive between builds.
+
+    Each ``build`` after the first is incremental, and skips the cost of
+    creating the application, loading extensions, and unpickling the
+    environment.
+    """
+
+    def __init__(self, docs_dir, build_dir, fmt='html', verbose=False):
+        self.docs_dir = Path(docs_dir)
+        self.build_dir = Path(build_dir)
+        self.fmt = fmt
+        self.verbose = verbose
+        self._app = None
+
+    @property
+    def app(self):
+        """Return the Sphinx application, creating it on first use."""
+        if self._app is None:
+            from sphinx.application import Sphinx
+            self._app = Sphinx(str(self.docs_dir), str(self.docs_dir),
+                               str(self.build_dir), str(self.build_dir / '.doctrees'),
+                               self.fmt,
+                               status=sys.stdout if self.verbose else None,
+                               warning=sys.stderr,
+                               parallel=multiprocessing.cpu_count())
+        return self._app
+
+    def reset(self):
+        """Discard the application, so that the next build reads the configuration."""
+        self._app = None
+
+    def build(self, all_files=False):
+        """Build the documentation, and return the exit status.
+
+        With ``all_files``, every document is read and written, regardless of
+        what has changed.
+        """
+        try:
+            self.app.build(force_all=all_files)
+        except Exception as e:
+            sys.stderr.write('Build failed: {}\n'.format(e))
+            self.reset()
+            return 1
+        return self.app.statuscode
+
+
+class LiveReloadRequestHandler(SimpleHTTPRequestHandler):
+    """Serve the build directory, with a live-reload script in each HTML page."""
+
+    def __init__(self, *args, server_state=None, **kwargs):
+        self.server_state = server_state
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        """Serve a file, the current build number, or an HTML page with the script."""
+        if self.path == RELOAD_PATH:
+            return self.send_text(str(self.server_state['build']), 'text/plain')
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            path = path / 'index.html'
+        if path.suffix == '.html' and path.is_file():
+            text = path.read_text(encoding='utf-8')
+            head, sep, tail = text.rpartition('</body>')
+            text = head + RELOAD_SCRIPT + sep + tail if sep else text + RELOAD_SCRIPT
+            return self.send_text(text, 'text/html; charset=utf-8')
+        return super().do_GET()
+
+    def send_text(self, text, content_type):
+        """Send ``text`` as the response body."""
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Don't log requests."""
+        pass
+
+
+class LiveReloadServer(object):
+    """An HTTP server, running in a background thread, that serves ``build_dir``."""
+
+    def __init__(self, build_dir, host='127.0.0.1', port=8000):
+        self.state = {'build': 0}
+        handler = partial(LiveReloadRequestHandler, directory=str(build_dir),
+                          server_state=self.state)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """Return the URL of the server."""
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self):
+        """Start serving requests."""
+        self.thread.start()
+
+    def stop(self):
+        """Stop serving requests."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reload(self):
+        """Tell the pages that are being viewed to reload."""
+        self.state['build'] += 1
+
+
+def is_generation_input(path):
+    """Return True if a change to ``path`` can change the generated files."""
+    return path.name == 'pyproject.toml' or path.suffix == '.py' \
+        or bool(readme_re.match(path.name))
+
+
+def purge_modules(project_dir):
+    """Remove the project's module, and its submodules, from ``sys.modules``.
+
+    This makes autodoc import the current source on the next build. Sphinx
+    records each module's source file as a dependency of the documents that
+    describe it, so only those documents are read again. Other modules in the
+    project directory, such as those of an in-project virtual environment, are
+    kept, since the Sphinx application refers to them.
+    """
+    try:
+        module_name = ProjectMetadata.from_dir(project_dir)['module']
+    except (KeyError, NoUniqueModuleError):
+        return
+    for name in list(sys.modules):
+        if name.split('.')[0] == module_name:
+            del sys.modules[name]
+
+
+def rebuild(session, changes, project_dir='.', source_dir=None, verbose=False):
+    """Re-generate the files that depend on ``changes``, and re-build.
+
+    ``conf.py`` and ``index.rst`` are re-generated only if a project file,
+    README, or module changed, and written only if their text changed. A new
+    ``conf.py`` requires a new Sphinx application; otherwise the build is
+    incremental.
+
+    If the session builds out of tree, ``source_dir`` is the project's
+    documentation directory, whose changes are mirrored into the session's.
+
+    Returns the exit status of the build.
+    """
+    if source_dir and Path(source_dir) != session.docs_dir \
+            and any(Path(source_dir) in path.parents for path in changes):
+        mirror_tree(source_dir, session.docs_dir, verbose=verbose)
+    # changes to files in the documentation directory, including the generated
+    # files themselves, don't need generation
+    docs_dirs = {session.docs_dir, Path(source_dir or session.docs_dir)}
+    changes = [path for path in changes if not docs_dirs & set(path.parents)]
+    if any(is_generation_input(path) for path in changes):
+        written = write_template_files(session.docs_dir, force=False,
+                                       unless_exists=True, verbose=verbose)
+        if session.docs_dir / 'conf.py' in written:
+            session.reset()
+    if any(path.suffix == '.py' for path in changes):
+        purge_modules(project_dir)
+    return session.build()
+
+
+def serve(docs_dir, build_dir, host='127.0.0.1', port=8000, open_url=False,
+          source_dir=None, all_files=False, verbose=False, interval=0.5):
+    """Build and serve the documentation, and rebuild it when the sources change.
+
+    The project directory, including ``pyproject.toml``, the README, and the
+    module sources, is watched along with the documentation sources. With
+    ``all_files``, the first build rebuilds every document.
+
+    Runs until interrupted.
+    """
+    session = SphinxSession(docs_dir, build_dir, verbose=verbose)
+    session.build(all_files=all_files)
+    watcher = Watcher(['.'])
+    server = LiveReloadServer(build_dir, host, port)
+    server.start()
+    print('Serving on', server.url)
+    if open_url:
+        webbrowser.open(server.url)
+    try:
+        while True:
+            rebuild(session, watcher.wait(interval), source_dir=source_dir,
+                    verbose=verbose)
+            server.reload()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
@@ -0,0 +1,196 @@
+"""Split the reading of the documents between processes or machines, and merge it.
+
+``flinx build --shard I/N`` reads the I-th of N subsets of the documents, with
+the ``dummy`` builder, and saves the environment and doctrees to
+``docs/_build/shards/I``. ``flinx merge`` merges the shards' environments, as
+Sphinx does after a parallel read, and then writes each format from the merged
+environment, so that the toctrees, cross-references, and search index cover
+every document.
+
+Documents are assigned to shards by longest-processing-time-first partitioning,
+by their read times in the last merged build, or by their sizes if they have
+none. The merge records the read times. Every shard must use the same timings
+file, so that each document is read by exactly one shard; a document that no
+shard read is read by the merge. The root document is read by every shard,
+because Sphinx requires it.
+
+This module is also the Sphinx extension that reads and merges the shards.
+"""
+
+import heapq
+import json
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+
+from .publish import write_json
+
+# The default timings file, relative to the documentation directory.
+TIMINGS_PATH = Path('_build') / '.flinx-timings.json'
+
+SHARDS_DIR = Path('_build') / 'shards'
+
+
+def parse_shard(text):
+    """Return the index and count of a shard specification such as "2/4".
+
+    Raises ValueError if the specification isn't valid.
+    """
+    index, sep, count = text.partition('/')
+    if not sep or not index.isdigit() or not count.isdigit() \
+            or not 1 <= int(index) <= int(count):
+        raise ValueError('{!r} should be I/N, with 1 <= I <= N'.format(text))
+    return int(index), int(count)
+
+
+def read_timings(path):
+    """Return the recorded read time of each document, in seconds, or {}."""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def document_weights(sizes, timings):
+    """Return the estimated read time of each document.
+
+    ``sizes`` is a dict of document name to source size. A document without a
+    recorded time is estimated from its size, and the mean time per byte of the
+    documents that have one.
+    """
+    timed = [name for name in sizes if name in timings]
+    timed_bytes = sum(sizes[name] for name in timed)
+    rate = sum(timings[name] for name in timed) / timed_bytes if timed_bytes else 1
+    return {name: timings[name] if name in timings else size * rate
+            for name, size in sizes.items()}
+
+
+def partition(weights, count):
+    """Divide the documents into ``count`` lists of roughly equal total weight.
+
+    The heaviest documents are assigned first, each to the lightest list. The
+    result depends only on the weights, so each shard computes the same one.
+    """
+    shards = [[] for _ in range(count)]
+    heap = [(0, i) for i in range(count)]
+    for name in sorted(weights, key=lambda name: (-weights[name], name)):
+        total, i = heapq.heappop(heap)
+        shards[i].append(name)
+        heapq.heappush(heap, (total + weights[name], i))
+    return [sorted(shard) for shard in shards]
+
+
+def read_times(env):
+    """Return the environment's dict of document name to read time."""
+    if not hasattr(env, 'flinx_read_times'):
+        env.flinx_read_times = {}
+    return env.flinx_read_times
+
+
+class Shards(object):
+    """Sphinx event handlers that read a shard, or merge shards."""
+
+    def __init__(self):
+        self.merged = []
+
+    def builder_inited(self, app):
+        if not app.config.flinx_shard:
+            return
+        # a shard's documents are included by the toctrees of other shards
+        app.config.suppress_warnings = list(app.config.suppress_warnings) + [
+            'toc.not_included']
+        # the merge writes the documents
+        app.builder.write = lambda *args, **kwargs: None
+
+    def env_before_read_docs(self, app, env, docnames):
+        if app.config.flinx_shard:
+            self.select_shard(app, env, docnames)
+        elif app.config.flinx_shard_merge:
+            self.merge_shards(app, env, docnames)
+
+    def select_shard(self, app, env, docnames):
+        """Remove the documents of other shards from ``docnames`` and ``env``."""
+        index, count = parse_shard(app.config.flinx_shard)
+        root_doc = app.config.root_doc
+        sizes = {name: os.path.getsize(str(env.doc2path(name)))
+                 for name in env.found_docs if name != root_doc}
+        weights = document_weights(sizes, read_timings(app.config.flinx_shard_timings))
+        selected = set(partition(weights, count)[index - 1]) | {root_doc}
+        for name in set(env.all_docs) - selected:
+            app.events.emit('env-purge-doc', env, name)
+            env.clear_doc(name)
+        docnames[:] = [name for name in docnames if name in selected]
+
+    def merge_shards(self, app, env, docnames):
+        """Merge the documents in ``docnames`` that the shards read into ``env``,
+        and remove them from ``docnames``."""
+        from sphinx.application import ENV_PICKLE_FILENAME
+
+        remaining = set(docnames)
+        for doctree_dir in app.config.flinx_shard_merge.split(os.pathsep):
+            doctree_dir = Path(doctree_dir)
+            with open(str(doctree_dir / ENV_PICKLE_FILENAME), 'rb') as f:
+                other = pickle.load(f)
+            names = remaining & set(other.all_docs)
+            for name in names:
+                app.events.emit('env-purge-doc', env, name)
+                env.clear_doc(name)
+                dest = Path(app.doctreedir) / (name + '.doctree')
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(str(doctree_dir / (name + '.doctree')), str(dest))
+            env.merge_info_from(names, other, app)
+            remaining -= names
+            self.merged += sorted(names)
+        docnames[:] = sorted(remaining)
+
+    def env_updated(self, app, env):
+        # report the merged documents as updated, so that the environment is saved
+        merged, self.merged = self.merged, []
+        return merged
+
+    def build_finished(self, app, exception):
+        if app.config.flinx_shard_merge and app.config.flinx_shard_timings \
+                and exception is None:
+            write_json(Path(app.config.flinx_shard_timings), read_times(app.env))
+
+
+def source_read(app, docname, source):
+    app.env.temp_data['flinx_read_start'] = time.perf_counter()
+
+
+def doctree_read(app, doctree):
+    start = app.env.temp_data.pop('flinx_read_start', None)
+    if start is not None:
+        read_times(app.env)[app.env.docname] = time.perf_counter() - start
+
+
+def env_merge_info(app, env, docnames, other):
+    other_times = read_times(other)
+    read_times(env).update((name, other_times[name]) for name in docnames
+                           if name in other_times)
+
+
+def env_purge_doc(app, env, docname):
+    read_times(env).pop(docname, None)
+
+
+def setup(app):
+    """Add the configuration values and event handlers."""
+    from . import __version__
+    # these don't affect the contents of the environment
+    app.add_config_value('flinx_shard', '', '')
+    app.add_config_value('flinx_shard_merge', '', '')
+    app.add_config_value('flinx_shard_timings', '', '')
+    shards = Shards()
+    app.connect('builder-inited', shards.builder_inited)
+    app.connect('env-before-read-docs', shards.env_before_read_docs)
+    app.connect('env-updated', shards.env_updated)
+    app.connect('build-finished', shards.build_finished)
+    app.connect('source-read', source_read)
+    app.connect('doctree-read', doctree_read)
+    app.connect('env-merge-info', env_merge_info)
+    app.connect('env-purge-doc', env_purge_doc)
+    return {'version': __version__, 'parallel_read_safe': True,
+            'parallel_write_safe': True}
@@ -0,0 +1,46 @@
+/*
+ * Load the term tables of a Flinx prefix-sharded search index as queries need
+ * them. The index that Search.setIndex receives has empty term tables, and a
+ * ``flinx_shards`` table of term prefix to shard file. Before Sphinx runs a
+ * query, the shards of its terms are fetched and merged into the index.
+ */
+(() => {
+  "use strict";
+
+  const originalQuery = Search.query;
+  const loaded = new Map();
+
+  const contentRoot = () => document.documentElement.dataset.content_root || "";
+
+  const loadShard = (file) => {
+    if (!loaded.has(file)) {
+      const request = fetch(contentRoot() + file)
+        .then((response) => response.json())
+        .then((shard) => {
+          const index = Search._index;
+          for (const [table, entries] of Object.entries(shard.tables)) {
+            for (const [term, docs] of Object.entries(entries)) {
+              index[table][term] = shard.docs[docs];
+            }
+          }
+        });
+      loaded.set(file, request);
+    }
+    return loaded.get(file);
+  };
+
+  Search.query = (query) => {
+    const shards = Search._index.flinx_shards;
+    if (!shards) return originalQuery(query);
+    const [, searchTerms, excludedTerms] = Search._parseQuery(query);
+    const files = new Set();
+    for (const term of [...searchTerms, ...excludedTerms]) {
+      const shard = shards.prefixes[term.slice(0, shards.prefix_length)];
+      if (shard !== undefined) files.add(shards.files[shard]);
+    }
+    Promise.all([...files].map(loadShard)).then(
+      () => originalQuery(query),
+      () => originalQuery(query),
+    );
+  };
+})();
@@ -0,0 +1,59 @@
+/*
+ * Add a version selector to a page of a Flinx multi-version site. The site
+ * has a directory per version, and a versions.json that lists them. This
+ * script is in a version's _static directory, so the version and the site
+ * root are found from its URL. Choosing a version opens the same page in that
+ * version, or its index page if it doesn't have this page.
+ */
+(() => {
+  "use strict";
+
+  const scriptUrl = new URL(document.currentScript.src);
+  const versionRoot = new URL("..", scriptUrl).href;
+  const siteRoot = new URL("..", versionRoot).href;
+  const current = versionRoot.slice(siteRoot.length, -1);
+
+  const openVersion = (path) => {
+    const page = window.location.href.startsWith(versionRoot)
+      ? window.location.href.slice(versionRoot.length)
+      : "";
+    const target = siteRoot + path + "/" + page;
+    fetch(target, { method: "HEAD" })
+      .then((response) => response.ok)
+      .catch(() => false)
+      .then((found) => {
+        window.location.href = found ? target : siteRoot + path + "/index.html";
+      });
+  };
+
+  const addSelector = (versions) => {
+    const select = document.createElement("select");
+    select.className = "flinx-version-selector";
+    select.setAttribute("aria-label", "Version");
+    select.style.cssText =
+      "position: fixed; right: 1em; bottom: 1em; z-index: 100;";
+    for (const version of versions) {
+      const option = document.createElement("option");
+      option.value = version.path;
+      option.textContent =
+        version.version && version.version !== version.name
+          ? `${version.name} (${version.version})`
+          : version.name;
+      option.selected = version.path === current;
+      select.appendChild(option);
+    }
+    select.addEventListener("change", () => openVersion(select.value));
+    document.body.appendChild(select);
+  };
+
+  fetch(siteRoot + "versions.json")
+    .then((response) => response.json())
+    .then((versions) => {
+      if (document.readyState === "loading") {
+        document.addEventListener("DOMContentLoaded", () => addSelector(versions));
+      } else {
+        addSelector(versions);
+      }
+    })
+    .catch(() => {});
+})();
@@ -8,12 +8,13 @@
 # see the `Sphinx documentation <http://www.sphinx-doc.org/en/master/config>`.
 {%- endif %}
 
+import os
 import sys
 {% if '.md' in source_suffix %}
 from recommonmark.parser import CommonMarkParser
 {% endif %}
 
-sys.path.insert(0, '{{ module_path }}')
+sys.path.insert(0, os.path.abspath('{{ module_path }}'))
 
 project = '{{ project }}'
 copyright = {{ copyright | repr }}
@@ -29,8 +30,8 @@ source_suffix = {{ source_suffix }}
 source_parsers = { '.md': CommonMarkParser }
 {% endif %}
 
-{%- if 'sphinx.ext.intersphinx' in extensions %}
-intersphinx_mapping = {'https://docs.python.org/': None}
+{%- if intersphinx_mapping %}
+intersphinx_mapping = {{ intersphinx_mapping | repr }}
 {%- endif %}
 
 {% for k, v in config %}
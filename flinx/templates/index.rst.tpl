@@ -6,7 +6,7 @@
 {% endif -%}
 
 {% if readme %}
-.. include:: {{ readme | project_rel }}
+.. include:: {{ readme | project_rel(project_path) }}
 {% endif -%}
 
 .. toctree::
@@ -16,6 +16,13 @@
 
 API
 ---
-
+{% if module_pages %}
+.. toctree::
+   :maxdepth: 1
+{% for page in module_pages %}
+   {{ page }}
+{%- endfor %}
+{% else %}
 .. automodule:: {{ module_name }}
     :members:
+{%- endif %}
\ No newline at end of file
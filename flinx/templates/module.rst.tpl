@@ -0,0 +1,10 @@
+{%- if generated_text -%}
+.. {{ generated_text }}
+
+{% endif -%}
+
+{{ module_name }}
+{{ '=' * module_name | length }}
+
+.. automodule:: {{ module_name }}
+    :members:
@@ -0,0 +1,271 @@
+"""Build the documentation of several git refs, as a site with a version selector.
+
+``flinx build --refs A..B`` builds A, each tag that B contains and A doesn't, and
+B. Each ref's tree is read from the git object store with ``git archive``, into
+a scratch directory, without checking it out; and is built there, in a pool of
+worker processes, as a project of its own, so that its metadata and version are
+inferred from its own files. Refs with the same tree are built once.
+
+Each ref keeps its scratch directory between runs, and a file is only re-written
+if its contents changed, so that a re-run is an incremental build. The refs
+share an autodoc cache, so that a module whose source is the same in two refs
+is only imported and documented once. (Sphinx environments and doctrees can't
+be shared, since Sphinx discards an environment whose source directory moved.)
+
+The HTML builds are published to ``docs/_build/versions``, a directory per ref,
+with ``versions.json``, and an ``index.html`` that redirects to the last ref.
+Each page has a selector, that switches to the same page in another version.
+
+This module is also the Sphinx extension that adds the selector.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+from pathlib import Path
+
+from click import ClickException
+
+from .project_metadata import ProjectMetadata
+from .publish import MANIFEST_NAME, publish, write_json
+from .scratch import default_scratch_dir
+from .workspace import print_summary, run_packages
+
+# The site directory, relative to the project directory.
+VERSIONS_DIR = Path('docs') / '_build' / 'versions'
+
+VERSIONS_NAME = 'versions.json'
+
+# Records the commit, and the files, that were extracted into a ref's directory.
+EXTRACT_MANIFEST = '.flinx-ref.json'
+
+SELECTOR_NAME = 'version-selector.js'
+SELECTOR_SOURCE = Path(__file__).parent / 'static' / SELECTOR_NAME
+
+REDIRECT_TEMPLATE = '''<!DOCTYPE html>
+<html>
+  <head>
+    <meta charset="utf-8">
+    <meta http-equiv="refresh" content="0; url={path}/index.html">
+    <title>Redirecting to {name}</title>
+  </head>
+  <body><a href="{path}/index.html">{name}</a></body>
+</html>
+'''
+
+
+def git(args, cwd='.'):
+    """Return the output of ``git *args``, or raise ClickException if it fails."""
+    process = subprocess.run(['git'] + list(args), cwd=str(cwd),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode:
+        raise ClickException('git {} failed: {}'.format(
+            ' '.join(args), process.stderr.decode().strip()))
+    return process.stdout.decode()
+
+
+def ref_names(spec, repo_dir='.'):
+    """Return the ref names in ``spec``, in order.
+
+    ``spec`` is a comma-separated list of refs, or a range ``A..B`` of A, the
+    tags that B contains and A doesn't, in version order, and B. A range
+    without A includes every tag that B contains; B defaults to HEAD.
+    """
+    if '..' not in spec:
+        names = [name.strip() for name in spec.split(',') if name.strip()]
+    else:
+        start, end = spec.split('..', 1)
+        end = end or 'HEAD'
+        args = ['tag', '--merged', end, '--sort=version:refname']
+        if start:
+            args += ['--no-merged', start]
+        names = ([start] if start else []) + git(args, repo_dir).split() + [end]
+    return list(dict.fromkeys(names))
+
+
+def resolve_refs(spec, repo_dir='.'):
+    """Return a list of the refs in ``spec``, each with its ``name``, ``path``,
+    ``commit``, and ``tree``.
+
+    ``path`` is the ref's directory name in the site.
+    """
+    refs = []
+    for name in ref_names(spec, repo_dir):
+        commit, tree = git(['rev-parse', name + '^{commit}', name + '^{tree}'],
+                           repo_dir).split()
+        refs.append(dict(name=name, path=re.sub(r'[^\w.-]+', '-', name),
+                         commit=commit, tree=tree))
+    return refs
+
+
+def extract_tree(commit, dest_dir, repo_dir='.'):
+    """Write the files of ``commit`` to ``dest_dir``, with ``git archive``.
+
+    Only files whose contents differ are written, so that the modification times
+    of the others are kept; and files that an earlier extraction wrote, and that
+    ``commit`` doesn't have, are removed. Other files, such as the builds, are
+    left alone. Returns False if ``dest_dir`` already holds ``commit``.
+    """
+    dest_dir = Path(dest_dir)
+    manifest_path = dest_dir / EXTRACT_MANIFEST
+    try:
+        previous = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        previous = {}
+    if previous.get('commit') == commit:
+        return False
+    process = subprocess.Popen(['git', 'archive', '--format=tar', commit],
+                               cwd=str(repo_dir), stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    files = []
+    with tarfile.open(fileobj=process.stdout, mode='r|') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            data = tar.extractfile(member).read()
+            path = dest_dir / member.name
+            files.append(member.name)
+            try:
+                if path.stat().st_size == len(data) and path.read_bytes() == data:
+                    continue
+            except OSError:
+                pass
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            os.chmod(str(path), member.mode)
+    if process.wait():
+        raise ClickException('git archive {} failed: {}'.format(
+            commit, process.stderr.read().decode().strip()))
+    for name in sorted(set(previous.get('files', [])) - set(files)):
+        path = dest_dir / name
+        if path.exists():
+            path.unlink()
+    write_json(manifest_path, dict(commit=commit, files=files))
+    return True
+
+
+def build_ref(options):
+    """Build the ref in the current directory, and return the exit status.
+
+    This runs in a worker process, which may have built another ref, that has
+    modules of the same names; these are removed.
+    """
+    from .commands import build_project
+    module_name = ProjectMetadata.from_dir('.')['module']
+    for name in list(sys.modules):
+        if name.split('.')[0] == module_name:
+            del sys.modules[name]
+    if 'sphinx.pycode' in sys.modules:
+        sys.modules['sphinx.pycode'].ModuleAnalyzer.cache.clear()
+    return build_project(options)
+
+
+def read_version(project_dir):
+    """Return the version of the project in ``project_dir``, or None."""
+    try:
+        return ProjectMetadata.from_dir(project_dir)['version']
+    except Exception:
+        return None
+
+
+def read_versions(site_dir):
+    """Return a dict of path to entry, of the versions that ``site_dir`` lists."""
+    try:
+        versions = json.loads((site_dir / VERSIONS_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    return {version['path']: version for version in versions}
+
+
+def write_site(site_dir, refs, verbose=False):
+    """Publish the HTML build of each ref to ``site_dir``, and write the list of
+    versions, and the redirect to the last one.
+
+    A ref without a ``build_dir`` failed to build; its directory, and its entry
+    in the list, are kept from the last run that built it. Directories of refs
+    that are no longer in ``refs`` are removed.
+    """
+    site_dir.mkdir(parents=True, exist_ok=True)
+    previous = read_versions(site_dir)
+    versions = []
+    for ref in refs:
+        if ref['build_dir']:
+            publish(ref['build_dir'], site_dir / ref['path'], verbose=verbose)
+            versions.append(dict(name=ref['name'], path=ref['path'],
+                                 version=ref['version'], commit=ref['commit']))
+        elif ref['path'] in previous and (site_dir / ref['path']).is_dir():
+            versions.append(previous[ref['path']])
+    paths = {ref['path'] for ref in refs}
+    for path in site_dir.iterdir():
+        if path.name not in paths and (path / MANIFEST_NAME).is_file():
+            shutil.rmtree(str(path))
+    if not versions:
+        return
+    write_json(site_dir / VERSIONS_NAME, versions)
+    (site_dir / 'index.html').write_text(REDIRECT_TEMPLATE.format(
+        path=versions[-1]['path'], name=versions[-1]['name']))
+
+
+def build_refs(spec, options, jobs=None):
+    """Build the documentation of the refs in ``spec``, and write the site.
+
+    ``options`` are the command-line options of ``build``; ``scratch_dir``
+    chooses the directory that the refs are extracted into. Returns the exit
+    status.
+    """
+    refs = resolve_refs(spec)
+    if not refs:
+        raise ClickException('no refs in {}'.format(spec))
+    scratch_dir = Path(options.get('scratch_dir') or default_scratch_dir()).resolve()
+    refs_dir = scratch_dir / 'refs'
+    project_name = Path('.').resolve().name
+    trees = {}
+    for ref in refs:
+        if ref['tree'] not in trees:
+            # named as the project, since the project name may be inferred from it
+            trees[ref['tree']] = refs_dir / ref['path'] / project_name
+            extract_tree(ref['commit'], trees[ref['tree']])
+        ref['build_dir'] = trees[ref['tree']] / 'docs' / '_build' / 'html'
+    options = dict(options, fmt='html', out_of_tree=False, scratch_dir=None,
+                   config=dict(flinx_autodoc_cache_dir=refs_dir / 'autodoc',
+                               flinx_version_selector=1))
+    results = run_packages(build_ref, list(trees.values()), options, jobs=jobs)
+    print_summary(results, refs_dir)
+    failed = {result['path'] for result in results if result['status']}
+    site_refs = []
+    for ref in refs:
+        project_dir = trees[ref['tree']]
+        if project_dir in failed:
+            site_refs.append(dict(ref, build_dir=None))
+        else:
+            site_refs.append(dict(ref, version=read_version(project_dir)))
+    write_site(VERSIONS_DIR, site_refs, verbose=options.get('verbose', False))
+    return 1 if failed else 0
+
+
+def builder_inited(app):
+    if app.config.flinx_version_selector and app.builder.format == 'html':
+        app.add_js_file(SELECTOR_NAME, defer='defer')
+
+
+def build_finished(app, exception):
+    if app.config.flinx_version_selector and app.builder.format == 'html' \
+            and exception is None:
+        static_dir = Path(app.outdir) / '_static'
+        static_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(str(SELECTOR_SOURCE), str(static_dir / SELECTOR_NAME))
+
+
+def setup(app):
+    """Add the version selector to the HTML pages, if
+    ``flinx_version_selector`` is set."""
+    from . import __version__
+    app.add_config_value('flinx_version_selector', False, 'html')
+    app.connect('builder-inited', builder_inited)
+    app.connect('build-finished', build_finished)
+    return {'version': __version__, 'parallel_read_safe': True,
+            'parallel_write_safe': True}
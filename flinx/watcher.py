@@ -0,0 +1,68 @@
+"""Poll directory trees for file changes."""
+
+import os
+import time
+from pathlib import Path
+
+# Directories that are never watched.
+ignored_dir_names = {'__pycache__', '_build', '.git', '.hg', '.mypy_cache',
+                     '.pytest_cache', '.tox', '.venv', 'node_modules', 'venv'}
+
+
+def snapshot(paths):
+    """Return a dict of file path to ``(mtime_ns, size)``, for the files in ``paths``.
+
+    Each path may be a file or a directory. Directories are searched recursively,
+    skipping hidden directories and those in ``ignored_dir_names``.
+    """
+    files = {}
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            stat = path.stat()
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for dirpath, dirnames, filenames in os.walk(str(path)):
+            dirnames[:] = [
+                name for name in dirnames
+                if not name.startswith('.') and name not in ignored_dir_names]
+            for name in filenames:
+                file_path = Path(dirpath) / name
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class Watcher(object):
+    """Report the files that have been added, changed, or removed under ``paths``."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._snapshot = snapshot(self.paths)
+
+    def changes(self):
+        """Return the set of paths that changed since the last call."""
+        current = snapshot(self.paths)
+        previous, self._snapshot = self._snapshot, current
+        return {path for path in set(previous) | set(current)
+                if previous.get(path) != current.get(path)}
+
+    def wait(self, interval=0.5, debounce=0.3):
+        """Block until files change, and return the set of changed paths.
+
+        Once a change is seen, keep polling until ``debounce`` seconds pass with
+        no further changes, so that a burst of saves is reported once.
+        """
+        changes = set()
+        while not changes:
+            time.sleep(interval)
+            changes = self.changes()
+        while True:
+            time.sleep(debounce)
+            more = self.changes()
+            if not more:
+                return changes
+            changes |= more
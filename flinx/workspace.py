@@ -0,0 +1,92 @@
+"""Find and build the packages in a multi-package workspace."""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from click import ClickException
+
+from .project_metadata import NoUniqueModuleError, ProjectMetadata
+
+# Directories that are never searched for packages.
+ignored_dir_names = {'__pycache__', '_build', 'build', 'dist', 'docs',
+                     'node_modules', 'site-packages', 'venv'}
+
+
+def is_package_dir(path):
+    """Return True if ``ProjectMetadata`` can determine the module in ``path``."""
+    try:
+        ProjectMetadata.from_dir(path)['module']
+        return True
+    except (KeyError, NoUniqueModuleError):
+        return False
+
+
+def find_packages(root):
+    """Return the package directories beneath ``root``, in sorted order.
+
+    The search doesn't descend into a package directory, or into hidden,
+    build, and virtual environment directories.
+    """
+    packages = []
+    for dirpath, dirnames, _ in os.walk(str(root)):
+        if is_package_dir(dirpath):
+            packages.append(Path(dirpath))
+            dirnames[:] = []
+            continue
+        dirnames[:] = sorted(
+            name for name in dirnames
+            if not name.startswith('.') and name not in ignored_dir_names)
+    return sorted(packages)
+
+
+def run_in_dir(fn, path, options):
+    """Call ``fn(options)`` with ``path`` as the working directory.
+
+    This runs in a worker process. An exception or exit is caught and reported,
+    so that one package's failure doesn't affect the others.
+
+    Returns a dict with the path, exit status, wall time, and error message.
+    """
+    start = time.perf_counter()
+    message = None
+    try:
+        os.chdir(str(path))
+        status = fn(options)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    except ClickException as e:
+        status, message = e.exit_code, e.format_message()
+    except Exception as e:
+        status, message = 1, '{}: {}'.format(type(e).__name__, e)
+    return dict(path=path, status=status or 0, message=message,
+                seconds=time.perf_counter() - start)
+
+
+def run_packages(fn, paths, options, jobs=None):
+    """Call ``fn(options)`` in each of ``paths``, in a pool of ``jobs`` processes.
+
+    Returns a list of the results of ``run_in_dir``, in the order of ``paths``.
+    """
+    paths = [Path(path).resolve() for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_in_dir, fn, path, options) for path in paths]
+        return [future.result() for future in futures]
+
+
+def print_summary(results, root, file=None):
+    """Print a table of package build results."""
+    file = file or sys.stdout
+    root = Path(root).resolve()
+    rows = [(str(result['path'].relative_to(root)) or '.',
+             'failed' if result['status'] else 'ok',
+             '{:.2f}s'.format(result['seconds']),
+             result['message'] or '')
+            for result in results]
+    width = max([len('package')] + [len(row[0]) for row in rows])
+    print('{:<{}}  {:<6}  {:>8}'.format('package', width, 'status', 'time'), file=file)
+    for name, status, seconds, message in rows:
+        print('{:<{}}  {:<6}  {:>8}  {}'.format(name, width, status, seconds,
+                                                message).rstrip(), file=file)
@@ -0,0 +1,87 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from flinx.generation import write_template_files
+
+MODULE_TEXT = '''"""{docstring}"""
+from pathlib import Path
+
+__version__ = "0.1.0"
+
+with open(Path(__file__).parent / 'imports.txt', 'a') as f:
+    f.write('imported\\n')
+'''
+
+
+def build(docs_dir):
+    from sphinx.cmd.build import main
+    sys.modules.pop('cached_module', None)
+    status = main(['-q', str(docs_dir), str(docs_dir / '_build' / 'html')])
+    assert status == 0
+
+
+def touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_autodoc_cache(tmp_path, monkeypatch):
+    pytest.importorskip('sphinx')
+    monkeypatch.chdir(tmp_path)
+    module_path = Path('cached_module.py')
+    module_path.write_text(MODULE_TEXT.format(docstring='The module.'))
+    imports_path = Path('imports.txt')
+    docs_dir = Path('docs')
+    write_template_files(docs_dir, verbose=False)
+    index_html = docs_dir / '_build' / 'html' / 'index.html'
+
+    build(docs_dir)
+    assert imports_path.read_text().count('imported') == 1
+    assert list((docs_dir / '_build' / 'html' / '.doctrees' / 'flinx-autodoc').glob('*.json'))
+
+    # re-reading the page uses the cached content
+    touch(docs_dir / 'index.rst')
+    build(docs_dir)
+    assert imports_path.read_text().count('imported') == 1
+    assert 'The module.' in index_html.read_text()
+
+    # a change to the module source invalidates the cache entry
+    module_path.write_text(MODULE_TEXT.format(docstring='The revised module.'))
+    touch(module_path)
+    build(docs_dir)
+    assert imports_path.read_text().count('imported') == 2
+    assert 'The revised module.' in index_html.read_text()
+
+    # so does a change to the autodoc configuration, in the same process
+    with open(docs_dir / 'conf.py', 'a') as f:
+        f.write('\nautodoc_member_order = "bysource"\n')
+    build(docs_dir)
+    assert imports_path.read_text().count('imported') == 3
+
+
+def test_autodoc_cache_current_module(tmp_path, monkeypatch):
+    pytest.importorskip('sphinx')
+    monkeypatch.chdir(tmp_path)
+    Path('current_pkg').mkdir()
+    Path('current_pkg/__init__.py').write_text('def add(a, b):\n    """Add."""\n')
+    Path('current_pkg/sub.py').write_text('def add(a, b):\n    """Add."""\n')
+    docs_dir = Path('docs')
+    docs_dir.mkdir()
+    (docs_dir / 'conf.py').write_text(
+        'import sys\nsys.path.insert(0, {!r})\n'
+        'extensions = ["flinx.autodoc_cache"]\n'.format(str(tmp_path)))
+    (docs_dir / 'index.rst').write_text('Index\n=====\n\n.. toctree::\n\n   a\n   b\n')
+    for name, module in [('a', 'current_pkg'), ('b', 'current_pkg.sub')]:
+        (docs_dir / (name + '.rst')).write_text(
+            '{0}\n=\n\n.. currentmodule:: {1}\n\n.. autofunction:: add\n'.format(
+                name.upper(), module))
+    try:
+        build(docs_dir)
+    finally:
+        for name in ('current_pkg', 'current_pkg.sub'):
+            sys.modules.pop(name, None)
+    html_dir = docs_dir / '_build' / 'html'
+    assert 'id="current_pkg.add"' in (html_dir / 'a.html').read_text()
+    assert 'id="current_pkg.sub.add"' in (html_dir / 'b.html').read_text()
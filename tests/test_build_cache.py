@@ -0,0 +1,147 @@
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+from flinx import commands
+from flinx.build_cache import BuildCache, environment_key, read_extensions
+
+from click.testing import CliRunner
+
+
+def make_project(root):
+    (root / 'docs').mkdir()
+    (root / 'module.py').write_text('__version__ = "0.1.0"\n')
+    (root / 'docs' / 'conf.py').write_text("extensions = ['sphinx.ext.autodoc']\n")
+    (root / 'docs' / 'index.rst').write_text('Index\n=====\n')
+    (root / 'docs' / 'other.rst').write_text('Other\n=====\n')
+
+
+def make_doctrees(path, text):
+    path.mkdir(parents=True)
+    (path / 'environment.pickle').write_text(text)
+
+
+def sphinx_build(docs_dir, doctree_dir):
+    from sphinx.cmd.build import main
+    status = main(['-q', '-d', str(doctree_dir), str(docs_dir),
+                   str(docs_dir / '_build' / 'html')])
+    assert status == 0
+
+
+def read_times(doctree_dir):
+    with open(str(doctree_dir / 'environment.pickle'), 'rb') as f:
+        return pickle.load(f).all_docs
+
+
+def test_read_extensions(tmp_path):
+    conf = tmp_path / 'conf.py'
+    conf.write_text("import os\nextensions = ['a', 'b.c']\n")
+    assert read_extensions(conf) == ['a', 'b.c']
+    conf.write_text("extensions = os.environ['EXTENSIONS']\n")
+    assert read_extensions(conf) == []
+    assert read_extensions(tmp_path / 'missing.py') == []
+
+
+def test_restore_and_publish(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_project(tmp_path)
+    docs_dir, doctree_dir = Path('docs'), Path('docs/_build/html/.doctrees')
+    cache_dir = tmp_path / 'cache'
+
+    assert BuildCache(cache_dir).restore(docs_dir, doctree_dir) is None
+    sphinx_build(docs_dir, doctree_dir)
+    built_times = read_times(doctree_dir)
+    BuildCache(cache_dir).publish(docs_dir, doctree_dir)
+    assert len(list((cache_dir / 'objects').glob('*.tar.gz'))) == 1
+
+    # a local environment isn't replaced
+    assert BuildCache(cache_dir).restore(docs_dir, doctree_dir) is None
+
+    # the documents are marked as read after their sources were modified, and
+    # the sources themselves aren't touched
+    shutil.rmtree('docs/_build')
+    os.utime('docs/index.rst')
+    mtime = os.stat('docs/index.rst').st_mtime_ns
+    assert BuildCache(cache_dir).restore(docs_dir, doctree_dir) == 'exact'
+    times = read_times(doctree_dir)
+    assert times['index'] >= mtime // 1000 > built_times['index']
+    assert times['other'] > built_times['other']
+    assert os.stat('docs/index.rst').st_mtime_ns == mtime
+
+    shutil.rmtree('docs/_build')
+    Path('docs/other.rst').write_text('Changed\n=======\n')
+    os.utime('docs/other.rst', ns=(0, 0))
+    assert BuildCache(cache_dir).restore(docs_dir, doctree_dir) == 'partial'
+    times = read_times(doctree_dir)
+    assert times['other'] == 0 and times['index'] > built_times['index']
+    assert os.stat('docs/other.rst').st_mtime_ns == 0
+
+    # a different configuration has a different key
+    key = environment_key(docs_dir)
+    Path('docs/conf.py').write_text("extensions = []\n")
+    assert environment_key(docs_dir) != key
+    shutil.rmtree('docs/_build')
+    assert BuildCache(cache_dir).restore(docs_dir, doctree_dir) is None
+
+
+def test_restore_in_another_directory(tmp_path, monkeypatch):
+    first_dir, second_dir = tmp_path / 'first', tmp_path / 'second'
+    first_dir.mkdir()
+    make_project(first_dir)
+    docs_dir, doctree_dir = Path('docs'), Path('docs/_build/html/.doctrees')
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.chdir(first_dir)
+    sphinx_build(docs_dir, doctree_dir)
+    BuildCache(cache_dir).publish(docs_dir, doctree_dir)
+
+    # another checkout of the same sources, at a different path
+    shutil.copytree(str(first_dir), str(second_dir),
+                    ignore=shutil.ignore_patterns('_build'))
+    monkeypatch.chdir(second_dir)
+    assert BuildCache(cache_dir).restore(docs_dir, doctree_dir) == 'exact'
+    restored_times = read_times(doctree_dir)
+    sphinx_build(docs_dir, doctree_dir)
+    # Sphinx kept the environment, and read no documents again
+    assert read_times(doctree_dir) == restored_times
+
+
+def test_evict(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_project(tmp_path)
+    docs_dir, doctree_dir = Path('docs'), Path('docs/_build/html/.doctrees')
+    cache_dir = tmp_path / 'cache'
+    for i in range(3):
+        Path('docs/index.rst').write_text('Index {}\n=======\n'.format(i))
+        shutil.rmtree('docs/_build', ignore_errors=True)
+        make_doctrees(doctree_dir, os.urandom(4096).hex())
+        BuildCache(cache_dir, max_size=6000).publish(docs_dir, doctree_dir)
+    assert len(list((cache_dir / 'objects').glob('*.tar.gz'))) == 1
+    assert len(list((cache_dir / 'entries').glob('*/*.json'))) == 1
+
+
+def test_build_restores_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('module.py').write_text('__version__ = "0.1.0"\n')
+        Path('docs').mkdir()
+        Path('docs/page.rst').write_text('Page\n====\n')
+        args = ['build', '--offline', '--verbose', '--cache-dir', str(tmp_path / 'cache')]
+        result = runner.invoke(commands.cli, args)
+        assert result.exit_code == 0, result.output
+        assert 'build cache: stored' in result.output
+
+        shutil.rmtree('docs/_build')
+        result = runner.invoke(commands.cli, args)
+        assert result.exit_code == 0, result.output
+        assert 'build cache: exact hit' in result.output
+        assert '0 added, 0 changed, 0 removed' in result.output
+
+        # only the page that changed is read again
+        shutil.rmtree('docs/_build')
+        Path('docs/page.rst').write_text('Changed\n=======\n')
+        result = runner.invoke(commands.cli, args)
+        assert result.exit_code == 0, result.output
+        assert 'build cache: partial hit, 1 changed file(s)' in result.output
+        assert '0 added, 1 changed, 0 removed' in result.output
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from flinx import commands
+
+from click.testing import CliRunner
+
+
+def test_check(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('check_module.py').write_text('__version__ = "0.1.0"\n')
+        result = runner.invoke(commands.cli, ['check'])
+        assert result.exit_code == 1
+        assert 'no build has been recorded' in result.output
+
+        result = runner.invoke(commands.cli, ['build', '--offline'])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(commands.cli, ['check'])
+        assert result.exit_code == 0, result.output
+        assert result.output == ''
+
+        Path('check_module.py').write_text('__version__ = "0.2.0"\n')
+        result = runner.invoke(commands.cli, ['check'])
+        assert result.exit_code == 1
+        assert 'generated file conf.py has changed' in result.output
+        assert "version has changed from '0.1.0' to '0.2.0'" in result.output
+        assert 'check_module.py has changed' in result.output
+
+        result = runner.invoke(commands.cli, ['build', '--offline'])
+        assert runner.invoke(commands.cli, ['check']).exit_code == 0
+        Path('docs/page.rst').write_text('Page\n====\n')
+        result = runner.invoke(commands.cli, ['check'])
+        assert result.exit_code == 1
+        assert result.output == 'docs/page.rst has been added\n'
+
+
+def test_check_out_of_tree(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('check_module.py').write_text('__version__ = "0.1.0"\n')
+        Path('docs').mkdir()
+        result = runner.invoke(commands.cli, ['build', '--offline', '--out-of-tree'])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(commands.cli, ['check', '--out-of-tree'])
+        assert result.exit_code == 0, result.output
+        # the build isn't in ./docs
+        assert runner.invoke(commands.cli, ['check']).exit_code == 1
+
+        Path('docs/page.rst').write_text('Page\n====\n')
+        result = runner.invoke(commands.cli, ['check', '--out-of-tree'])
+        assert result.exit_code == 1
+        assert result.output.endswith('docs/page.rst has been added\n')
+        assert not list(Path('docs').glob('_build'))
+
+
+def test_check_doesnt_import_sphinx(tmp_path):
+    (tmp_path / 'module.py').write_text('__version__ = "0.1.0"\n')
+    package_dir = Path(commands.__file__).parent.parent
+    env = dict(os.environ, PYTHONPATH=str(package_dir))
+    process = subprocess.run(
+        [sys.executable, '-c',
+         'import sys\n'
+         'from flinx.commands import cli\n'
+         'try:\n'
+         '    cli(["check"])\n'
+         'except SystemExit:\n'
+         '    pass\n'
+         'assert not any(name.split(".")[0] == "sphinx" for name in sys.modules)\n'],
+        cwd=tmp_path, env=env, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    assert process.returncode == 0, process.stderr.decode()
+    assert b'no build has been recorded' in process.stdout
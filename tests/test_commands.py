@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch
 
@@ -15,7 +19,8 @@ def test_build(write_template_files, sphinx_build, wb_open, sys_exit):
     result = runner.invoke(commands.cli, ['build'])
     assert result.exit_code == 0
     assert result.output == ''
-    write_template_files.assert_called_with(Path('docs'), force=False, unless_exists=False, verbose=False)
+    write_template_files.assert_called_with(Path('docs'), force=False, offline=False,
+                                            unless_exists=False, verbose=False)
     sphinx_build.assert_called_with(['-b', 'html', '-c', 'docs', '-j', 'auto', '-q',
                                      'docs', 'docs/_build/html'])
     wb_open.assert_not_called()
@@ -49,38 +54,62 @@ def test_build(write_template_files, sphinx_build, wb_open, sys_exit):
 def test_build_options(write_template_files, build_sphinx_args, sphinx_build, sys_exit):
     runner = CliRunner()
     runner.invoke(commands.cli, ['build'])
-    build_sphinx_args.assert_called_with(all_files=False, force=False, fmt='html',
-                                         open_url=False, unless_exists=False,
-                                         verbose=False)
+    build_sphinx_args.assert_called_with(all_files=False, cache_dir=None,
+                                         cache_size=None, compress=False,
+                                         fingerprint=False, force=False, fmt='html',
+                                         offline=False, open_url=False,
+                                         out_of_tree=False, scratch_dir=None,
+                                         search_shards=False, shard=None,
+                                         timings=None,
+                                         unless_exists=False, verbose=False)
 
     build_sphinx_args.reset_mock()
     runner.invoke(commands.cli, ['build', '--unless-exists'])
-    build_sphinx_args.assert_called_with(all_files=False, force=False,
-                                         fmt='html', open_url=False,
+    build_sphinx_args.assert_called_with(all_files=False, cache_dir=None,
+                                         cache_size=None, compress=False,
+                                         fingerprint=False, force=False,
+                                         fmt='html', offline=False, open_url=False,
+                                         out_of_tree=False, scratch_dir=None,
+                                         search_shards=False, shard=None,
+                                         timings=None,
                                          unless_exists=True, verbose=False)
 
 
-@patch('sys.exit')
-@patch('subprocess.run')
+@patch('flinx.server.serve')
 @patch('flinx.commands.build_sphinx_args', return_value={
     'build_args': ['--build-args--'],
-    'build_dir': '_build',
-    'docs_dir': 'docs',
+    'build_dir': Path('docs/_build/html'),
+    'docs_dir': Path('docs'),
+    'source_dir': Path('docs'),
 })
-def test_serve(build_sphinx_args, subprocess_run, sys_exit):
+def test_serve(build_sphinx_args, serve_docs):
     runner = CliRunner()
 
     result = runner.invoke(commands.cli, ['serve'])
     assert result.exit_code == 0
     assert result.output == ''
-    subprocess_run.assert_called_with(['sphinx-autobuild', '--build-args--'])
-    sys_exit.assert_called_with(0)
+    serve_docs.assert_called_with(Path('docs'), Path('docs/_build/html'),
+                                  host='127.0.0.1', port=8000, open_url=False,
+                                  source_dir=Path('docs'), all_files=False,
+                                  verbose=False)
 
-    result = runner.invoke(commands.cli, ['serve', '--open-url'])
+    result = runner.invoke(commands.cli, ['serve', '--open-url', '--port', '8080'])
     assert result.exit_code == 0
     assert result.output == ''
-    subprocess_run.assert_called_with(['sphinx-autobuild', '--build-args--', '-B'])
-    sys_exit.assert_called_with(0)
+    serve_docs.assert_called_with(Path('docs'), Path('docs/_build/html'),
+                                  host='127.0.0.1', port=8080, open_url=True,
+                                  source_dir=Path('docs'), all_files=False,
+                                  verbose=False)
+
+    result = runner.invoke(commands.cli, ['serve', '--all-files'])
+    assert result.exit_code == 0
+    assert serve_docs.call_args[1]['all_files'] is True
+
+    serve_docs.reset_mock()
+    result = runner.invoke(commands.cli, ['serve', '--format', 'latex'])
+    assert result.exit_code == 2
+    assert 'serve only builds the html format' in result.output
+    serve_docs.assert_not_called()
 
 
 def test_files_exist():
@@ -113,3 +142,109 @@ def test_files_exist():
 
         result = runner.invoke(commands.cli, ['generate'])
         assert result.exit_code == 0, "--force overwrites the non-generated file"
+
+
+def test_generate_leaves_unchanged_files():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('module.py').write_text('__version__ = "0.1.0"\n')
+
+        result = runner.invoke(commands.cli, ['generate'])
+        assert result.exit_code == 0
+        conf_path = Path('docs/conf.py')
+        mtime = conf_path.stat().st_mtime_ns
+        os.utime(conf_path, ns=(mtime - 10**9, mtime - 10**9))
+
+        result = runner.invoke(commands.cli, ['generate'])
+        assert result.exit_code == 0
+        assert 'Wrote' not in result.output
+        assert conf_path.stat().st_mtime_ns == mtime - 10**9, "unchanged file isn't rewritten"
+
+        Path('module.py').write_text('__version__ = "0.2.0"\n')
+        result = runner.invoke(commands.cli, ['generate'])
+        assert result.exit_code == 0
+        assert 'Wrote docs/conf.py' in result.output
+        assert 'Wrote docs/index.rst' not in result.output
+
+
+# Cumulative import time budget for the ``flinx`` package, in microseconds. This
+# is generous, so that it only trips when a heavy import creeps back in.
+IMPORT_TIME_BUDGET_US = 300000
+
+
+def test_generate_startup(tmp_path):
+    (tmp_path / 'module.py').write_text('__version__ = "0.1.0"\n')
+    package_dir = Path(commands.__file__).parent.parent
+    env = dict(os.environ, PYTHONPATH=str(package_dir))
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import sys; from flinx.commands import cli; cli(["generate"])'],
+        cwd=tmp_path, env=env, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    assert process.returncode == 0, process.stderr.decode()
+    import_times = {}
+    for line in process.stderr.decode().splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            import_times[name.strip()] = cumulative.strip()
+    assert not any(name.split('.')[0] == 'sphinx' for name in import_times), \
+        "generate doesn't import Sphinx"
+    assert int(import_times['flinx']) < IMPORT_TIME_BUDGET_US
+
+
+@patch('sys.exit')
+@patch('concurrent.futures.ProcessPoolExecutor', ThreadPoolExecutor)
+@patch('flinx.commands.shutil.copytree')
+@patch('flinx.commands.sphinx_build', return_value=0)
+@patch('flinx.commands.write_template_files')
+def test_build_formats(write_template_files, sphinx_build, copytree, sys_exit):
+    runner = CliRunner()
+    result = runner.invoke(commands.cli, ['build', '--format', 'html,latex'])
+    assert result.exit_code == 0
+    builders = [call[0][0][1] for call in sphinx_build.call_args_list]
+    assert builders[0] == 'dummy', "reads the sources once"
+    assert sorted(builders[1:]) == ['html', 'latex']
+    assert [call[0][1] for call in copytree.call_args_list] == [
+        'docs/_build/html/.doctrees', 'docs/_build/latex/.doctrees']
+    assert 'html' in result.output and 'latex' in result.output
+    sys_exit.assert_called_with(0)
+
+    sphinx_build.reset_mock()
+    sphinx_build.side_effect = lambda args: 2 if args[1] == 'latex' else 0
+    result = runner.invoke(commands.cli, ['build', '--format', 'html,latex'])
+    sys_exit.assert_any_call(2)
+
+
+def test_generate_module_pages():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('pyproject.toml').write_text('[tool.flinx]\nmodule-pages = true\n')
+        Path('pkg/sub').mkdir(parents=True)
+        Path('pkg/__init__.py').write_text('__version__ = "0.1.0"\n')
+        Path('pkg/a.py').write_text('')
+        Path('pkg/sub/__init__.py').write_text('')
+
+        result = runner.invoke(commands.cli, ['generate'])
+        assert result.exit_code == 0
+        index_text = Path('docs/index.rst').read_text()
+        assert 'automodule' not in index_text
+        assert '   api/pkg\n   api/pkg.a\n   api/pkg.sub' in index_text
+        assert '.. automodule:: pkg.a' in Path('docs/api/pkg.a.rst').read_text()
+
+        Path('pkg/a.py').unlink()
+        result = runner.invoke(commands.cli, ['generate'])
+        assert result.exit_code == 0
+        assert 'Removed docs/api/pkg.a.rst' in result.output
+        assert not Path('docs/api/pkg.a.rst').exists()
+
+
+@patch('flinx.commands.sphinx_build', return_value=0)
+def test_build_profile(sphinx_build):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('module.py').write_text('__version__ = "0.1.0"\n')
+        result = runner.invoke(commands.cli, ['build', '--profile',
+                                              '--profile-output', 'trace.json'])
+        assert result.exit_code == 0
+        assert 'metadata' in result.output
+        assert 'render templates' in result.output
+        assert Path('trace.json').exists()
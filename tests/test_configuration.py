@@ -0,0 +1,31 @@
+import os
+from unittest.mock import patch
+
+import flinx.configuration as configuration
+from flinx.configuration import get_sphinx_configuration, read_toml
+
+
+def test_read_toml_cache(tmp_path):
+    path = tmp_path / 'pyproject.toml'
+    path.write_text('[tool.flinx.configuration]\nhtml_theme = "alabaster"\n')
+    with patch.object(configuration.toml, 'loads', wraps=configuration.toml.loads) as loads:
+        assert read_toml(path) is read_toml(path)
+        assert loads.call_count == 1
+
+        # a change to the file invalidates the cached document
+        path.write_text('[tool.flinx.configuration]\nhtml_theme = "sphinx_rtd_theme"\n')
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert get_sphinx_configuration(tmp_path) == {'html_theme': 'sphinx_rtd_theme'}
+        assert loads.call_count == 2
+
+
+def test_get_sphinx_configuration(tmp_path):
+    assert get_sphinx_configuration(tmp_path) == {}
+
+    (tmp_path / 'pyproject.toml').write_text('[tool.flinx.configuration]\ntodo_include_todos = true\n')
+    config = get_sphinx_configuration(tmp_path)
+    assert config == {'todo_include_todos': True}
+    config['extensions'] = []
+    assert get_sphinx_configuration(tmp_path) == {'todo_include_todos': True}, \
+        "callers can't modify the cached document"
@@ -0,0 +1,76 @@
+import io
+import threading
+import time
+
+from flinx.daemon import Daemon, send_request
+
+import pytest
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    daemon = Daemon(tmp_path / 'daemon.sock', idle_timeout=60)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if daemon.socket_path.exists():
+            break
+        time.sleep(0.01)
+    yield daemon
+    daemon.server.shutdown()
+    thread.join()
+
+
+def run(daemon, project_dir, *args):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = send_request(args, daemon.socket_path, cwd=project_dir,
+                          stdout=stdout, stderr=stderr)
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+def test_daemon_build(daemon, tmp_path):
+    project_dir = tmp_path / 'project'
+    project_dir.mkdir()
+    module_path = project_dir / 'daemon_module.py'
+    module_path.write_text('"""First docstring."""\n__version__ = "0.1.0"\n')
+
+    status, stdout, stderr = run(daemon, project_dir, 'build', '--offline')
+    assert status == 0, stderr
+    html_path = project_dir / 'docs' / '_build' / 'html' / 'index.html'
+    assert 'First docstring.' in html_path.read_text()
+    [(app, _)] = daemon.sphinx_apps.apps.values()
+
+    module_path.write_text('"""Second docstring."""\n__version__ = "0.1.0"\n')
+    status, stdout, stderr = run(daemon, project_dir, 'build', '--offline')
+    assert status == 0, stderr
+    assert 'Second docstring.' in html_path.read_text()
+    [(same_app, _)] = daemon.sphinx_apps.apps.values()
+    assert same_app is app, "the Sphinx application is re-used"
+
+    status, stdout, stderr = run(daemon, project_dir, 'check')
+    assert (status, stdout) == (0, '')
+
+
+def test_daemon_errors(daemon, tmp_path):
+    status, _, stderr = run(daemon, tmp_path, 'serve')
+    assert status == 2
+    assert "can't run in the daemon" in stderr
+
+    status, _, stderr = run(daemon, tmp_path, 'no-such-command')
+    assert status == 2
+    assert 'No such command' in stderr
+
+
+def test_send_request_without_daemon(tmp_path):
+    with pytest.raises(ConnectionError):
+        send_request(['build'], tmp_path / 'missing.sock')
+
+
+def test_idle_timeout(tmp_path):
+    daemon = Daemon(tmp_path / 'daemon.sock', idle_timeout=0.2)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not daemon.socket_path.exists()
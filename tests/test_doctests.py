@@ -0,0 +1,73 @@
+from pathlib import Path
+from xml.etree import ElementTree
+
+from flinx import commands
+from flinx.doctests import imported_names
+
+from click.testing import CliRunner
+
+
+def test_imported_names():
+    source = 'import os.path\nfrom . import b\nfrom ..c import d\nfrom e import f\n'
+    assert imported_names(source, 'pkg.sub') == {
+        'os.path', 'pkg.sub', 'pkg.sub.b', 'pkg.c', 'pkg.c.d', 'e', 'e.f'}
+    assert imported_names('>>> not python') == set()
+
+
+def test_doctests(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('dt_pkg').mkdir()
+        Path('dt_pkg/__init__.py').write_text('__version__ = "0.1.0"\n')
+        Path('dt_pkg/a.py').write_text(
+            'def double(x):\n'
+            '    """\n'
+            '    >>> double(2)\n'
+            '    4\n'
+            '    """\n'
+            '    return 2 * x\n')
+        Path('dt_pkg/b.py').write_text(
+            'from .a import double\n\n\n'
+            'def quadruple(x):\n'
+            '    """\n'
+            '    >>> quadruple(1)\n'
+            '    4\n'
+            '    """\n'
+            '    return double(double(x))\n')
+        Path('dt_pkg/c.py').write_text('"""\n>>> 1 + 1\n2\n"""\n')
+        Path('docs').mkdir()
+        Path('docs/usage.rst').write_text(
+            'Usage\n=====\n\n>>> from dt_pkg.a import double\n>>> double(3)\n6\n')
+
+        result = runner.invoke(commands.cli, ['test', '--verbose'])
+        assert result.exit_code == 0, result.output
+        assert 'dt_pkg.a.double: 1 examples passed' in result.output
+        assert result.output.endswith('5 passed, 0 failed, 0 unchanged\n')
+
+        result = runner.invoke(commands.cli, ['test'])
+        assert result.output == '0 passed, 0 failed, 5 unchanged\n'
+
+        # b and the page import a; c doesn't
+        Path('dt_pkg/a.py').write_text(
+            Path('dt_pkg/a.py').read_text().replace('2 * x', '2 * x + 1'))
+        result = runner.invoke(commands.cli, ['test', '--junit-xml', 'results.xml'])
+        assert result.exit_code == 1
+        assert 'Failed example:\n    quadruple(1)' in result.output
+        assert result.output.endswith('0 passed, 3 failed, 2 unchanged\n')
+
+        suites = {suite.get('name'): suite
+                  for suite in ElementTree.parse('results.xml').getroot()}
+        assert set(suites) == {'dt_pkg', 'dt_pkg.a', 'dt_pkg.b', 'dt_pkg.c',
+                               'docs/usage.rst'}
+        assert suites['dt_pkg.b'].get('failures') == '1'
+        assert suites['dt_pkg.c'].get('skipped') == '1'
+        failure = suites['dt_pkg.b'].find('testcase/failure')
+        assert 'quadruple(1)' in failure.text
+
+        # failing modules are re-tested, even if they haven't changed
+        result = runner.invoke(commands.cli, ['test'])
+        assert result.output.endswith('0 passed, 3 failed, 2 unchanged\n')
+
+        result = runner.invoke(commands.cli, ['test', '--all'])
+        assert result.output.endswith('2 passed, 3 failed, 0 unchanged\n')
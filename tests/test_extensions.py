@@ -33,3 +33,11 @@ def test_get_extensions():
     # assert 'sphinx.ext.extlinks' in get_extensions({'extlinks': {}})
     # assert 'sphinx.ext.mathjax' in get_extensions({'math_number_all': True})
     # assert 'sphinx.ext.mathjax' in get_extensions({'imgmath_image_format': True})
+
+
+def test_flinx_extensions():
+    assert get_extensions({}, include_flinx_extensions=True) == [
+        'sphinx.ext.autodoc', 'flinx.autodoc_cache', 'flinx.profiling',
+        'flinx.sharding', 'flinx.versions']
+    assert get_extensions({'extensions': ['todo']}, include_flinx_extensions=True) == [
+        'sphinx.ext.todo', 'flinx.profiling', 'flinx.sharding', 'flinx.versions']
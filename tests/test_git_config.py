@@ -0,0 +1,85 @@
+import subprocess
+
+import pytest
+from flinx.git_config import (find_git_dir, get_git_config, parse_value,
+                              read_git_config)
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    home = tmp_path / 'home'
+    home.mkdir()
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.delenv('XDG_CONFIG_HOME', raising=False)
+    monkeypatch.delenv('GIT_CONFIG_GLOBAL', raising=False)
+    read_git_config.cache_clear()
+    yield home
+    read_git_config.cache_clear()
+
+
+def test_parse_value():
+    assert parse_value(' Oliver Steele ') == 'Oliver Steele'
+    assert parse_value(' "Oliver  Steele" # comment') == 'Oliver  Steele'
+    assert parse_value(r'"a \"b\" ; c"') == 'a "b" ; c'
+    assert parse_value('value ; comment') == 'value'
+
+
+def test_git_config(home, tmp_path):
+    (home / '.config' / 'git').mkdir(parents=True)
+    (home / '.config' / 'git' / 'config').write_text(
+        '[user]\n\tname = XDG User\n\temail = xdg@example.com\n[core]\n\teditor = vi\n')
+    (home / '.gitconfig').write_text(
+        '[user]\n\tname = Global User\n[include]\n\tpath = extra.inc\n'
+        '[Remote "Origin"]\n\turl = https://example.com/repo\n')
+    (home / 'extra.inc').write_text('[user]\n\temail = "included@example.com"\n')
+
+    project = tmp_path / 'project'
+    (project / '.git').mkdir(parents=True)
+    (project / 'sub').mkdir()
+    (project / '.git' / 'config').write_text('[core]\n\tbare = false\n\tfilemode\n')
+
+    assert find_git_dir(project / 'sub') == project / '.git'
+    assert get_git_config('user.name', project / 'sub') == 'Global User'
+    assert get_git_config('user.email', project) == 'included@example.com'
+    assert get_git_config('core.editor', project) == 'vi'
+    assert get_git_config('core.filemode', project) == 'true'
+    assert get_git_config('REMOTE.Origin.URL', project) == 'https://example.com/repo'
+    assert get_git_config('remote.origin.url', project) is None
+    assert get_git_config('user.signingkey', project) is None
+
+
+def test_git_config_repository(home, tmp_path):
+    (home / '.gitconfig').write_text('[user]\n\tname = Global User\n')
+    project = tmp_path / 'worktree'
+    project.mkdir()
+    git_dir = tmp_path / 'repo.git'
+    git_dir.mkdir()
+    (git_dir / 'config').write_text('[user]\n\tname = Repository User\n')
+    (project / '.git').write_text('gitdir: ../repo.git\n')
+    assert get_git_config('user.name', project) == 'Repository User'
+
+
+def test_git_config_worktree(home, tmp_path):
+    (home / '.gitconfig').write_text('[user]\n\tname = Global User\n')
+    repo = tmp_path / 'repo'
+    worktree = tmp_path / 'worktree'
+
+    def git(*args):
+        subprocess.run(['git', '-c', 'user.name=Committer',
+                        '-c', 'user.email=committer@example.com'] + list(args),
+                       cwd=str(repo), check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+
+    repo.mkdir()
+    git('init', '-q')
+    git('config', 'user.name', 'Repo Author')
+    git('commit', '-q', '--allow-empty', '-m', 'initial')
+    git('worktree', 'add', '-q', str(worktree))
+    assert get_git_config('user.name', worktree) == 'Repo Author'
+
+    # the worktree's own configuration takes precedence
+    git_dir = find_git_dir(worktree)
+    (git_dir / 'config.worktree').write_text('[user]\n\tname = Worktree Author\n')
+    read_git_config.cache_clear()
+    assert get_git_config('user.name', worktree) == 'Worktree Author'
+    assert get_git_config('user.name', repo) == 'Repo Author'
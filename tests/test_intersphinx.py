@@ -0,0 +1,112 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flinx.intersphinx import InventoryCache, normalize_mapping
+
+INVENTORY = b'# Sphinx inventory version 2\n'
+
+
+class InventoryHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path.startswith('/missing/'):
+            self.send_response(404)
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(INVENTORY)))
+            self.end_headers()
+            self.wfile.write(INVENTORY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    InventoryHandler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), InventoryHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_normalize_mapping():
+    assert normalize_mapping({'python': ['https://docs.python.org/3', None]}) == {
+        'python': ('https://docs.python.org/3', None)}
+    assert normalize_mapping({'https://docs.python.org/': None}) == {
+        'https://docs.python.org/': ('https://docs.python.org/', None)}
+
+
+def test_inventory_cache(server, tmp_path):
+    mapping = {'a': (server + '/a', None),
+               'b': (server + '/b', server + '/b/custom.inv'),
+               'local': ('https://example.com', 'vendored/objects.inv')}
+    cache = InventoryCache(tmp_path, ttl=3600)
+    resolved = cache.resolve(mapping)
+    assert resolved['local'] == ('https://example.com', 'vendored/objects.inv')
+    for name in 'ab':
+        uri, path = resolved[name]
+        assert uri == mapping[name][0]
+        assert open(path, 'rb').read() == INVENTORY
+    assert sorted(path for path, _ in InventoryHandler.requests) == [
+        '/a/objects.inv', '/b/custom.inv']
+
+    # fresh copies are used without a request
+    InventoryHandler.requests = []
+    assert cache.resolve(mapping) == resolved
+    assert InventoryHandler.requests == []
+
+    # stale copies are revalidated with a conditional request
+    expired = InventoryCache(tmp_path, ttl=0)
+    assert expired.resolve(mapping) == resolved
+    assert sorted(InventoryHandler.requests) == [('/a/objects.inv', '"v1"'),
+                                                 ('/b/custom.inv', '"v1"')]
+
+
+def test_inventory_cache_offline(server, tmp_path):
+    InventoryCache(tmp_path).resolve({'a': (server + '/a', None)})
+    InventoryHandler.requests = []
+    offline = InventoryCache(tmp_path, ttl=0, offline=True)
+    resolved = offline.resolve({'a': (server + '/a', None), 'b': (server + '/b', None)})
+    assert list(resolved) == ['a'], "uncached inventories are omitted"
+    assert InventoryHandler.requests == []
+
+
+def test_inventory_cache_failure(server, tmp_path):
+    cache = InventoryCache(tmp_path)
+    resolved = cache.resolve({'missing': (server + '/missing', None)})
+    assert resolved == {'missing': (server + '/missing', None)}
+
+
+def test_eject_uses_inventory_cache(server, tmp_path, monkeypatch):
+    from click.testing import CliRunner
+    from flinx import commands
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'module.py').write_text('__version__ = "0.1.0"\n')
+    (tmp_path / 'pyproject.toml').write_text(
+        '[tool.flinx]\nintersphinx-cache-dir = "cache"\n'
+        '[tool.flinx.configuration]\nextensions = ["sphinx.ext.intersphinx"]\n'
+        '[tool.flinx.configuration.intersphinx_mapping]\n'
+        'a = ["{0}/a", "{0}/a/objects.inv"]\n'
+        'b = ["{0}/b", "{0}/b/objects.inv"]\n'.format(server))
+    InventoryCache(tmp_path / 'cache').resolve({'a': (server + '/a', None)})
+    InventoryHandler.requests = []
+
+    # an ejected conf.py, like a generated one, uses the cache; offline, an
+    # uncached inventory is omitted
+    result = CliRunner().invoke(commands.cli, ['eject', '--offline'])
+    assert result.exit_code == 0, result.output
+    conf = (tmp_path / 'docs' / 'conf.py').read_text()
+    assert "'cache/" in conf
+    assert server + '/b' not in conf
+    assert InventoryHandler.requests == []
@@ -0,0 +1,117 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flinx.linkcheck import check_links, page_links
+
+import pytest
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = Counter()
+
+    def respond(self, body):
+        self.requests[self.command, self.path] += 1
+        path = self.path.split('?')[0]
+        if path == '/ok':
+            self.send_response(200)
+        elif path == '/moved':
+            self.send_response(301)
+            self.send_header('Location', '/ok')
+        elif path == '/get-only':
+            self.send_response(405 if self.command == 'HEAD' else 200)
+        else:
+            self.send_response(404)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        if body:
+            self.wfile.write(b'hi')
+
+    def do_HEAD(self):
+        self.respond(body=False)
+
+    def do_GET(self):
+        self.respond(body=True)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests.clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def page(*urls):
+    return ''.join('<a class="reference external" href="{}">link</a>\n'.format(url)
+                   for url in urls) + '<a href="#local">local</a>\n'
+
+
+def test_page_links(tmp_path):
+    path = tmp_path / 'page.html'
+    path.write_text(page('https://example.com/b#anchor', 'http://example.com/a',
+                         '_static/style.css'))
+    assert page_links(path) == ['http://example.com/a', 'https://example.com/b']
+
+
+def test_check_links(server, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    build_dir = tmp_path / 'html'
+    build_dir.mkdir()
+    cache_path = tmp_path / 'cache.json'
+    (build_dir / 'index.html').write_text(page(server + '/ok', server + '/moved'))
+    (build_dir / 'api.html').write_text(page(server + '/ok', server + '/get-only',
+                                             server + '/missing'))
+
+    assert check_links(build_dir, cache_path=cache_path, verbose=True) == 1
+    output = capsys.readouterr().out
+    assert 'api.html: {}/missing: HTTP status 404'.format(server) in output
+    assert 'index.html: {}/moved: redirected to {}/ok'.format(server, server) in output
+    assert output.endswith('2 page(s) and 4 link(s) checked, 0 from the cache; '
+                           '1 broken\n')
+    assert Handler.requests[('HEAD', '/ok')] == 2  # once, and after the redirect
+    assert Handler.requests[('GET', '/get-only')] == 1
+
+    # the page with the broken link is checked again, from the cache
+    Handler.requests.clear()
+    assert check_links(build_dir, cache_path=cache_path) == 1
+    assert capsys.readouterr().out.endswith(
+        '1 page(s) and 3 link(s) checked, 3 from the cache; 1 broken\n')
+    assert not Handler.requests
+
+    (build_dir / 'api.html').write_text(page(server + '/ok'))
+    assert check_links(build_dir, cache_path=cache_path) == 0
+    assert capsys.readouterr().out.endswith(
+        '1 page(s) and 1 link(s) checked, 1 from the cache; 0 broken\n')
+    assert check_links(build_dir, cache_path=cache_path) == 0
+    assert capsys.readouterr().out.startswith('0 page(s)')
+
+
+def test_check_links_unreachable(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    build_dir = tmp_path / 'html'
+    build_dir.mkdir()
+    (build_dir / 'index.html').write_text(page('http://127.0.0.1:1/'))
+    assert check_links(build_dir, cache_path=tmp_path / 'cache.json') == 1
+    assert 'index.html: http://127.0.0.1:1/: ' in capsys.readouterr().out
+
+
+def test_check_links_rate_limited(server, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    build_dir = tmp_path / 'html'
+    build_dir.mkdir()
+    # more links than can be requested within the timeout, at this rate; the
+    # wait for the rate limit doesn't count against each request's timeout
+    urls = ['{}/ok?{}'.format(server, i) for i in range(6)]
+    (build_dir / 'index.html').write_text(page(*urls))
+    assert check_links(build_dir, cache_path=tmp_path / 'cache.json',
+                       connections=1, rate=4, timeout=0.5) == 0
+    assert capsys.readouterr().out.endswith(
+        '1 page(s) and 6 link(s) checked, 0 from the cache; 0 broken\n')
@@ -0,0 +1,77 @@
+import gzip
+import os
+import re
+from pathlib import Path
+
+from flinx import commands
+from flinx.postprocess import postprocess
+
+from click.testing import CliRunner
+
+
+def make_build_dir(root):
+    (root / '_static').mkdir(parents=True)
+    (root / 'sub').mkdir()
+    (root / '_static' / 'font.ttf').write_bytes(b'font')
+    (root / '_static' / 'style.css').write_text('@font-face { src: url("font.ttf"); }')
+    (root / 'searchindex.js').write_text('Search.setIndex({})')
+    (root / 'index.html').write_text(
+        '<link href="_static/style.css?v=1"><script src="searchindex.js"></script>'
+        '<a href="https://example.com/_static/style.css">')
+    (root / 'sub' / 'page.html').write_text('<link href="../_static/style.css">')
+
+
+def fingerprinted(root, pattern):
+    return [str(path.relative_to(root)) for path in root.rglob('*')
+            if re.fullmatch(pattern, str(path.relative_to(root)))]
+
+
+def test_postprocess(tmp_path):
+    make_build_dir(tmp_path)
+    assert postprocess(tmp_path, jobs=1) > 0
+
+    [css] = fingerprinted(tmp_path, r'_static/style\.[0-9a-f]{12}\.css')
+    [font] = fingerprinted(tmp_path, r'_static/font\.[0-9a-f]{12}\.ttf')
+    [index] = fingerprinted(tmp_path, r'searchindex\.[0-9a-f]{12}\.js')
+    assert os.path.basename(font) in (tmp_path / css).read_text()
+    html = (tmp_path / 'index.html').read_text()
+    assert 'href="{}?v=1"'.format(css) in html
+    assert 'src="{}"'.format(index) in html
+    assert 'https://example.com/_static/style.css' in html
+    assert (tmp_path / 'sub' / 'page.html').read_text() == '<link href="../{}">'.format(css)
+    assert gzip.decompress((tmp_path / 'index.html.gz').read_bytes()).decode() == html
+
+    gz_mtime = os.stat(tmp_path / 'index.html.gz').st_mtime_ns
+    assert postprocess(tmp_path, jobs=1) == 0
+    assert os.stat(tmp_path / 'index.html.gz').st_mtime_ns == gz_mtime
+
+    # a changed asset gets a new name, and pages that weren't re-written are updated
+    (tmp_path / '_static' / 'style.css').write_text('body {}')
+    (tmp_path / 'index.html').write_text('<link href="_static/style.css">')
+    postprocess(tmp_path, jobs=1)
+    [new_css] = fingerprinted(tmp_path, r'_static/style\.[0-9a-f]{12}\.css')
+    assert new_css != css
+    assert not (tmp_path / (css + '.gz')).exists()
+    assert new_css in (tmp_path / 'index.html').read_text()
+    assert new_css in (tmp_path / 'sub' / 'page.html').read_text()
+
+
+def test_postprocess_compress_only(tmp_path):
+    make_build_dir(tmp_path)
+    postprocess(tmp_path, fingerprint=False, jobs=1)
+    assert fingerprinted(tmp_path, r'.*\.[0-9a-f]{12}\..*') == []
+    assert (tmp_path / '_static' / 'style.css.gz').exists()
+    assert (tmp_path / '_static' / 'font.ttf.gz').exists()
+
+
+def test_build_fingerprint(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('postprocess_module.py').write_text('__version__ = "0.1.0"\n')
+        result = runner.invoke(commands.cli, ['build', '--offline', '--compress',
+                                              '--fingerprint'])
+        assert result.exit_code == 0, result.output
+        html = Path('docs/_build/html/index.html').read_text()
+        assert re.search(r'href="_static/basic\.[0-9a-f]{12}\.css', html)
+        assert Path('docs/_build/html/index.html.gz').exists()
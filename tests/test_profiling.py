@@ -0,0 +1,33 @@
+import json
+
+import flinx.profiling as profiling
+from flinx.profiling import Profiler, phase
+
+
+def test_profiler(capsys, tmp_path):
+    profiler = Profiler()
+    with profiler.phase('outer'):
+        with profiler.phase('inner'):
+            pass
+    profiler.record('slow.rst', 1.0, 3.0, 'document')
+    profiler.record('fast.rst', 1.0, 1.5, 'document')
+
+    assert [event['name'] for event in profiler.phases()] == ['inner', 'outer']
+    assert [event['name'] for event in profiler.slowest_documents()] == [
+        'slow.rst', 'fast.rst']
+
+    profiler.print_summary()
+    output = capsys.readouterr().out
+    assert output.index('outer') < output.index('inner') < output.index('slow.rst')
+
+    trace_path = tmp_path / 'trace.json'
+    profiler.write_trace(trace_path)
+    events = json.loads(trace_path.read_text())['traceEvents']
+    assert {event['ph'] for event in events} == {'X'}
+    assert [event['dur'] for event in events if event['name'] == 'slow.rst'] == [2000000]
+
+
+def test_phase_inactive():
+    assert profiling.profiler is None
+    with phase('ignored'):
+        pass
@@ -1,7 +1,13 @@
+from pathlib import Path
+from unittest.mock import patch
+
 import pytest
+from flinx.git_config import read_git_config
 from flinx.project_metadata import (FlinxMetadata, FlitMetadata,
                                     InferredProjectMetadata, NoUniqueModuleError,
-                                    PoetryMetadata, ProjectMetadata)
+                                    PoetryMetadata, ProjectMetadata, find_module,
+                                    find_submodules, module_candidates,
+                                    read_version_def)
 
 expected_metadata = {
     'name': 'project-name',
@@ -72,3 +78,62 @@ def test_metadata_discovery():
     metadata = ProjectMetadata.from_dir('./tests/files/one-file')
     assert metadata['module'] == 'file-1'
     assert metadata['version'] == '1.0.0'
+
+
+def test_project_metadata_memoization():
+    metadata = ProjectMetadata.from_dir('./tests/files/one-file')
+    with patch('flinx.project_metadata.find_module', wraps=find_module) as fm:
+        assert metadata['module'] == 'file-1'
+        assert metadata['version'] == '1.0.0'
+        assert metadata['module'] == 'file-1'
+        assert fm.call_count == 1
+    with pytest.raises(KeyError):
+        metadata['no-such-key']
+    with pytest.raises(KeyError):
+        metadata['no-such-key']
+
+
+def test_find_submodules(tmp_path):
+    for path in ['pkg/__init__.py', 'pkg/a.py', 'pkg/_private.py', 'pkg/sub/__init__.py',
+                 'pkg/sub/b.py', 'pkg/data/c.py', 'pkg/_impl/__init__.py']:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text('')
+    assert find_submodules(tmp_path, 'pkg') == ['pkg', 'pkg.a', 'pkg.sub', 'pkg.sub.b']
+    assert find_submodules(tmp_path, 'module') == ['module']
+
+
+def test_inferred_author(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.delenv('XDG_CONFIG_HOME', raising=False)
+    monkeypatch.delenv('GIT_CONFIG_GLOBAL', raising=False)
+    read_git_config.cache_clear()
+    project = tmp_path / 'project'
+    (project / '.git').mkdir(parents=True)
+    (project / '.git' / 'config').write_text('[user]\n\tname = Repository User\n')
+    with patch('subprocess.run') as subprocess_run:
+        assert InferredProjectMetadata(project)['author'] == 'Repository User'
+        subprocess_run.assert_not_called()
+    read_git_config.cache_clear()
+
+
+def test_read_version_def(tmp_path):
+    path = tmp_path / 'module.py'
+    path.write_text('"""Doc."""\n__version__ = "1.2.3"\n' + '# padding\n' * 1000)
+    assert read_version_def(path) == '1.2.3'
+    with patch.object(Path, 'open') as path_open:
+        assert read_version_def(path) == '1.2.3'
+        path_open.assert_not_called()
+
+    path.write_text('# padding\n' * 1000 + '__version__ = "1.2.4"\n')
+    assert read_version_def(path) == '1.2.4'
+    assert read_version_def(path, max_bytes=1000) is None
+
+
+def test_module_candidates_cache(tmp_path):
+    (tmp_path / 'a.py').write_text('__version__ = "1.0"\n')
+    assert module_candidates(tmp_path, 'file') == ['a']
+    assert module_candidates(tmp_path, 'dir') == []
+
+    (tmp_path / 'b').mkdir()
+    (tmp_path / 'b' / '__init__.py').write_text('__version__ = "1.0"\n')
+    assert module_candidates(tmp_path, 'dir') == [tmp_path / 'b']
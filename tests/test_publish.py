@@ -0,0 +1,64 @@
+import json
+import os
+from pathlib import Path
+
+from flinx import commands
+from flinx.publish import CHANGES_NAME, publish, update_manifest
+
+from click.testing import CliRunner
+
+
+def write_files(root, files):
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_update_manifest(tmp_path):
+    write_files(tmp_path, {'index.html': 'index', '_static/a.css': 'a',
+                           '.doctrees/environment.pickle': ''})
+    changes = update_manifest(tmp_path)
+    assert changes == dict(added=['_static/a.css', 'index.html'], changed=[],
+                           deleted=[])
+
+    # re-written with the same contents
+    write_files(tmp_path, {'index.html': 'index', 'new.html': 'new'})
+    (tmp_path / '_static' / 'a.css').unlink()
+    changes = update_manifest(tmp_path)
+    assert changes == dict(added=['new.html'], changed=[], deleted=['_static/a.css'])
+    assert json.loads((tmp_path / CHANGES_NAME).read_text()) == changes
+
+    write_files(tmp_path, {'index.html': 'changed'})
+    assert update_manifest(tmp_path)['changed'] == ['index.html']
+
+
+def test_publish(tmp_path):
+    build_dir, dest_dir = tmp_path / 'build', tmp_path / 'dest'
+    write_files(build_dir, {'index.html': 'index', '_static/a.css': 'a'})
+    changes = publish(build_dir, dest_dir)
+    assert changes['added'] == ['_static/a.css', 'index.html']
+    assert (dest_dir / '_static' / 'a.css').read_text() == 'a'
+
+    mtime = os.stat(dest_dir / 'index.html').st_mtime_ns
+    write_files(build_dir, {'index.html': 'index', 'new.html': 'new'})
+    (build_dir / '_static' / 'a.css').unlink()
+    changes = publish(build_dir, dest_dir)
+    assert changes == dict(added=['new.html'], changed=[], deleted=['_static/a.css'])
+    assert os.stat(dest_dir / 'index.html').st_mtime_ns == mtime
+    assert not (dest_dir / '_static' / 'a.css').exists()
+    assert sorted(p.name for p in dest_dir.iterdir() if p.is_file()) == \
+        ['.flinx-manifest.json', 'index.html', 'new.html']
+
+    (dest_dir / 'new.html').unlink()
+    assert publish(build_dir, dest_dir)['added'] == ['new.html']
+
+
+def test_publish_command(tmp_path):
+    write_files(tmp_path / 'build', {'index.html': 'index'})
+    runner = CliRunner()
+    result = runner.invoke(commands.cli, ['publish', '--build-dir', str(tmp_path / 'build'),
+                                          '--to', str(tmp_path / 'dest')])
+    assert result.exit_code == 0, result.output
+    assert '1 added, 0 changed, 0 deleted' in result.output
+    assert Path(tmp_path / 'dest' / 'index.html').exists()
@@ -0,0 +1,56 @@
+import os
+from pathlib import Path
+
+from flinx import commands
+from flinx.generation import GENERATED_TEXT
+from flinx.scratch import default_scratch_dir, mirror_tree
+
+from click.testing import CliRunner
+
+
+def test_default_scratch_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    a, b = tmp_path / 'a' / 'project', tmp_path / 'b' / 'project'
+    assert default_scratch_dir(a).parent == tmp_path / 'flinx' / 'builds'
+    assert default_scratch_dir(a).name.startswith('project-')
+    assert default_scratch_dir(a) != default_scratch_dir(b)
+
+
+def test_mirror_tree(tmp_path):
+    source, dest = tmp_path / 'docs', tmp_path / 'scratch'
+    (source / 'sub').mkdir(parents=True)
+    (source / '_build').mkdir()
+    (source / 'page.rst').write_text('Page\n')
+    (source / 'sub' / 'other.rst').write_text('Other\n')
+    (source / '_build' / 'output.html').write_text('')
+    (source / 'conf.py').write_text('# {}\n'.format(GENERATED_TEXT))
+
+    assert sorted(mirror_tree(source, dest)) == [dest / 'page.rst',
+                                                 dest / 'sub' / 'other.rst']
+    assert os.stat(dest / 'page.rst').st_mtime_ns == \
+        os.stat(source / 'page.rst').st_mtime_ns
+    assert not (dest / 'conf.py').exists()
+    assert mirror_tree(source, dest) == []
+
+    (dest / 'index.rst').write_text('generated\n')
+    (source / 'sub' / 'other.rst').unlink()
+    assert mirror_tree(source, dest) == [dest / 'sub' / 'other.rst']
+    assert not (dest / 'sub' / 'other.rst').exists()
+    assert (dest / 'index.rst').exists()
+
+
+def test_build_out_of_tree(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    scratch_dir = tmp_path / 'scratch'
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        Path('out_of_tree_module.py').write_text('"""The module docstring."""\n'
+                                                 '__version__ = "0.1.0"\n')
+        Path('README.rst').write_text('Readme title\n============\n')
+        result = runner.invoke(commands.cli, ['build', '--offline',
+                                              '--scratch-dir', str(scratch_dir)])
+        assert result.exit_code == 0, result.output
+        assert sorted(os.listdir('.')) == ['README.rst', 'out_of_tree_module.py']
+        html = (scratch_dir / 'docs' / '_build' / 'html' / 'index.html').read_text()
+        assert 'Readme title' in html
+        assert 'The module docstring.' in html
@@ -0,0 +1,99 @@
+import json
+import re
+
+from flinx.postprocess import postprocess
+from flinx.search_index import (
+    SEARCH_DIR, group_prefixes, make_shard, read_search_index, shard_search_index)
+
+SEARCH_PAGE = '''<script src="_static/searchtools.js"></script>
+    <script src="searchindex.js" defer="defer"></script>
+'''
+
+
+def make_build_dir(root, terms):
+    index = dict(docnames=['index', 'page'], titles=['Index', 'Page'],
+                 terms=terms, titleterms={'page': 1})
+    (root / 'searchindex.js').write_text(
+        'Search.setIndex({})'.format(json.dumps(index)))
+    (root / '_static').mkdir()
+    (root / 'search.html').write_text(SEARCH_PAGE)
+    return index
+
+
+def read_shards(root, core):
+    shards = core['flinx_shards']
+    tables = {'terms': {}, 'titleterms': {}}
+    for file in shards['files']:
+        shard = json.loads((root / file).read_text())
+        for table, entries in shard['tables'].items():
+            for term, docs in entries.items():
+                assert shards['prefixes'][term[:shards['prefix_length']]] \
+                    == shards['files'].index(file)
+                tables[table][term] = shard['docs'][docs]
+    return tables
+
+
+def test_group_prefixes():
+    index = dict(terms={'aa': 0, 'ab': 0, 'ba': 0, 'bb': 0}, titleterms={'ca': 1})
+    assert group_prefixes(index, 1, 1) == [['a'], ['b'], ['c']]
+    assert group_prefixes(index, 1, 20) == [['a', 'b'], ['c']]
+    assert group_prefixes(index, 1, 1000) == [['a', 'b', 'c']]
+
+
+def test_make_shard():
+    index = dict(terms={'aa': [0, 1], 'ab': [0, 1], 'ac': 1, 'ba': 0},
+                 titleterms={'ad': [0, 1]})
+    assert make_shard(index, ['a'], 1) == dict(
+        docs=[[0, 1], 1], tables=dict(terms={'aa': 0, 'ab': 0, 'ac': 1},
+                                      titleterms={'ad': 0}))
+
+
+def test_shard_search_index(tmp_path):
+    terms = {'word{}'.format(i): [0, 1] if i % 2 else 1 for i in range(200)}
+    terms.update(alpha=0, beta=[0, 1])
+    index = make_build_dir(tmp_path, terms)
+    sizes = shard_search_index(tmp_path, prefix_length=5, shard_size=500)
+    assert len(sizes['shards']) > 2
+    html = (tmp_path / 'search.html').read_text()
+    [core_name] = re.findall(r'src="(_search/index\.[0-9a-f]{12}\.js)"', html)
+    assert 'src="_static/search-shards.js"' in html
+    assert (tmp_path / '_static' / 'search-shards.js').is_file()
+    # the original index is kept, for incremental builds
+    assert read_search_index(tmp_path / 'searchindex.js') == index
+
+    core = read_search_index(tmp_path / core_name)
+    assert core['terms'] == core['titleterms'] == {}
+    assert core['docnames'] == index['docnames']
+    assert read_shards(tmp_path, core) == dict(terms=terms, titleterms={'page': 1})
+    assert sizes['index'] == (tmp_path / core_name).stat().st_size
+
+    # a second run changes nothing
+    assert shard_search_index(tmp_path, prefix_length=5, shard_size=500) == sizes
+    assert (tmp_path / 'search.html').read_text() == html
+
+    # stale shards are removed, and a page written by Sphinx again is updated
+    terms['gamma'] = 0
+    (tmp_path / 'searchindex.js').write_text(
+        'Search.setIndex({})'.format(json.dumps(dict(index, terms=terms))))
+    (tmp_path / 'search.html').write_text(SEARCH_PAGE)
+    shard_search_index(tmp_path, prefix_length=5, shard_size=500)
+    html = (tmp_path / 'search.html').read_text()
+    assert html.count('search-shards.js') == 1
+    [core_name] = re.findall(r'src="(_search/index\.[0-9a-f]{12}\.js)"', html)
+    core = read_search_index(tmp_path / core_name)
+    files = {str(path.relative_to(tmp_path))
+             for path in (tmp_path / SEARCH_DIR).iterdir()}
+    assert files == set(core['flinx_shards']['files']) | {core_name}
+    assert read_shards(tmp_path, core)['terms'] == terms
+
+
+def test_postprocess_search_shards(tmp_path):
+    make_build_dir(tmp_path, {'alpha': 0, 'beta': 1})
+    postprocess(tmp_path, compress=True, fingerprint=True, search_shards=True, jobs=1)
+    html = (tmp_path / 'search.html').read_text()
+    # the loader is fingerprinted, and each file is compressed
+    assert re.search(r'src="_static/search-shards\.[0-9a-f]{12}\.js"', html)
+    [core_name] = re.findall(r'src="(_search/index\.[0-9a-f]{12}\.js)"', html)
+    assert (tmp_path / (core_name + '.gz')).is_file()
+    postprocess(tmp_path, compress=True, fingerprint=True, search_shards=True, jobs=1)
+    assert (tmp_path / 'search.html').read_text() == html
@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+from urllib.request import urlopen
+
+import pytest
+from flinx.generation import write_template_files
+from flinx.server import (
+    RELOAD_PATH, LiveReloadServer, SphinxSession, purge_modules, rebuild)
+
+
+def test_live_reload_server(tmp_path):
+    (tmp_path / 'index.html').write_text('<html><body>Hello</body></html>')
+    (tmp_path / 'style.css').write_text('body {}')
+    server = LiveReloadServer(tmp_path, port=0)
+    server.start()
+    try:
+        page = urlopen(server.url).read().decode()
+        assert page.startswith('<html><body>Hello<script>')
+        assert page.endswith('</script>\n</body></html>')
+        assert urlopen(server.url + 'style.css').read() == b'body {}'
+
+        assert urlopen(server.url + RELOAD_PATH[1:]).read() == b'0'
+        server.reload()
+        assert urlopen(server.url + RELOAD_PATH[1:]).read() == b'1'
+    finally:
+        server.stop()
+
+
+def test_sphinx_session(tmp_path, monkeypatch):
+    pytest.importorskip('sphinx')
+    monkeypatch.chdir(tmp_path)
+    Path('module.py').write_text('"""The module."""\n__version__ = "0.1.0"\n')
+    docs_dir = Path('docs')
+    write_template_files(docs_dir, verbose=False)
+    session = SphinxSession(docs_dir, docs_dir / '_build' / 'html')
+    assert session.build() == 0
+    app = session.app
+    assert (docs_dir / '_build' / 'html' / 'index.html').exists()
+
+    (docs_dir / 'extra.rst').write_text('Extra\n=====\n')
+    assert session.build() == 0
+    assert session.app is app, "the application is re-used"
+    assert (docs_dir / '_build' / 'html' / 'extra.html').exists()
+
+
+def test_rebuild(tmp_path, monkeypatch):
+    pytest.importorskip('sphinx')
+    monkeypatch.chdir(tmp_path)
+    module_path = Path('rebuilt_module.py')
+    module_path.write_text('"""The module."""\n__version__ = "0.1.0"\n')
+    docs_dir = Path('docs')
+    write_template_files(docs_dir, verbose=False)
+    session = SphinxSession(docs_dir, docs_dir / '_build' / 'html')
+    assert session.build() == 0
+    app = session.app
+    index_html = docs_dir / '_build' / 'html' / 'index.html'
+
+    # a docstring change re-imports the module, and re-uses the application
+    module_path.write_text('"""The revised module."""\n__version__ = "0.1.0"\n')
+    assert rebuild(session, {module_path}, tmp_path) == 0
+    assert session.app is app
+    assert 'The revised module.' in index_html.read_text()
+
+    # a version change re-generates conf.py, and re-creates the application
+    module_path.write_text('"""The revised module."""\n__version__ = "0.2.0"\n')
+    assert rebuild(session, {module_path}, tmp_path) == 0
+    assert session.app is not app
+    assert "version = '0.2.0'" in (docs_dir / 'conf.py').read_text()
+
+
+def test_purge_modules(tmp_path, monkeypatch):
+    package_dir = tmp_path / 'purged_package'
+    package_dir.mkdir()
+    (package_dir / '__init__.py').write_text('__version__ = "0.1.0"\n')
+    (package_dir / 'submodule.py').write_text('')
+    venv_dir = tmp_path / '.venv' / 'lib' / 'site-packages'
+    (venv_dir / 'venv_package').mkdir(parents=True)
+    (venv_dir / 'venv_package' / '__init__.py').write_text('')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.syspath_prepend(str(venv_dir))
+    import purged_package.submodule  # noqa: F401
+    import venv_package  # noqa: F401
+    try:
+        purge_modules(tmp_path)
+        assert 'purged_package' not in sys.modules
+        assert 'purged_package.submodule' not in sys.modules
+        # the modules of an in-project virtual environment are kept
+        assert 'venv_package' in sys.modules
+    finally:
+        for name in ('purged_package', 'purged_package.submodule', 'venv_package'):
+            sys.modules.pop(name, None)
@@ -0,0 +1,87 @@
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
+from flinx import commands
+from flinx.sharding import document_weights, parse_shard, partition
+
+import pytest
+
+
+def test_parse_shard():
+    assert parse_shard('2/3') == (2, 3)
+    for text in ('0/3', '4/3', '2', 'a/b', '1/'):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_partition():
+    weights = {'a': 5, 'b': 4, 'c': 3, 'd': 3, 'e': 1}
+    assert partition(weights, 2) == [['a', 'd'], ['b', 'c', 'e']]
+    assert partition(weights, 1) == [sorted(weights)]
+    assert partition({'a': 1}, 3) == [['a'], [], []]
+
+
+def test_document_weights():
+    sizes = {'a': 100, 'b': 200, 'c': 300}
+    assert document_weights(sizes, {}) == sizes
+    assert document_weights(sizes, {'a': 1.0, 'b': 5.0}) == {
+        'a': 1.0, 'b': 5.0, 'c': 6.0}
+
+
+def run_flinx(project_dir, *args):
+    package_dir = Path(commands.__file__).parent.parent
+    env = dict(os.environ, PYTHONPATH=str(package_dir))
+    return subprocess.Popen(
+        [sys.executable, '-c', 'from flinx.commands import cli; cli()'] + list(args),
+        cwd=str(project_dir), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+def wait(process):
+    output = process.communicate()[0].decode()
+    assert process.returncode == 0, output
+    return output
+
+
+def shard_docs(docs_dir, index):
+    env_path = docs_dir / '_build' / 'shards' / str(index) / 'doctrees' / \
+        'environment.pickle'
+    with env_path.open('rb') as f:
+        return set(pickle.load(f).all_docs)
+
+
+def test_sharded_build(tmp_path, monkeypatch):
+    (tmp_path / 'shard_module.py').write_text('__version__ = "0.1.0"\n')
+    docs_dir = tmp_path / 'docs'
+    docs_dir.mkdir()
+    pages = ['page{}'.format(i) for i in range(6)]
+    for i, page in enumerate(pages):
+        (docs_dir / (page + '.rst')).write_text(
+            '.. _label{i}:\n\nTitle {i}\n=======\n\n{text}\n\nSee :ref:`label{j}`.\n'
+            .format(i=i, j=(i + 1) % len(pages), text='word{} '.format(i) * 100 * i))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    wait(run_flinx(tmp_path, 'generate', '--offline'))
+    for _ in range(2):
+        # the shards run at once, as separate processes
+        shards = [run_flinx(tmp_path, 'build', '--offline', '--shard',
+                            '{}/2'.format(i)) for i in (1, 2)]
+        for process in shards:
+            wait(process)
+        first, second = shard_docs(docs_dir, 1), shard_docs(docs_dir, 2)
+        assert first & second == {'index'}
+        assert first | second == set(pages) | {'index'}
+        wait(run_flinx(tmp_path, 'merge', '--offline'))
+
+    html_dir = docs_dir / '_build' / 'html'
+    for i, page in enumerate(pages):
+        html = (html_dir / (page + '.html')).read_text()
+        j = (i + 1) % len(pages)
+        assert 'href="page{}.html#label{}"'.format(j, j) in html
+    search_index = (html_dir / 'searchindex.js').read_text()
+    for i in range(6):
+        assert 'Title {}'.format(i) in search_index
+    timings = (docs_dir / '_build' / '.flinx-timings.json').read_text()
+    for page in pages:
+        assert '"{}"'.format(page) in timings
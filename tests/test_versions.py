@@ -0,0 +1,136 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from flinx import commands
+from flinx.versions import extract_tree, ref_names, resolve_refs
+
+import pytest
+
+
+def git(repo_dir, *args):
+    subprocess.run(['git'] + list(args), cwd=str(repo_dir), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def commit_version(repo_dir, version, tag=None):
+    (repo_dir / 'versioned_module.py').write_text(
+        '"""The module, version {0}."""\n\n__version__ = "{0}"\n'.format(version))
+    git(repo_dir, 'add', '-A')
+    git(repo_dir, 'commit', '-q', '-m', version)
+    if tag:
+        git(repo_dir, 'tag', tag)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    repo_dir = tmp_path / 'project'
+    repo_dir.mkdir()
+    (tmp_path / 'gitconfig').write_text(
+        '[user]\n\tname = Test Author\n\temail = author@example.com\n')
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', str(tmp_path / 'gitconfig'))
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    git(repo_dir, 'init', '-q')
+    (repo_dir / 'README.rst').write_text('Project\n=======\n\nThe README.\n')
+    commit_version(repo_dir, '0.1.0', 'v0.1.0')
+    commit_version(repo_dir, '0.2.0', 'v0.2.0')
+    commit_version(repo_dir, '0.3.0', 'v0.3.0')
+    commit_version(repo_dir, '0.4.0.dev0')
+    return repo_dir
+
+
+def test_ref_names(repo):
+    assert ref_names('v0.1.0..HEAD', repo) == ['v0.1.0', 'v0.2.0', 'v0.3.0', 'HEAD']
+    assert ref_names('v0.2.0..v0.3.0', repo) == ['v0.2.0', 'v0.3.0']
+    assert ref_names('..v0.2.0', repo) == ['v0.1.0', 'v0.2.0']
+    assert ref_names('v0.3.0, HEAD', repo) == ['v0.3.0', 'HEAD']
+    [ref] = resolve_refs('v0.1.0', repo)
+    assert ref['path'] == 'v0.1.0' and len(ref['commit']) == len(ref['tree']) == 40
+
+
+def test_extract_tree(repo, tmp_path):
+    dest = tmp_path / 'dest'
+    [first, second] = resolve_refs('v0.1.0,v0.2.0', repo)
+    assert extract_tree(first['commit'], dest, repo)
+    readme_mtime = (dest / 'README.rst').stat().st_mtime_ns
+    (dest / 'docs' / '_build').mkdir(parents=True)
+    (repo / 'extra.txt').write_text('extra')
+    git(repo, 'add', 'extra.txt')
+    git(repo, 'commit', '-q', '-m', 'extra')
+    [third] = resolve_refs('HEAD', repo)
+
+    assert extract_tree(third['commit'], dest, repo)
+    assert (dest / 'extra.txt').is_file()
+    assert not extract_tree(third['commit'], dest, repo)
+    assert extract_tree(second['commit'], dest, repo)
+    assert '0.2.0' in (dest / 'versioned_module.py').read_text()
+    assert not (dest / 'extra.txt').exists()
+    # unchanged files, and files that weren't extracted, are left alone
+    assert (dest / 'README.rst').stat().st_mtime_ns == readme_mtime
+    assert (dest / 'docs' / '_build').is_dir()
+
+
+def run_flinx(project_dir, *args, status=0):
+    package_dir = Path(commands.__file__).parent.parent
+    env = dict(os.environ, PYTHONPATH=str(package_dir))
+    process = subprocess.run(
+        [sys.executable, '-c', 'from flinx.commands import cli; cli()'] + list(args),
+        cwd=str(project_dir), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.stdout.decode()
+    assert process.returncode == status, output
+    return output
+
+
+def test_build_refs(repo, tmp_path):
+    git(repo, 'tag', 'v0.4.0')
+    scratch_dir = tmp_path / 'scratch'
+    for _ in range(2):
+        run_flinx(repo, 'build', '--offline', '--refs', 'v0.2.0..HEAD',
+                  '--scratch-dir', str(scratch_dir), '-j', '2')
+        site_dir = repo / 'docs' / '_build' / 'versions'
+        versions = json.loads((site_dir / 'versions.json').read_text())
+        assert [(version['name'], version['version']) for version in versions] == [
+            ('v0.2.0', '0.2.0'), ('v0.3.0', '0.3.0'), ('v0.4.0', '0.4.0.dev0'),
+            ('HEAD', '0.4.0.dev0')]
+        for version in versions:
+            html = (site_dir / version['path'] / 'index.html').read_text()
+            assert 'The module, version {}.'.format(version['version']) in html
+            assert '_static/version-selector.js' in html
+            static_dir = site_dir / version['path'] / '_static'
+            assert (static_dir / 'version-selector.js').is_file()
+        assert 'url=HEAD/index.html' in (site_dir / 'index.html').read_text()
+    # HEAD has the same tree as v0.4.0, so it isn't extracted or built again
+    assert sorted(path.name for path in (scratch_dir / 'refs').iterdir()) == [
+        'autodoc', 'v0.2.0', 'v0.3.0', 'v0.4.0']
+    assert list((scratch_dir / 'refs' / 'autodoc').glob('*.json'))
+    # the project tree isn't built
+    assert not (repo / 'docs' / '_build' / 'html').exists()
+
+
+def test_build_refs_failure(repo, tmp_path):
+    git(repo, 'branch', 'topic', 'v0.3.0')
+    scratch_dir = tmp_path / 'scratch'
+    args = ['build', '--offline', '--scratch-dir', str(scratch_dir), '--refs']
+    site_dir = repo / 'docs' / '_build' / 'versions'
+    run_flinx(repo, *args, 'v0.2.0,topic')
+
+    # a ref that fails to build keeps its directory and entry from the last run
+    git(repo, 'checkout', '-q', 'topic')
+    (repo / 'docs').mkdir(exist_ok=True)
+    (repo / 'docs' / 'conf.py').write_text('raise RuntimeError("broken")\n')
+    git(repo, 'add', 'docs/conf.py')
+    git(repo, 'commit', '-q', '-m', 'broken')
+    git(repo, 'checkout', '-q', '-')
+    run_flinx(repo, *args, 'v0.2.0,topic', status=1)
+    versions = json.loads((site_dir / 'versions.json').read_text())
+    assert [(version['name'], version['version']) for version in versions] == [
+        ('v0.2.0', '0.2.0'), ('topic', '0.3.0')]
+    assert 'version 0.3.0.' in (site_dir / 'topic' / 'index.html').read_text()
+
+    # a ref that is no longer listed is removed
+    run_flinx(repo, *args, 'v0.2.0')
+    versions = json.loads((site_dir / 'versions.json').read_text())
+    assert [version['name'] for version in versions] == ['v0.2.0']
+    assert not (site_dir / 'topic').exists()
@@ -0,0 +1,17 @@
+from flinx.watcher import Watcher
+
+
+def test_watcher(tmp_path):
+    (tmp_path / 'a.txt').write_text('a')
+    (tmp_path / '_build').mkdir()
+    watcher = Watcher([tmp_path])
+    assert watcher.changes() == set()
+
+    (tmp_path / 'a.txt').write_text('changed')
+    (tmp_path / 'b.txt').write_text('b')
+    (tmp_path / '_build' / 'c.txt').write_text('ignored')
+    assert watcher.changes() == {tmp_path / 'a.txt', tmp_path / 'b.txt'}
+    assert watcher.changes() == set()
+
+    (tmp_path / 'b.txt').unlink()
+    assert watcher.wait(interval=0.01, debounce=0.01) == {tmp_path / 'b.txt'}
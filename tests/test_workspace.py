@@ -0,0 +1,40 @@
+import os
+from pathlib import Path
+
+from flinx.workspace import find_packages, print_summary, run_packages
+
+
+def make_workspace(root):
+    for path, text in [('packages/a/a.py', '__version__ = "1.0"\n'),
+                       ('packages/b/b/__init__.py', '__version__ = "1.0"\n'),
+                       ('packages/b/b/sub/__init__.py', '__version__ = "1.0"\n'),
+                       ('packages/c/notes.py', ''),
+                       ('.venv/d/d.py', '__version__ = "1.0"\n')]:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(text)
+
+
+def test_find_packages(tmp_path):
+    make_workspace(tmp_path)
+    assert find_packages(tmp_path) == [tmp_path / 'packages' / 'a',
+                                       tmp_path / 'packages' / 'b']
+
+
+def fail_in_b(options):
+    if Path.cwd().name == 'b':
+        raise RuntimeError('broken')
+    return options['status']
+
+
+def test_run_packages(tmp_path, capsys):
+    make_workspace(tmp_path)
+    cwd = os.getcwd()
+    results = run_packages(fail_in_b, find_packages(tmp_path), {'status': 0}, jobs=2)
+    assert os.getcwd() == cwd
+    assert [result['status'] for result in results] == [0, 1]
+    assert results[1]['message'] == 'RuntimeError: broken'
+
+    print_summary(results, tmp_path)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].split()[:2] == ['packages/a', 'ok']
+    assert lines[2].split()[:2] == ['packages/b', 'failed']